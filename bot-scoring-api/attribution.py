@@ -0,0 +1,147 @@
+"""
+Per-feature attribution for anomaly scores.
+
+Each feature gets ECOD's dimensional outlier score: -log of the row's
+empirical tail probability in that feature, taking the larger of the left
+and right tails (and the skew-chosen one), as ECOD does before summing over
+dimensions. A feature scores high when few reference rows are as extreme
+in it, so the top features are the ones driving the ECOD part of the
+ensemble score.
+
+The reference is the distribution a row is scored against: the batch
+itself when the detectors are fitted per batch, the training corpus for a
+pretrained ensemble. The streaming detector computes the same matrix from
+its histograms (see online_detector.py).
+
+Against a small batch the tail scores saturate: a row's most extreme
+features all sit at the batch's last rank and tie at the same score. Ties
+are broken by standardized deviation from the batch mean, which keeps the
+ranking useful down to MIN_ATTRIBUTION_ROWS; smaller batches with no
+other reference are ranked by deviation from the batch mean alone, as
+before the ECOD attribution.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from feature_matrix import FEATURE_NAMES
+
+DEFAULT_TOP_K = 5
+MIN_ATTRIBUTION_ROWS = 10  # Smaller batches fall back to deviation from the batch mean
+
+
+def _skew(X: np.ndarray) -> np.ndarray:
+    """Per-column sample skewness (0 for constant columns)"""
+    centered = X - X.mean(axis=0)
+    var = (centered ** 2).mean(axis=0)
+    third = (centered ** 3).mean(axis=0)
+    return np.divide(third, var ** 1.5, out=np.zeros(X.shape[1]), where=var > 0)
+
+
+def dimension_scores_from_tails(left: np.ndarray, right: np.ndarray, skew: np.ndarray) -> np.ndarray:
+    """ECOD's per-dimension score from left/right tail probabilities (n, d) and skew (d,)"""
+    neg_log_left = -np.log(left)
+    neg_log_right = -np.log(right)
+    auto = np.where(skew < 0, neg_log_left, neg_log_right)
+    return np.maximum(np.maximum(neg_log_left, neg_log_right), auto)
+
+
+class ReferenceDistribution:
+    """Sorted reference columns, so rows are ranked against them with searchsorted"""
+
+    def __init__(self, reference: np.ndarray):
+        reference = np.asarray(reference, dtype=np.float64)
+        self.n_rows = len(reference)
+        self.sorted_columns = np.sort(reference, axis=0).T.copy()
+        self.skew = _skew(reference) if self.n_rows else np.zeros(reference.shape[1])
+
+    def dimension_scores(self, X: np.ndarray, include_self: bool = False) -> np.ndarray:
+        """
+        (n, d) dimensional outlier scores of X. include_self means X is (part
+        of) the reference; otherwise each row is counted in, as ECOD counts
+        scored rows into its ECDF, so no tail probability is ever zero.
+        """
+        extra = 0 if include_self else 1
+        total = self.n_rows + extra
+        left = np.empty(X.shape)
+        right = np.empty(X.shape)
+        for j, column in enumerate(self.sorted_columns):
+            values = X[:, j]
+            left[:, j] = np.searchsorted(column, values, side="right") + extra
+            right[:, j] = self.n_rows - np.searchsorted(column, values, side="left") + extra
+        return dimension_scores_from_tails(left / total, right / total, self.skew)
+
+
+def batch_dimension_scores(feature_vectors: np.ndarray) -> np.ndarray:
+    """Dimensional outlier scores of a batch against itself"""
+    return ReferenceDistribution(feature_vectors).dimension_scores(feature_vectors, include_self=True)
+
+
+def standardized_deviations(feature_vectors: np.ndarray) -> np.ndarray:
+    """|x - mean| / std per column of the batch (0 for constant columns)"""
+    deviations = np.abs(feature_vectors - feature_vectors.mean(axis=0))
+    std = feature_vectors.std(axis=0)
+    return np.divide(deviations, std, out=np.zeros(deviations.shape), where=std > 0)
+
+
+def batch_contributions(feature_vectors: np.ndarray, k: int = DEFAULT_TOP_K) -> List[Dict[str, float]]:
+    """
+    Top features of every row when the batch is its own reference: ECOD
+    scores with ties broken by standardized deviation, or the deviation
+    from the batch mean for batches below MIN_ATTRIBUTION_ROWS.
+    """
+    feature_vectors = np.asarray(feature_vectors, dtype=np.float64)
+    if len(feature_vectors) < MIN_ATTRIBUTION_ROWS:
+        return top_contributions(np.abs(feature_vectors - feature_vectors.mean(axis=0)), k)
+    return top_contributions(
+        batch_dimension_scores(feature_vectors), k, tiebreak=standardized_deviations(feature_vectors)
+    )
+
+
+def top_contributions(
+    dimension_scores: np.ndarray,
+    k: int = DEFAULT_TOP_K,
+    feature_names: Sequence[str] = FEATURE_NAMES,
+    tiebreak: Optional[np.ndarray] = None
+) -> List[Dict[str, float]]:
+    """
+    The k highest-scoring features of every row, highest first. Equal
+    scores are ordered by tiebreak (higher first) when given, else by
+    feature order.
+    """
+    n, d = dimension_scores.shape
+    k = min(k, d)
+    if n == 0 or k == 0:
+        return [{} for _ in range(n)]
+    scores = np.nan_to_num(dimension_scores, nan=0.0)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    if tiebreak is not None:
+        tiebreak = np.nan_to_num(tiebreak, nan=0.0)
+        # Rows with more features tied at the k-th score than fit pick them by tiebreak
+        kth = np.take_along_axis(scores, top, axis=1).min(axis=1)
+        boundary_ties = (scores >= kth[:, np.newaxis]).sum(axis=1) > k
+        if boundary_ties.any():
+            top[boundary_ties] = np.lexsort((-tiebreak[boundary_ties], -scores[boundary_ties]), axis=1)[:, :k]
+    top.sort(axis=1)  # Full ties keep feature order
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    if tiebreak is None:
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+    else:
+        order = np.lexsort((-np.take_along_axis(tiebreak, top, axis=1), -top_scores), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(scores, top, axis=1).tolist()
+    top = top.tolist()
+    return [
+        {feature_names[idx]: value for idx, value in zip(row_idx, row_scores)}
+        for row_idx, row_scores in zip(top, top_scores)
+    ]
+
+
+def reference_for_detectors(detectors: Dict[str, object]) -> Optional[ReferenceDistribution]:
+    """Reference distribution from a fitted ECOD's training data, if there is one"""
+    ecod = detectors.get("ecod")
+    X_train = getattr(ecod, "X_train", None)
+    if X_train is None or len(X_train) == 0:
+        return None
+    return ReferenceDistribution(X_train)
@@ -0,0 +1,285 @@
+"""
+Benchmarks for the scoring pipeline stages.
+
+Times each stage on seeded synthetic data (see synthetic.py) at batch sizes
+1, 5, 20, 100 and 10k, and comment analysis at 10, 100 and 1000 comments.
+The JSON codec cases compare FastAPI's default body/response handling with
+codec.ModelCodec on a worst-case /score payload (100 x 1000 comments).
+Results can be saved as a JSON baseline and later runs checked against it.
+
+Usage (from bot-scoring-api/):
+    python benchmarks/run_benchmarks.py                    # print timings
+    python benchmarks/run_benchmarks.py --save-baseline    # write benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --check            # exit 1 on a regression
+    python benchmarks/run_benchmarks.py --quick --filter comments
+
+Timings depend on the machine, so regenerate the baseline before relying
+on --check somewhere new. Detector fitting runs in-process
+(SCORING_WORKERS=0) so the numbers measure the pipeline, not the pool. The
+campaign, creator and video-history stores are on (they are off by default
+in the service) and keep their state in a temporary directory unless their
+paths are set.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+os.environ.setdefault("SCORING_WORKERS", "0")
+STATE_DIR = tempfile.mkdtemp(prefix="bot-scoring-bench-")
+for flag in ("CAMPAIGN_BASELINES_ENABLED", "CREATOR_REPUTATION_ENABLED", "VIDEO_HISTORY_ENABLED"):
+    os.environ.setdefault(flag, "true")
+os.environ.setdefault("CAMPAIGN_STORE_PATH", os.path.join(STATE_DIR, "campaigns.sqlite3"))
+os.environ.setdefault("CREATOR_STORE_PATH", os.path.join(STATE_DIR, "creators.sqlite3"))
+os.environ.setdefault("VIDEO_HISTORY_STATE_PATH", os.path.join(STATE_DIR, "video_history.npz"))
+os.environ.setdefault("ONLINE_DETECTOR_STATE_DIR", os.path.join(STATE_DIR, "online"))
+
+from synthetic import make_comments, make_submissions  # noqa: E402
+from codec import ModelCodec, msgspec_available  # noqa: E402
+from feature_matrix import build_feature_matrix, extract_columns  # noqa: E402
+import main  # noqa: E402
+
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_THRESHOLD = 0.25  # Fail --check when a median is 25% slower
+NOISE_FLOOR_MS = 0.05  # Ignore differences smaller than this
+
+BATCH_SIZES = [1, 5, 20, 100, 10_000]
+QUICK_BATCH_SIZES = [1, 5, 20, 100]
+COMMENT_COUNTS = [10, 100, 1000]
+
+
+# =============================================================================
+# TIMING
+# =============================================================================
+
+def time_call(fn: Callable[[], object], min_time: float, min_repeats: int = 3, max_repeats: int = 1000) -> dict:
+    """
+    Call fn once to warm up, then repeatedly for at least min_time seconds.
+    The cyclic GC is paused while timing, as timeit does, so collections
+    triggered by other cases' data don't land on whichever case is running.
+    """
+    fn()
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        while len(times) < min_repeats or (time.perf_counter() - started < min_time and len(times) < max_repeats):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    return {
+        "median_ms": statistics.median(times) * 1000.0,
+        "min_ms": min(times) * 1000.0,
+        "repeats": len(times),
+    }
+
+
+# =============================================================================
+# CASES
+# =============================================================================
+
+def _batch(n: int, seed: int):
+    raw = make_submissions(n, seed=seed)
+    submissions = [main.VideoFeatures.model_validate(s) for s in raw]
+    comment_analyses = [
+        main.analyze_comments(s.comment_data.texts)
+        if s.comment_data and s.comment_data.texts else None
+        for s in submissions
+    ]
+    return submissions, comment_analyses
+
+
+def build_cases(batch_sizes: List[int], seed: int) -> List[Tuple[str, Callable[[], object]]]:
+    """(name, zero-argument callable) for every benchmark case"""
+    cases = []
+
+    for count in COMMENT_COUNTS:
+        comments = make_comments(count, 0.5, random.Random(seed + count))
+        cases.append((f"analyze_comments/comments={count}", lambda c=comments: main.analyze_comments(c)))
+
+    for n in batch_sizes:
+        submissions, comment_analyses = _batch(n, seed + n)
+        columns = extract_columns(submissions, comment_analyses)
+        feature_vectors = build_feature_matrix(columns=columns)
+
+        cases.append((
+            f"extract_feature_vector/n={n}",
+            lambda s=submissions, a=comment_analyses: [
+                main.extract_feature_vector(sub, analysis) for sub, analysis in zip(s, a)
+            ],
+        ))
+        cases.append((
+            f"build_feature_matrix/n={n}",
+            lambda s=submissions, a=comment_analyses: build_feature_matrix(s, a),
+        ))
+        cases.append((
+            f"calculate_rule_based_scores/n={n}",
+            lambda s=submissions, a=comment_analyses: main.calculate_rule_based_scores(s, a),
+        ))
+        cases.append((
+            f"calculate_bot_score/n={n}",
+            lambda x=feature_vectors, s=submissions, c=columns: main.calculate_bot_score(x, s, columns=c),
+        ))
+        cases.append((
+            f"score_features/n={n}",
+            lambda s=submissions: _score_uncached(s),
+        ))
+
+    cases.extend(build_codec_cases(seed))
+    return cases
+
+
+def build_codec_cases(seed: int) -> List[Tuple[str, Callable[[], object]]]:
+    raw = make_submissions(100, seed=seed, comment_count=1000)
+    body = json.dumps({"submissions": raw}).encode()
+    request = main.ScoringRequest.model_validate_json(body)
+    response = main.ScoringResponse(scores=main.calculate_bot_score(
+        build_feature_matrix(request.submissions), request.submissions
+    ))
+
+    cases = [
+        # What FastAPI does for a ScoringRequest body parameter
+        ("decode_scoring_request/fastapi",
+         lambda: main.ScoringRequest.model_validate(json.loads(body))),
+        ("decode_scoring_request/codec_without_msgspec",
+         lambda c=ModelCodec(main.ScoringRequest, use_msgspec=False): c.decode(body)),
+        # What FastAPI does with response_model: dump, re-validate, json.dumps
+        ("encode_scoring_response/fastapi",
+         lambda: json.dumps(
+             main.ScoringResponse.model_validate(response.model_dump()).model_dump(mode="json"),
+             ensure_ascii=False, separators=(",", ":"),
+         ).encode()),
+        ("encode_scoring_response/codec", lambda: ModelCodec.encode(response)),
+    ]
+    if msgspec_available():
+        cases.append((
+            "decode_scoring_request/msgspec",
+            lambda c=ModelCodec(main.ScoringRequest): c.decode(body),
+        ))
+    return cases
+
+
+def _score_uncached(submissions):
+    """End-to-end pipeline, with the comment cache cleared so analysis is timed too"""
+    main.COMMENT_ANALYSIS_CACHE.clear()
+    return asyncio.run(main.score_features(submissions))
+
+
+# =============================================================================
+# BASELINE
+# =============================================================================
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Cases whose median is more than threshold slower than the baseline"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        current_ms, baseline_ms = result["median_ms"], reference["median_ms"]
+        if current_ms > baseline_ms * (1 + threshold) and current_ms - baseline_ms > NOISE_FLOOR_MS:
+            regressions.append(
+                f"{name}: {current_ms:.3f} ms vs baseline {baseline_ms:.3f} ms "
+                f"(+{(current_ms / baseline_ms - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the bot scoring pipeline")
+    parser.add_argument("--filter", help="Only run cases whose name matches this regex")
+    parser.add_argument("--quick", action="store_true", help="Skip the 10k-row batches")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to spend timing each case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline")
+    parser.add_argument("--check", action="store_true", help="Fail if any case regressed past --threshold")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    pattern = re.compile(args.filter) if args.filter else None
+    cases = build_cases(QUICK_BATCH_SIZES if args.quick else BATCH_SIZES, args.seed)
+
+    results: Dict[str, dict] = {}
+    for name, fn in cases:
+        if pattern and not pattern.search(name):
+            continue
+        result = time_call(fn, args.min_time)
+        results[name] = result
+        print(f"{name:45s} {result['median_ms']:12.3f} ms  (min {result['min_ms']:.3f}, {result['repeats']} runs)")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+    if args.check:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except OSError as e:
+            print(f"No baseline to check against: {e}", file=sys.stderr)
+            return 1
+        if baseline.get("environment") != report["environment"]:
+            print("Warning: baseline was recorded in a different environment", file=sys.stderr)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) past {args.threshold:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            status = 1
+        else:
+            print(f"\nNo regressions past {args.threshold:.0%}")
+
+    if args.save_baseline:
+        # Merge so a filtered run only replaces the cases it ran
+        merged: Dict[str, dict] = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                merged = json.load(f).get("results", {})
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**report, "results": dict(sorted(merged.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,208 @@
+"""
+Seeded synthetic submissions for the benchmarks.
+
+Rows are a mix of organic creators and bot-like ones (bought views with
+little engagement, engagement pods, fresh unverified accounts, generic
+comment spam), split between TikTok and Instagram/YouTube. The same seed
+always produces the same rows, so benchmark runs are comparable.
+
+Every row carries a campaign_id, creator_id and video_id, so the campaign
+baseline, creator reputation and video history stores do their lookups as
+they would in production: campaigns and creators repeat across a batch,
+video ids are unique within it.
+"""
+
+import random
+from typing import List, Optional
+
+ORGANIC_COMMENTS = [
+    "this is actually so helpful, saving it for later",
+    "the part at 0:42 had me dying",
+    "where did you get that jacket??",
+    "Tried this recipe last night and it worked perfectly",
+    "i've been waiting for someone to explain this properly",
+    "not me watching this at 3am",
+    "Can you do a part 2 about the editing?",
+    "my dog does the exact same thing lol",
+    "okay but the transition was so clean",
+    "Which camera are you using for these shots?",
+    "Genuinely the best tutorial on this I've found",
+    "the way he looked at the camera 😂",
+    "Istanbul trip planning starts now",
+    "lol",
+    "same",
+    "Bruh 💀",
+]
+
+BOT_COMMENTS = [
+    "nice", "Nice!", "cool", "amazing", "great", "love it", "wow", "fire",
+    "beautiful", "awesome!", "perfect", "follow me", "follow back",
+    "check out my profile", "dm me for promo", "link in bio", "F4F", "l4l",
+    "follow for follow", "like for like", "🔥🔥🔥", "💯", "❤️", "👏👏", "😍",
+    "ok", "a", ":)",
+]
+
+NON_TIKTOK_PLATFORMS = ["instagram", "youtube"]
+
+SUBMISSIONS_PER_CAMPAIGN = 50
+SUBMISSIONS_PER_CREATOR = 3
+
+
+FILLER_WORDS = ["honestly", "fr", "omg", "wait", "this", "video", "again", "today", "haha", "!!", "?", "🙏"]
+
+
+def _vary(text: str, rng: random.Random) -> str:
+    """Real comment sections are mostly unique strings, not a handful of repeats"""
+    roll = rng.random()
+    if roll < 0.3:
+        return text
+    if roll < 0.45:
+        return text.upper()
+    if roll < 0.6:
+        return text + "!" * rng.randint(1, 3)
+    return f"{text} {' '.join(rng.choices(FILLER_WORDS, k=rng.randint(1, 4)))} {rng.randint(1, 9999)}"
+
+
+def make_comments(count: int, bot_share: float, rng: random.Random) -> List[str]:
+    """count comment texts, roughly bot_share of them generic bot comments"""
+    comments = []
+    for _ in range(count):
+        if rng.random() < bot_share:
+            # Bot comments are mostly verbatim repeats
+            text = rng.choice(BOT_COMMENTS)
+            comments.append(text if rng.random() < 0.8 else text + "!")
+        else:
+            comments.append(_vary(rng.choice(ORGANIC_COMMENTS), rng))
+    return comments
+
+
+def _organic(rng: random.Random, tiktok: bool) -> dict:
+    followers = int(rng.lognormvariate(9, 1.5))
+    views = max(int(followers * rng.lognormvariate(0, 1.0)), 0)
+    like_rate = rng.uniform(0.03, 0.12)
+    hours_since_upload = rng.uniform(6, 24 * 14)
+    submission = {
+        "views": views,
+        "likes": int(views * like_rate),
+        "comments": int(views * like_rate * rng.uniform(0.01, 0.05)),
+        "shares": int(views * rng.uniform(0.001, 0.01)),
+        "bookmarks": int(views * rng.uniform(0.001, 0.02)),
+        "hours_since_upload": hours_since_upload,
+        "hours_since_submission": rng.uniform(0, hours_since_upload),
+        "author_verified": rng.random() < 0.1,
+        "author_follower_count": followers,
+        "author_following_count": int(rng.uniform(50, 1500)),
+        "account_age_days": rng.randint(180, 3000),
+        "creator_previous_submissions": rng.randint(0, 40),
+        "creator_previous_flags": 0 if rng.random() < 0.9 else 1,
+        "creator_trust_score": rng.uniform(70, 100),
+        "campaign_avg_engagement_rate": rng.uniform(0.04, 0.1),
+        "campaign_avg_views": rng.uniform(5000, 50000),
+    }
+    if tiktok:
+        submission.update({
+            "duets": int(views * rng.uniform(0, 0.0005)),
+            "stitches": int(views * rng.uniform(0, 0.0005)),
+            "sound_is_original": rng.random() < 0.3,
+            "sound_is_trending": rng.random() < 0.5,
+            "video_duration_seconds": rng.uniform(10, 90),
+            "avg_watch_time_seconds": rng.uniform(5, 40),
+            "hashtag_count": rng.randint(2, 6),
+            "author_total_videos": rng.randint(20, 600),
+            "author_videos_last_30_days": rng.randint(2, 40),
+        })
+    return submission
+
+
+def _bot_like(rng: random.Random, tiktok: bool) -> dict:
+    kind = rng.choice(["bought_views", "engagement_pod", "fresh_account"])
+    followers = rng.randint(0, 2000)
+    views = rng.randint(50_000, 2_000_000) if kind == "bought_views" else rng.randint(1000, 80_000)
+    if kind == "bought_views":
+        like_rate = rng.uniform(0.0001, 0.003)
+    elif kind == "engagement_pod":
+        like_rate = rng.uniform(0.25, 0.6)
+    else:
+        like_rate = rng.uniform(0.01, 0.2)
+    hours_since_upload = rng.uniform(0.2, 6) if kind == "bought_views" else rng.uniform(1, 72)
+    submission = {
+        "views": views,
+        "likes": int(views * like_rate),
+        "comments": int(views * like_rate * rng.uniform(0.05, 0.3)),
+        "shares": int(views * rng.uniform(0, 0.002)),
+        "bookmarks": rng.choice([None, 0, int(views * 0.0005)]),
+        "hours_since_upload": hours_since_upload,
+        "hours_since_submission": rng.uniform(0, hours_since_upload),
+        "author_verified": False,
+        "author_follower_count": followers,
+        "author_following_count": rng.choice([0, rng.randint(3000, 7500)]),
+        "account_age_days": rng.randint(1, 60),
+        "creator_previous_submissions": rng.randint(0, 15),
+        "creator_previous_flags": rng.randint(0, 5),
+        "creator_trust_score": rng.uniform(10, 60),
+        "campaign_avg_engagement_rate": rng.uniform(0.04, 0.1),
+        "campaign_avg_views": rng.uniform(5000, 50000),
+    }
+    if tiktok:
+        duration = rng.uniform(7, 60)
+        submission.update({
+            "duets": 0,
+            "stitches": 0,
+            "sound_is_original": False,
+            "sound_is_trending": False,
+            "video_duration_seconds": duration,
+            "avg_watch_time_seconds": duration * rng.uniform(0.02, 0.15),
+            "hashtag_count": rng.randint(10, 30),
+            "author_total_videos": rng.randint(1, 3000),
+            "author_videos_last_30_days": rng.randint(0, 200),
+        })
+    return submission
+
+
+def make_submission(
+    rng: random.Random,
+    bot: bool,
+    tiktok: bool,
+    comment_count: Optional[int] = None
+) -> dict:
+    """
+    One VideoFeatures-shaped dict. comment_count=None picks a realistic
+    count (sometimes no comment data at all); 0 or more forces it.
+    """
+    submission = _bot_like(rng, tiktok) if bot else _organic(rng, tiktok)
+    submission["platform"] = "tiktok" if tiktok else rng.choice(NON_TIKTOK_PLATFORMS)
+
+    if comment_count is None:
+        comment_count = rng.randint(0, 60) if rng.random() < 0.7 else None
+    if comment_count is not None:
+        bot_share = rng.uniform(0.5, 0.95) if bot else rng.uniform(0.0, 0.2)
+        submission["comment_data"] = {"texts": make_comments(comment_count, bot_share, rng)}
+    return submission
+
+
+def make_submissions(
+    n: int,
+    seed: int = 0,
+    bot_fraction: float = 0.2,
+    tiktok_fraction: float = 0.5,
+    comment_count: Optional[int] = None
+) -> List[dict]:
+    """n seeded submission dicts, ready for VideoFeatures.model_validate"""
+    rng = random.Random(seed)
+    # Ids come from their own stream, so the feature values don't depend on them
+    id_rng = random.Random(f"ids-{seed}")
+    n_campaigns = max(n // SUBMISSIONS_PER_CAMPAIGN, 1)
+    n_creators = max(n // SUBMISSIONS_PER_CREATOR, 1)
+    submissions = []
+    for i in range(n):
+        submission = make_submission(
+            rng,
+            bot=rng.random() < bot_fraction,
+            tiktok=rng.random() < tiktok_fraction,
+            comment_count=comment_count,
+        )
+        submission["campaign_id"] = f"campaign-{seed}-{id_rng.randrange(n_campaigns)}"
+        submission["creator_id"] = f"creator-{seed}-{id_rng.randrange(n_creators)}"
+        submission["video_id"] = f"video-{seed}-{i}"
+        submissions.append(submission)
+    return submissions
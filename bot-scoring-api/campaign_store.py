@@ -0,0 +1,473 @@
+"""
+Per-campaign engagement baselines kept by the service.
+
+Every scored submission that carries a campaign_id updates its campaign's
+running statistics (Welford mean/variance plus a log-bucket quantile sketch)
+for engagement rate, views and view velocity. Baselines live in an LRU of
+recently used campaigns and are written to SQLite in batches, so callers no
+longer have to query campaign averages before each scoring call.
+
+A submission with a video_id contributes once: the store keeps each
+video's last contribution and a rescore replaces it, so videos polled more
+often do not weigh more in their campaign's baseline. Submissions without
+a video_id are added every time they are scored.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+BASELINE_METRICS = ("engagement_rate", "views", "velocity")
+
+
+class RunningStats:
+    """Count, mean and variance, updated a batch at a time (Chan et al. merge)"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add_many(self, values: np.ndarray) -> None:
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def remove_many(self, values: np.ndarray) -> None:
+        """Undo add_many(values) (the same merge, solved for the earlier stats)"""
+        n = len(values)
+        if n == 0:
+            return
+        total = self.count - n
+        if total <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        mean = (self.count * self.mean - n * batch_mean) / total
+        delta = batch_mean - mean
+        self.m2 = max(self.m2 - batch_m2 - delta ** 2 * total * n / self.count, 0.0)
+        self.mean = mean
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count > 1 else 0.0
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RunningStats":
+        return cls(int(data["count"]), float(data["mean"]), float(data["m2"]))
+
+
+class QuantileSketch:
+    """
+    Log-bucket sketch (DDSketch-style) for non-negative values: any quantile
+    is within relative_accuracy of the true one. Past max_buckets the lowest
+    buckets are merged, so memory stays bounded and only low quantiles lose accuracy.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 512):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, float] = {}
+        self.zero_count = 0.0
+        self.count = 0.0
+
+    def add_many(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        if len(positive):
+            keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self.buckets[key] = self.buckets.get(key, 0.0) + count
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+
+    def remove_many(self, values: np.ndarray) -> None:
+        """Take values added earlier back out; ones in collapsed buckets come out of the lowest bucket"""
+        if len(values) == 0:
+            return
+        positive = values[values > 0]
+        self.zero_count = max(self.zero_count - (len(values) - len(positive)), 0.0)
+        if len(positive):
+            keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                if key not in self.buckets and self.buckets:
+                    key = min(self.buckets)
+                remaining = self.buckets.get(key, 0.0) - count
+                if remaining > 0:
+                    self.buckets[key] = remaining
+                else:
+                    self.buckets.pop(key, None)
+        self.count = self.zero_count + sum(self.buckets.values())
+
+    def _collapse(self) -> None:
+        keys = sorted(self.buckets)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        merged = sum(self.buckets.pop(key) for key in excess)
+        target = keys[len(excess)]
+        self.buckets[target] = self.buckets.get(target, 0.0) + merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return 2 * self._gamma ** key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "zero_count": self.zero_count,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"], data["max_buckets"])
+        sketch.zero_count = float(data["zero_count"])
+        sketch.buckets = {int(k): float(v) for k, v in data["buckets"].items()}
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
+
+
+class CampaignBaseline:
+    """Running stats and a quantile sketch for each of BASELINE_METRICS"""
+
+    def __init__(self):
+        self.stats = {metric: RunningStats() for metric in BASELINE_METRICS}
+        self.sketches = {metric: QuantileSketch() for metric in BASELINE_METRICS}
+
+    @property
+    def count(self) -> int:
+        return self.stats[BASELINE_METRICS[0]].count
+
+    def add_many(self, values: Dict[str, np.ndarray]) -> None:
+        for metric in BASELINE_METRICS:
+            column = np.asarray(values[metric], dtype=np.float64)
+            self.stats[metric].add_many(column)
+            self.sketches[metric].add_many(column)
+
+    def remove_many(self, values: Dict[str, np.ndarray]) -> None:
+        for metric in BASELINE_METRICS:
+            column = np.asarray(values[metric], dtype=np.float64)
+            self.stats[metric].remove_many(column)
+            self.sketches[metric].remove_many(column)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            **{
+                metric: {
+                    "mean": self.stats[metric].mean,
+                    "std": self.stats[metric].std,
+                    "p50": self.sketches[metric].quantile(0.5),
+                    "p90": self.sketches[metric].quantile(0.9),
+                }
+                for metric in BASELINE_METRICS
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "stats": {m: s.to_dict() for m, s in self.stats.items()},
+            "sketches": {m: s.to_dict() for m, s in self.sketches.items()},
+        })
+
+    @classmethod
+    def from_json(cls, payload: str) -> "CampaignBaseline":
+        data = json.loads(payload)
+        baseline = cls()
+        for metric in BASELINE_METRICS:
+            if metric in data["stats"]:
+                baseline.stats[metric] = RunningStats.from_dict(data["stats"][metric])
+                baseline.sketches[metric] = QuantileSketch.from_dict(data["sketches"][metric])
+        return baseline
+
+
+class CampaignBaselineStore:
+    """
+    Baselines by campaign_id: an LRU of max_cached campaigns in memory,
+    backed by a SQLite table. Updates are written by flush(); a dirty
+    campaign evicted from the LRU is written straight away.
+    """
+
+    def __init__(self, db_path: str, max_cached: int = 10000):
+        self.db_path = db_path
+        self.max_cached = max(int(max_cached), 1)
+        self._cache: "OrderedDict[str, CampaignBaseline]" = OrderedDict()
+        self._dirty: set = set()
+        # (campaign_id, video_id) -> BASELINE_METRICS values not yet written
+        self._contributions: Dict[Tuple[str, str], Tuple[float, ...]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS campaign_baselines ("
+                " campaign_id TEXT PRIMARY KEY,"
+                " sample_count INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS campaign_video_contribution ("
+                " campaign_id TEXT NOT NULL,"
+                " video_id TEXT NOT NULL,"
+                " engagement_rate REAL NOT NULL,"
+                " views REAL NOT NULL,"
+                " velocity REAL NOT NULL,"
+                " PRIMARY KEY (campaign_id, video_id))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load(self, campaign_ids: Iterable[str]) -> None:
+        """Pull missing campaigns into the LRU (lock held; callers _evict() when done with them)"""
+        missing = [cid for cid in campaign_ids if cid not in self._cache]
+        found = {}
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = self._connection().execute(
+                f"SELECT campaign_id, data FROM campaign_baselines WHERE campaign_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update({cid: CampaignBaseline.from_json(data) for cid, data in rows})
+        for cid in missing:
+            self._cache[cid] = found.get(cid) or CampaignBaseline()
+        for cid in campaign_ids:
+            self._cache.move_to_end(cid)
+
+    def _evict(self) -> None:
+        evicted = []
+        while len(self._cache) > self.max_cached:
+            cid, baseline = self._cache.popitem(last=False)
+            if cid in self._dirty:
+                self._dirty.discard(cid)
+                evicted.append((cid, baseline))
+        if evicted:
+            self._write(evicted)
+
+    def _previous_contributions(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[float, ...]]:
+        """Last contribution of each (campaign_id, video_id) that has one (lock held)"""
+        found = {key: self._contributions[key] for key in keys if key in self._contributions}
+        missing = [key for key in keys if key not in found]
+        for start in range(0, len(missing), 250):
+            chunk = missing[start:start + 250]
+            rows = self._connection().execute(
+                "SELECT campaign_id, video_id, engagement_rate, views, velocity FROM campaign_video_contribution"
+                f" WHERE (campaign_id, video_id) IN (VALUES {','.join(['(?, ?)'] * len(chunk))})",
+                [part for key in chunk for part in key],
+            ).fetchall()
+            found.update({(row[0], row[1]): tuple(row[2:]) for row in rows})
+        return found
+
+    def _write(self, items: List, contributions: Optional[Dict] = None) -> None:
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO campaign_baselines (campaign_id, sample_count, data, updated_at)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(campaign_id) DO UPDATE SET"
+                " sample_count = excluded.sample_count, data = excluded.data, updated_at = excluded.updated_at",
+                [(cid, baseline.count, baseline.to_json(), now) for cid, baseline in items],
+            )
+            if contributions:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO campaign_video_contribution"
+                    " (campaign_id, video_id, engagement_rate, views, velocity) VALUES (?, ?, ?, ?, ?)",
+                    [(cid, vid, *values) for (cid, vid), values in contributions.items()],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def summaries(self, campaign_ids: Iterable[str]) -> Dict[str, dict]:
+        """Current baseline summary per campaign (count 0 for unseen campaigns)"""
+        ids = list(dict.fromkeys(campaign_ids))
+        with self._lock:
+            self._load(ids)
+            result = {cid: self._cache[cid].summary() for cid in ids}
+            self._evict()
+            return result
+
+    def update(
+        self,
+        campaign_ids: np.ndarray,
+        values: Dict[str, np.ndarray],
+        video_ids: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Add rows to their campaigns; values holds one array per
+        BASELINE_METRICS, aligned with campaign_ids like video_ids (None
+        entries allowed). A row for a video its campaign already has replaces
+        that video's earlier contribution.
+        """
+        ids = np.asarray(campaign_ids, dtype=object)
+        matrix = np.column_stack([np.asarray(values[metric], dtype=np.float64) for metric in BASELINE_METRICS])
+        keep = np.ones(len(ids), dtype=np.bool_)
+        latest: Dict[Tuple[str, str], Tuple[float, ...]] = {}
+        if video_ids is not None:
+            video_ids = np.asarray(video_ids, dtype=object)
+            for i in np.flatnonzero(video_ids != None).tolist():  # noqa: E711 - elementwise None check
+                latest[(ids[i], str(video_ids[i]))] = tuple(matrix[i].tolist())
+                keep[i] = False  # Added once per video below
+        unique = list(dict.fromkeys(ids.tolist()))
+        with self._lock:
+            self._load(unique)
+            previous = self._previous_contributions(list(latest))
+            for cid in unique:
+                added = [matrix[keep & (ids == cid)]]
+                added += [np.array([row]) for key, row in latest.items() if key[0] == cid]
+                removed = [np.array([row]) for key, row in previous.items() if key[0] == cid]
+                baseline = self._cache[cid]
+                if removed:
+                    removed = np.concatenate(removed)
+                    baseline.remove_many({metric: removed[:, j] for j, metric in enumerate(BASELINE_METRICS)})
+                added = np.concatenate(added)
+                baseline.add_many({metric: added[:, j] for j, metric in enumerate(BASELINE_METRICS)})
+                self._dirty.add(cid)
+            self._contributions.update(latest)
+            self._evict()
+
+    def flush(self) -> int:
+        """Write dirty campaigns and new video contributions to SQLite; returns how many campaigns were written"""
+        with self._lock:
+            items = [(cid, self._cache[cid]) for cid in self._dirty if cid in self._cache]
+            contributions = self._contributions
+            self._dirty.clear()
+            self._contributions = {}
+            if items or contributions:
+                self._write(items, contributions)
+        return len(items)
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "pending_contributions": len(self._contributions),
+            "db_path": self.db_path,
+        }
+
+
+def batch_metrics(columns) -> Dict[str, np.ndarray]:
+    """Per-row values of BASELINE_METRICS, defined as the rules and features define them"""
+    views = columns["views"]
+    views_floor = np.maximum(views, 1)
+    return {
+        "engagement_rate": (columns["likes"] + columns["comments"] + columns["shares"]) / views_floor,
+        "views": views.astype(np.float64),
+        "velocity": views / np.maximum(columns["hours_since_upload"], 0.1),
+    }
+
+
+def fill_campaign_baselines(columns, store: CampaignBaselineStore, min_samples: int) -> int:
+    """
+    Fill campaign columns from each row's campaign baseline without changing
+    the store; averages sent by the caller are kept. Returns the number of
+    rows that got a baseline.
+    """
+    campaign_ids = columns["campaign_id"]
+    has_campaign = campaign_ids != None  # noqa: E711 - elementwise None check
+    if not has_campaign.any():
+        return 0
+
+    ids = campaign_ids[has_campaign]
+    summaries = store.summaries(ids.tolist())
+    rows = np.flatnonzero(has_campaign)
+    per_row = [summaries[cid] for cid in ids.tolist()]
+    ready = np.fromiter((s["count"] >= min_samples for s in per_row), dtype=np.bool_, count=len(rows))
+    rows, per_row = rows[ready], [s for s, ok in zip(per_row, ready) if ok]
+
+    if len(rows):
+        def fill(name: str, values: List[float], keep_caller: bool = False) -> None:
+            target = rows
+            values = np.asarray(values, dtype=np.float64)
+            if keep_caller:
+                missing = ~columns.present[name][rows]
+                target, values = rows[missing], values[missing]
+            columns.values[name][target] = values
+            columns.present[name][target] = True
+
+        fill("campaign_avg_engagement_rate", [s["engagement_rate"]["mean"] for s in per_row], keep_caller=True)
+        fill("campaign_avg_views", [s["views"]["mean"] for s in per_row], keep_caller=True)
+        fill("campaign_baseline_samples", [s["count"] for s in per_row])
+        fill("campaign_engagement_rate_std", [s["engagement_rate"]["std"] for s in per_row])
+        fill("campaign_engagement_rate_p90", [s["engagement_rate"]["p90"] for s in per_row])
+        fill("campaign_views_p90", [s["views"]["p90"] for s in per_row])
+        fill("campaign_velocity_avg", [s["velocity"]["mean"] for s in per_row])
+        fill("campaign_velocity_p90", [s["velocity"]["p90"] for s in per_row])
+
+    return len(rows)
+
+
+def record_campaign_values(columns, store: CampaignBaselineStore) -> None:
+    """Add the batch's rows with a campaign_id to their baselines (once per video_id)"""
+    campaign_ids = columns["campaign_id"]
+    has_campaign = campaign_ids != None  # noqa: E711 - elementwise None check
+    if has_campaign.any():
+        metrics = batch_metrics(columns)
+        store.update(
+            campaign_ids[has_campaign],
+            {metric: values[has_campaign] for metric, values in metrics.items()},
+            columns["video_id"][has_campaign],
+        )
+
+
+def apply_campaign_baselines(columns, store: CampaignBaselineStore, min_samples: int) -> int:
+    """
+    Fill campaign columns from each row's campaign baseline, then add the batch
+    to the store. Rows are compared with the baseline as it was before this
+    batch; averages sent by the caller are kept. Returns the number of rows
+    that got a baseline.
+    """
+    filled = fill_campaign_baselines(columns, store, min_samples)
+    record_campaign_values(columns, store)
+    return filled
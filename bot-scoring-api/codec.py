@@ -0,0 +1,167 @@
+"""
+Fast JSON decoding and encoding for large request/response models.
+
+A /score body can hold 100 submissions with 1000 comments each. FastAPI's
+default path parses it with json.loads, validates the resulting dicts with
+pydantic, and re-validates the response against response_model before
+json.dumps. ModelCodec instead:
+
+- decodes with msgspec into Structs generated from the pydantic model, then
+  builds the models with model_construct (no second validation pass);
+  without msgspec it does what FastAPI does (json.loads + model_validate),
+  which benchmarks faster than model_validate_json on comment-heavy bodies
+- encodes responses straight to JSON bytes with pydantic's serializer
+
+Decoding gains are bounded by creating the comment strings themselves;
+most of the saving is on the response side (see benchmarks/).
+
+msgspec decodes in strict mode, which accepts a subset of what pydantic
+accepts (lax mode does not: it parses "1e3" into an int field, which
+pydantic rejects), so anything msgspec rejects is re-decoded by pydantic,
+which either accepts it or raises the usual ValidationError. Models decoded
+this way must not depend on custom validators.
+"""
+
+import json
+import types
+from typing import Annotated, Any, Callable, Dict, Generic, List, Optional, Type, TypeVar, Union, get_args, get_origin
+
+import annotated_types
+
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+try:
+    import msgspec
+except ImportError:  # Optional - falls back to json.loads + pydantic validation
+    msgspec = None
+
+M = TypeVar("M", bound=BaseModel)
+
+_STRUCTS: Dict[Type[BaseModel], type] = {}
+
+
+def msgspec_available() -> bool:
+    return msgspec is not None
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+# annotated_types bounds that have a msgspec.Meta equivalent
+_BOUNDS = {annotated_types.Ge: "ge", annotated_types.Le: "le", annotated_types.Gt: "gt", annotated_types.Lt: "lt"}
+
+
+def _with_bounds(annotation: Any, metadata: List[Any]) -> Any:
+    """annotation wrapped in a msgspec.Meta carrying the numeric bounds from pydantic metadata"""
+    bounds = {}
+    for item in metadata:
+        for constraint in getattr(item, "metadata", [item]):  # Field(...) holds its own metadata
+            key = _BOUNDS.get(type(constraint))
+            if key is not None:
+                bounds[key] = getattr(constraint, key)
+    return Annotated[annotation, msgspec.Meta(**bounds)] if bounds else annotation
+
+
+def _struct_annotation(annotation: Any) -> Any:
+    """Translate a pydantic field annotation, swapping nested models for Structs"""
+    if _is_model(annotation):
+        return struct_for_model(annotation)
+    origin = get_origin(annotation)
+    if origin is None:
+        return annotation
+    if origin is Annotated:
+        base, *metadata = get_args(annotation)
+        return _with_bounds(_struct_annotation(base), metadata)
+    args = tuple(_struct_annotation(arg) for arg in get_args(annotation))
+    if origin in (Union, types.UnionType):
+        return Union[args]
+    if origin is list:
+        return List[args[0]]
+    if origin is dict:
+        return Dict[args[0], args[1]]
+    raise TypeError(f"Unsupported annotation for msgspec decoding: {annotation!r}")
+
+
+def struct_for_model(model: Type[BaseModel]) -> type:
+    """msgspec Struct with the same fields, types and defaults as a pydantic model"""
+    struct = _STRUCTS.get(model)
+    if struct is None:
+        fields = []
+        for name, field in model.model_fields.items():
+            annotation = _with_bounds(_struct_annotation(field.annotation), field.metadata)
+            if field.default is PydanticUndefined:
+                fields.append((name, annotation))
+            else:
+                fields.append((name, annotation, field.default))
+        struct = _STRUCTS[model] = msgspec.defstruct(model.__name__, fields, kw_only=True)
+    return struct
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Function turning a decoded field value back into models, or None if no models are inside"""
+    if _is_model(annotation):
+        return _StructConverter(annotation)
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        converters = [c for c in map(_converter, get_args(annotation)) if c is not None]
+        if not converters:
+            return None
+        if len(converters) > 1:
+            raise TypeError(f"Unions of several models aren't supported: {annotation!r}")
+        inner = converters[0]
+        return lambda value: None if value is None else inner(value)
+    if origin is list:
+        inner = _converter(get_args(annotation)[0])
+        return None if inner is None else (lambda values: [inner(v) for v in values])
+    return None
+
+
+class _StructConverter:
+    """Builds a model from its Struct with model_construct, recursing into nested models"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = list(model.model_fields)
+        self.nested = {}
+        for name, field in model.model_fields.items():
+            convert = _converter(field.annotation)
+            if convert is not None:
+                self.nested[name] = convert
+
+    def __call__(self, struct: Any) -> BaseModel:
+        values = {name: getattr(struct, name) for name in self.fields}
+        for name, convert in self.nested.items():
+            values[name] = convert(values[name])
+        return self.model.model_construct(**values)
+
+
+class ModelCodec(Generic[M]):
+    """JSON bytes <-> a pydantic model, using msgspec for decoding when available"""
+
+    def __init__(self, model: Type[M], use_msgspec: bool = True):
+        self.model = model
+        self.use_msgspec = use_msgspec and msgspec_available()
+        if self.use_msgspec:
+            self._decoder = msgspec.json.Decoder(struct_for_model(model), strict=True)
+            self._from_struct = _StructConverter(model)
+
+    def decode(self, body: bytes) -> M:
+        """Parse and validate a JSON body; raises pydantic.ValidationError if invalid"""
+        if self.use_msgspec:
+            try:
+                return self._from_struct(self._decoder.decode(body))
+            except (msgspec.ValidationError, msgspec.DecodeError):
+                pass  # pydantic decides: it may accept lax input, else it raises
+        try:
+            data = json.loads(body)
+        except ValueError:
+            # Let pydantic report the malformed JSON as a json_invalid error
+            return self.model.model_validate_json(body)
+        return self.model.model_validate(data)
+
+    @staticmethod
+    def encode(instance: BaseModel) -> bytes:
+        """Serialize a model to JSON bytes without re-validating it"""
+        return instance.__pydantic_serializer__.to_json(instance)
@@ -0,0 +1,269 @@
+"""
+Near-duplicate comments across videos, with MinHash and LSH.
+
+Bot farms post the same (lightly edited) comments under many creators'
+videos. analyze_comments() only sees one video at a time, and comparing
+every pair of comments across videos is quadratic. CrossVideoCommentIndex
+keeps MinHash signatures of recent comments in a fixed-size ring and
+buckets them by LSH band, so each comment is checked against a handful of
+candidates instead of every comment seen:
+
+- comments are normalized (lowercased, whitespace collapsed) and cut into
+  character shingles; short comments are skipped, as generic one-liners
+  are already covered by the generic-pattern metrics
+- shingling, hashing and MinHash run as NumPy operations over all of a
+  batch's comments at once
+- a candidate from another video counts as a match when the signatures'
+  estimated Jaccard similarity reaches `threshold`
+- memory is bounded: `max_entries` signatures, LSH buckets capped at
+  `max_bucket_size` (newest kept); the oldest comment is evicted first
+
+Videos are told apart by the key the caller passes, so re-scoring a video
+never matches itself. Rows without a stable key (no video_id) are matched
+like any other but taken back out of the index afterwards: nothing links a
+later resend to them, so keeping them would let it match itself.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Shingles are hashed in chunks of about this many to bound the (num_perm, n) temporary
+_SHINGLE_CHUNK = 200_000
+
+
+def normalize_comment(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class CrossVideoCommentIndex:
+    """Rolling MinHash/LSH index of recent comments, keyed by video"""
+
+    def __init__(
+        self,
+        num_perm: int = 32,
+        bands: int = 8,
+        shingle_size: int = 5,
+        min_length: int = 20,
+        threshold: float = 0.6,
+        max_entries: int = 50_000,
+        max_bucket_size: int = 64,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_length = max(min_length, shingle_size)
+        self.threshold = threshold
+        self.max_entries = max(int(max_entries), 1)
+        self.max_bucket_size = max_bucket_size
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._shingle_powers = rng.integers(1, 2 ** 63, shingle_size, dtype=np.uint64) | np.uint64(1)
+        self._band_mix = rng.integers(1, 2 ** 63, self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self._signatures = np.zeros((self.max_entries, num_perm), dtype=np.uint32)
+        self._slot_videos = np.zeros(self.max_entries, dtype=np.int64)  # hash() of the video key
+        self._slot_keys: List[Optional[Tuple[str, int]]] = [None] * self.max_entries
+        self._slot_bands: List[Optional[List[int]]] = [None] * self.max_entries
+        self._slots: Dict[Tuple[str, int], int] = {}
+        self._buckets: List[Dict[int, Deque[int]]] = [{} for _ in range(bands)]
+        self._next_slot = 0
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Signatures
+    # -------------------------------------------------------------------------
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), num_perm) MinHash signatures of normalized texts"""
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        if not texts:
+            return out
+        encoded = [text.encode("utf-8", "surrogatepass") for text in texts]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        k = self.shingle_size
+        n_shingles = np.maximum(lengths - k + 1, 1)
+
+        # Each text's shingle hashes, computed over the concatenated bytes
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        if len(buffer) < k:
+            buffer = np.concatenate([buffer, np.zeros(k - len(buffer), dtype=np.uint64)])
+        window_hashes = sliding_window_view(buffer, k) @ self._shingle_powers
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        segment_starts = np.concatenate(([0], np.cumsum(n_shingles)[:-1]))
+        positions = np.arange(n_shingles.sum()) - np.repeat(segment_starts - offsets, n_shingles)
+        shingles = window_hashes[np.minimum(positions, len(window_hashes) - 1)]
+
+        # MinHash, a chunk of whole texts at a time
+        start = 0
+        while start < len(texts):
+            stop = int(np.searchsorted(segment_starts, segment_starts[start] + _SHINGLE_CHUNK, side="right"))
+            stop = max(stop, start + 1)
+            first = segment_starts[start]
+            last = segment_starts[stop] if stop < len(texts) else len(shingles)
+            hashed = (self._a[:, None] * shingles[None, first:last] + self._b[:, None]) >> np.uint64(32)
+            out[start:stop] = np.minimum.reduceat(hashed, segment_starts[start:stop] - first, axis=1).T
+            start = stop
+        return out
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """(n, bands) integer key of each band"""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return bands @ self._band_mix
+
+    # -------------------------------------------------------------------------
+    # Index
+    # -------------------------------------------------------------------------
+
+    def _evict(self, slot: int) -> None:
+        key = self._slot_keys[slot]
+        if key is None:
+            return
+        del self._slots[key]
+        for band, band_key in enumerate(self._slot_bands[slot]):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                try:
+                    bucket.remove(slot)
+                except ValueError:
+                    pass  # Already dropped from a full bucket
+                if not bucket:
+                    del self._buckets[band][band_key]
+        self._slot_keys[slot] = None
+        self._slot_bands[slot] = None
+
+    def _add(self, key: Tuple[str, int], signature: np.ndarray, band_keys: List[int]) -> None:
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.max_entries
+        self._evict(slot)
+        self._signatures[slot] = signature
+        self._slot_videos[slot] = hash(key[0])
+        self._slot_keys[slot] = key
+        self._slot_bands[slot] = band_keys
+        self._slots[key] = slot
+        for band, band_key in enumerate(band_keys):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is None:
+                bucket = self._buckets[band][band_key] = deque(maxlen=self.max_bucket_size)
+            bucket.append(slot)
+
+    def _similar_videos(self, signatures: np.ndarray, band_keys: List[List[int]]) -> List[set]:
+        """Per signature, the videos (as hash of key) with a comment whose estimated Jaccard reaches the threshold"""
+        pair_text: List[int] = []
+        pair_slot: List[int] = []
+        for i, keys in enumerate(band_keys):
+            candidates = set()
+            for band, band_key in enumerate(keys):
+                bucket = self._buckets[band].get(band_key)
+                if bucket:
+                    candidates.update(bucket)
+            pair_text.extend([i] * len(candidates))
+            pair_slot.extend(candidates)
+
+        pair_text = np.array(pair_text, dtype=np.int64)
+        pair_slot = np.array(pair_slot, dtype=np.int64)
+        kept = []
+        step = max(_SHINGLE_CHUNK // self.num_perm, 1)
+        for start in range(0, len(pair_text), step):
+            texts = pair_text[start:start + step]
+            slots = pair_slot[start:start + step]
+            agreement = (signatures[texts] == self._signatures[slots]).mean(axis=1)
+            keep = agreement >= self.threshold
+            kept.append(np.column_stack((texts[keep], self._slot_videos[slots[keep]])))
+
+        similar = [set() for _ in range(len(signatures))]
+        if kept:
+            # Pairs were generated text by text, so each text's matches are contiguous
+            pairs = np.concatenate(kept)
+            bounds = np.flatnonzero(np.diff(pairs[:, 0])) + 1
+            starts = np.concatenate(([0], bounds)).tolist()
+            videos = pairs[:, 1].tolist()
+            for text, start, stop in zip(pairs[starts, 0].tolist(), starts, starts[1:] + [len(videos)]):
+                similar[text] = set(videos[start:stop])
+        return similar
+
+    def add_and_match(
+        self,
+        video_keys: Sequence[str],
+        comment_lists: Sequence[Optional[Sequence[str]]],
+        keep: Optional[Sequence[bool]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Add each video's comments to the index, then match them against every
+        other video in it (this batch included). Videos with keep False are
+        removed again once matched (keys must still be unique in the batch).
+        Returns per video: comments checked, comments with a near-duplicate
+        elsewhere, and how many other videos those near-duplicates came from.
+        """
+        n = len(video_keys)
+        checked = np.zeros(n, dtype=np.int64)
+        matched = np.zeros(n, dtype=np.int64)
+        videos = np.zeros(n, dtype=np.int64)
+
+        # Unique normalized comments per video, long enough to say something
+        per_video: List[List[str]] = []
+        for comments in comment_lists:
+            texts = {normalize_comment(c) for c in comments or ()}
+            per_video.append([t for t in texts if len(t) >= self.min_length])
+        unique_texts = list({t for texts in per_video for t in texts})
+        if not unique_texts:
+            return checked, matched, videos
+
+        text_index = {t: i for i, t in enumerate(unique_texts)}
+        signatures = self.signatures(unique_texts)
+        band_keys = self._band_keys(signatures).tolist()
+
+        keep = [True] * n if keep is None else list(keep)
+        with self._lock:
+            # Kept videos first, so the transient ones sit just behind the cursor
+            transient = 0
+            for kept_pass in (True, False):
+                for video, texts, kept in zip(video_keys, per_video, keep):
+                    if kept != kept_pass:
+                        continue
+                    for text in texts:
+                        i = text_index[text]
+                        key = (video, hash(text))
+                        if key not in self._slots:
+                            self._add(key, signatures[i], band_keys[i])
+                            transient += not kept
+
+            similar = self._similar_videos(signatures, band_keys)
+
+            # Free the transient slots and rewind, so they don't take ring space
+            for _ in range(min(transient, self.max_entries)):
+                self._next_slot = (self._next_slot - 1) % self.max_entries
+                self._evict(self._next_slot)
+
+        for row, (video, texts) in enumerate(zip(video_keys, per_video)):
+            own = hash(video)
+            other_videos = set()
+            for text in texts:
+                found = similar[text_index[text]]
+                if len(found) > (own in found):
+                    matched[row] += 1
+                    other_videos |= found
+            other_videos.discard(own)
+            checked[row] = len(texts)
+            videos[row] = len(other_videos)
+        return checked, matched, videos
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "buckets": sum(len(b) for b in self._buckets),
+        }
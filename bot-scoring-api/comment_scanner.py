@@ -0,0 +1,125 @@
+"""
+Single-pass comment scanner.
+
+Computes every comment metric used by the Bot Scoring API in one walk over
+the unique comments of a list, weighting each by how often it occurs.
+All generic-bot patterns are matched with one combined alternation.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Emoji runs - compiled once instead of on every analysis
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "]+", flags=re.UNICODE
+)
+
+SHORT_COMMENT_LENGTH = 5  # Stripped comments shorter than this count as short
+
+
+def combine_patterns(patterns: Iterable[str]) -> "re.Pattern[str]":
+    """
+    Fuse regex patterns into one alternation.
+    match() on the result succeeds exactly when any single pattern matches.
+    """
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+class CommentScanner:
+    """
+    Fused comment analyzer.
+    scan() returns the same metrics as the original per-pattern loop.
+    """
+
+    def __init__(self, generic_patterns: Iterable[str]):
+        self.generic_pattern = combine_patterns(generic_patterns)
+
+    def scan(self, comments: List[str]) -> Dict[str, float]:
+        if not comments:
+            return {
+                "total_comments": 0,
+                "avg_length": 0,
+                "emoji_ratio": 0,
+                "generic_ratio": 0,
+                "duplicate_ratio": 0,
+                "short_comment_ratio": 0,
+                "bot_pattern_score": 0,
+            }
+
+        total = len(comments)
+        total_chars = 0
+        total_emojis = 0
+        short_comments = 0
+
+        # Each unique raw comment is measured once, weighted by its count
+        normalized_counts: Dict[str, int] = {}
+        find_emojis = EMOJI_PATTERN.findall
+        for comment, count in Counter(comments).items():
+            total_chars += len(comment) * count
+            if not comment.isascii():
+                total_emojis += len(find_emojis(comment)) * count
+
+            stripped = comment.strip()
+            if len(stripped) < SHORT_COMMENT_LENGTH:
+                short_comments += count
+
+            key = stripped.lower()
+            normalized_counts[key] = normalized_counts.get(key, 0) + count
+
+        # Generic patterns and duplicates work on the normalized text
+        generic_count = 0
+        duplicates = 0
+        match_generic = self.generic_pattern.match
+        for key, count in normalized_counts.items():
+            if match_generic(key):
+                generic_count += count
+            if count > 1:
+                duplicates += count - 1
+
+        avg_length = total_chars / total
+        emoji_ratio = total_emojis / (total_chars or 1)
+        generic_ratio = generic_count / total
+        duplicate_ratio = duplicates / total
+        short_comment_ratio = short_comments / total
+
+        # Combined bot pattern score (0-100)
+        bot_pattern_score = min(100, (
+            generic_ratio * 40 +
+            duplicate_ratio * 30 +
+            short_comment_ratio * 20 +
+            (1 if emoji_ratio > 0.5 else 0) * 10
+        ))
+
+        return {
+            "total_comments": total,
+            "avg_length": avg_length,
+            "emoji_ratio": emoji_ratio,
+            "generic_ratio": generic_ratio,
+            "duplicate_ratio": duplicate_ratio,
+            "short_comment_ratio": short_comment_ratio,
+            "bot_pattern_score": bot_pattern_score,
+        }
+
+
+@lru_cache(maxsize=8)
+def _scanner_for(patterns: Tuple[str, ...]) -> CommentScanner:
+    return CommentScanner(patterns)
+
+
+def scan_many(patterns: Tuple[str, ...], comment_lists: Sequence[List[str]]) -> List[Dict[str, float]]:
+    """
+    scan() every comment list with a scanner for patterns.
+    Module-level so process-pool workers can run it; each worker compiles
+    the combined pattern once and reuses it across tasks.
+    """
+    scan = _scanner_for(tuple(patterns)).scan
+    return [scan(comments) for comments in comment_lists]
@@ -0,0 +1,356 @@
+"""
+Per-creator reputation kept by the service.
+
+Callers used to look up a creator's submission count, flag count and
+trust score before every scoring call. Submissions that carry a creator_id
+now update that creator's reputation from their own scoring outcome:
+
+- submissions, flags (bot_score >= flag_score) and the sum of bot scores
+  are kept as exponentially decayed counts with a half-life, so old
+  behaviour fades instead of counting forever
+- the trust score is 100 minus the decayed mean bot score, shrunk towards
+  100 by `trust_prior` pseudo-submissions so one bad score does not sink
+  a new creator
+- a submission with a video_id counts once per (creator_id, video_id): its
+  latest outcome is kept, and rescoring the video replaces that outcome
+  instead of adding another, so polling the same videos does not grow a
+  reputation on its own (submissions without a video_id count every time)
+- reputations live in an LRU of recently seen creators and are written to
+  SQLite in batches, like the campaign baselines
+
+apply_creator_reputation() fills the creator_* columns for rows that left
+them out, as the reputation was before the batch.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DAY_SECONDS = 86400.0
+OUTCOME_RETENTION_HALF_LIVES = 10  # Per-video outcomes older than this are forgotten
+
+# Submission columns filled from the reputation
+CREATOR_COLUMNS = ("creator_previous_submissions", "creator_previous_flags", "creator_trust_score")
+
+
+class CreatorReputation:
+    """Decayed submission, flag and bot-score sums as of updated_at"""
+
+    __slots__ = ("submissions", "flags", "score_sum", "updated_at")
+
+    def __init__(self, submissions: float = 0.0, flags: float = 0.0, score_sum: float = 0.0, updated_at: float = 0.0):
+        self.submissions = submissions
+        self.flags = flags
+        self.score_sum = score_sum
+        self.updated_at = updated_at
+
+    def add(self, weight: float, flagged: bool, bot_score: float) -> None:
+        """Add (or with a negative weight, take back) one outcome"""
+        self.submissions = max(self.submissions + weight, 0.0)
+        self.flags = max(self.flags + weight * flagged, 0.0)
+        self.score_sum = max(self.score_sum + weight * bot_score, 0.0)
+
+    def decay_to(self, now: float, half_life_seconds: float) -> None:
+        if self.updated_at and now > self.updated_at:
+            factor = 0.5 ** ((now - self.updated_at) / half_life_seconds)
+            self.submissions *= factor
+            self.flags *= factor
+            self.score_sum *= factor
+        self.updated_at = max(self.updated_at, now)
+
+    def trust_score(self, trust_prior: float) -> float:
+        total = self.submissions + trust_prior
+        if total <= 0:
+            return 100.0
+        return 100.0 - self.score_sum / total
+
+    def summary(self, trust_prior: float) -> dict:
+        return {
+            "submissions": self.submissions,
+            "flags": self.flags,
+            "trust_score": self.trust_score(trust_prior),
+            "updated_at": self.updated_at or None,
+        }
+
+
+class CreatorReputationStore:
+    """
+    Reputations by creator_id: an LRU of max_cached creators in memory,
+    backed by a SQLite table. Updates are written by flush(); a dirty
+    creator evicted from the LRU is written straight away.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_cached: int = 100_000,
+        half_life_days: float = 90.0,
+        flag_score: float = 60.0,
+        trust_prior: float = 3.0
+    ):
+        if half_life_days <= 0:
+            raise ValueError(f"half_life_days must be positive, got {half_life_days}")
+        self.db_path = db_path
+        self.max_cached = max(int(max_cached), 1)
+        self.half_life_seconds = half_life_days * DAY_SECONDS
+        self.flag_score = flag_score
+        self.trust_prior = max(trust_prior, 0.0)
+        self._cache: "OrderedDict[str, CreatorReputation]" = OrderedDict()
+        self._dirty: set = set()
+        # (creator_id, video_id) -> (bot_score, flagged, scored_at) not yet written
+        self._outcomes: Dict[Tuple[str, str], Tuple[float, bool, float]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS creator_reputation ("
+                " creator_id TEXT PRIMARY KEY,"
+                " submissions REAL NOT NULL,"
+                " flags REAL NOT NULL,"
+                " score_sum REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS creator_video_outcome ("
+                " creator_id TEXT NOT NULL,"
+                " video_id TEXT NOT NULL,"
+                " bot_score REAL NOT NULL,"
+                " flagged INTEGER NOT NULL,"
+                " scored_at REAL NOT NULL,"
+                " PRIMARY KEY (creator_id, video_id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS creator_video_outcome_scored_at ON creator_video_outcome (scored_at)")
+            self._conn = conn
+        return self._conn
+
+    def _load(self, creator_ids: Iterable[str]) -> None:
+        """Pull missing creators into the LRU (lock held; callers _evict() when done with them)"""
+        missing = [cid for cid in creator_ids if cid not in self._cache]
+        found = {}
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            rows = self._connection().execute(
+                "SELECT creator_id, submissions, flags, score_sum, updated_at FROM creator_reputation"
+                f" WHERE creator_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update({row[0]: CreatorReputation(*row[1:]) for row in rows})
+        for cid in missing:
+            self._cache[cid] = found.get(cid) or CreatorReputation()
+        for cid in creator_ids:
+            self._cache.move_to_end(cid)
+
+    def _evict(self) -> None:
+        evicted = []
+        while len(self._cache) > self.max_cached:
+            cid, reputation = self._cache.popitem(last=False)
+            if cid in self._dirty:
+                self._dirty.discard(cid)
+                evicted.append((cid, reputation))
+        if evicted:
+            self._write(evicted)
+
+    def _previous_outcomes(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[float, bool, float]]:
+        """Latest recorded outcome of each (creator_id, video_id) that has one (lock held)"""
+        found = {key: self._outcomes[key] for key in keys if key in self._outcomes}
+        missing = [key for key in keys if key not in found]
+        for start in range(0, len(missing), 250):
+            chunk = missing[start:start + 250]
+            rows = self._connection().execute(
+                "SELECT creator_id, video_id, bot_score, flagged, scored_at FROM creator_video_outcome"
+                f" WHERE (creator_id, video_id) IN (VALUES {','.join(['(?, ?)'] * len(chunk))})",
+                [part for key in chunk for part in key],
+            ).fetchall()
+            found.update({(row[0], row[1]): (row[2], bool(row[3]), row[4]) for row in rows})
+        return found
+
+    def _write(self, items: List, outcomes: Optional[Dict] = None) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO creator_reputation (creator_id, submissions, flags, score_sum, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(creator_id) DO UPDATE SET"
+                " submissions = excluded.submissions, flags = excluded.flags,"
+                " score_sum = excluded.score_sum, updated_at = excluded.updated_at",
+                [(cid, r.submissions, r.flags, r.score_sum, r.updated_at) for cid, r in items],
+            )
+            if outcomes:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO creator_video_outcome"
+                    " (creator_id, video_id, bot_score, flagged, scored_at) VALUES (?, ?, ?, ?, ?)",
+                    [(cid, vid, score, int(flagged), at) for (cid, vid), (score, flagged, at) in outcomes.items()],
+                )
+                # Outcomes this old have decayed below 0.1% of a submission
+                conn.execute(
+                    "DELETE FROM creator_video_outcome WHERE scored_at < ?",
+                    (max(at for _, _, at in outcomes.values()) - OUTCOME_RETENTION_HALF_LIVES * self.half_life_seconds,),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def lookup(self, creator_ids: Iterable[str], now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        CREATOR_COLUMNS values for each id, decayed to now
+        (previous submissions and flags rounded to whole counts, as the
+        request fields are).
+        """
+        ids = list(creator_ids)
+        now = time.time() if now is None else now
+        with self._lock:
+            self._load(list(dict.fromkeys(ids)))
+            reputations = {cid: self._cache[cid] for cid in ids}
+            for reputation in reputations.values():
+                reputation.decay_to(now, self.half_life_seconds)
+            rows = [reputations[cid] for cid in ids]
+            submissions = np.fromiter((r.submissions for r in rows), dtype=np.float64, count=len(rows))
+            flags = np.fromiter((r.flags for r in rows), dtype=np.float64, count=len(rows))
+            trust = np.fromiter((r.trust_score(self.trust_prior) for r in rows), dtype=np.float64, count=len(rows))
+            self._evict()
+        return {
+            "creator_previous_submissions": np.rint(submissions).astype(np.int64),
+            "creator_previous_flags": np.rint(flags).astype(np.int64),
+            "creator_trust_score": trust,
+        }
+
+    def update(
+        self,
+        creator_ids: np.ndarray,
+        bot_scores: np.ndarray,
+        video_ids: Optional[np.ndarray] = None,
+        now: Optional[float] = None
+    ) -> None:
+        """
+        Add scoring outcomes to their creators; bot_scores and video_ids
+        (None entries allowed) are aligned with creator_ids. An outcome for
+        a video the creator already has one for replaces it.
+        """
+        now = time.time() if now is None else now
+        creator_ids = np.asarray(creator_ids, dtype=object).astype(str)
+        bot_scores = np.asarray(bot_scores, dtype=np.float64)
+        if video_ids is None:
+            video_ids = np.full(len(creator_ids), None, dtype=object)
+        has_video = np.asarray(video_ids, dtype=object) != None  # noqa: E711 - elementwise None check
+
+        # Without a video_id every outcome counts
+        unique, inverse = np.unique(creator_ids[~has_video], return_inverse=True)
+        scores = bot_scores[~has_video]
+        counts = np.bincount(inverse, minlength=len(unique))
+        flags = np.bincount(inverse, weights=scores >= self.flag_score, minlength=len(unique))
+        score_sums = np.bincount(inverse, weights=scores, minlength=len(unique))
+
+        # With one, the last outcome per (creator, video) in the batch
+        latest = {
+            (cid, str(vid)): float(score)
+            for cid, vid, score in zip(creator_ids[has_video], np.asarray(video_ids)[has_video], bot_scores[has_video])
+        }
+        ids = list(dict.fromkeys(unique.tolist() + [cid for cid, _ in latest]))
+        with self._lock:
+            self._load(ids)
+            for cid in ids:
+                self._cache[cid].decay_to(now, self.half_life_seconds)
+                self._dirty.add(cid)
+            for cid, count, flag_count, score_sum in zip(unique.tolist(), counts.tolist(), flags.tolist(), score_sums.tolist()):
+                reputation = self._cache[cid]
+                reputation.submissions += count
+                reputation.flags += flag_count
+                reputation.score_sum += score_sum
+            previous = self._previous_outcomes(list(latest))
+            for key, score in latest.items():
+                reputation = self._cache[key[0]]
+                if key in previous:
+                    # Take back the old outcome as it has decayed since
+                    old_score, old_flagged, scored_at = previous[key]
+                    weight = 0.5 ** (max(now - scored_at, 0.0) / self.half_life_seconds)
+                    reputation.add(-weight, old_flagged, old_score)
+                flagged = score >= self.flag_score
+                reputation.add(1.0, flagged, score)
+                self._outcomes[key] = (score, flagged, now)
+            self._evict()
+
+    def summaries(self, creator_ids: Iterable[str], now: Optional[float] = None) -> Dict[str, dict]:
+        """Current reputation per creator (zero counts for unseen creators)"""
+        ids = list(dict.fromkeys(creator_ids))
+        now = time.time() if now is None else now
+        with self._lock:
+            self._load(ids)
+            result = {}
+            for cid in ids:
+                reputation = self._cache[cid]
+                reputation.decay_to(now, self.half_life_seconds)
+                result[cid] = reputation.summary(self.trust_prior)
+            self._evict()
+            return result
+
+    def flush(self) -> int:
+        """Write dirty creators and new video outcomes to SQLite; returns how many creators were written"""
+        with self._lock:
+            items = [(cid, self._cache[cid]) for cid in self._dirty if cid in self._cache]
+            outcomes = self._outcomes
+            self._dirty.clear()
+            self._outcomes = {}
+            if items or outcomes:
+                self._write(items, outcomes)
+        return len(items)
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "dirty": len(self._dirty),
+            "pending_outcomes": len(self._outcomes),
+            "half_life_days": self.half_life_seconds / DAY_SECONDS,
+            "db_path": self.db_path,
+        }
+
+
+def apply_creator_reputation(columns, store: CreatorReputationStore) -> int:
+    """
+    Fill the creator_* columns the caller left out from each row's creator
+    reputation; values sent by the caller are kept. Returns the number of
+    rows that had a creator_id.
+    """
+    creator_ids = columns["creator_id"]
+    has_creator = creator_ids != None  # noqa: E711 - elementwise None check
+    if not has_creator.any():
+        return 0
+
+    rows = np.flatnonzero(has_creator)
+    reputation = store.lookup(creator_ids[rows].tolist())
+    for name, values in reputation.items():
+        missing = ~columns.present[name][rows]
+        target = rows[missing]
+        columns.values[name][target] = values[missing]
+        columns.present[name][target] = True
+    return len(rows)
+
+
+def record_creator_outcomes(columns, bot_scores: np.ndarray, store: CreatorReputationStore) -> None:
+    """Add the batch's bot scores to the reputations of rows with a creator_id (once per video_id)"""
+    creator_ids = columns["creator_id"]
+    has_creator = creator_ids != None  # noqa: E711 - elementwise None check
+    if has_creator.any():
+        store.update(
+            creator_ids[has_creator], np.asarray(bot_scores)[has_creator], columns["video_id"][has_creator]
+        )
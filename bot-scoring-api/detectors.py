@@ -0,0 +1,407 @@
+"""
+PyOD detector ensemble for the Bot Scoring API.
+
+Two ways to get ML scores for a feature matrix:
+- fit_batch_scores(): fit IForest, LOF and ECOD on the batch itself
+  (no training data needed, scores are relative to the batch); LOF runs
+  on the batch's shared neighbour graph (see knn_index.py). An EnsembleSpec picks
+  the detectors, their parameters and the combiner; the detectors are
+  fitted concurrently in threads, as their numeric code mostly runs
+  without the GIL
+- PretrainedEnsemble: detectors fitted offline on a historical corpus,
+  scored with decision_function only (see model_registry.py / train.py)
+
+PyOD (and with it scikit-learn, scipy and numba) is imported on first use,
+so importing this module is cheap; import_detector_stack() loads it up front.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from attribution import ReferenceDistribution, reference_for_detectors
+from knn_index import NeighborGraph, standardize
+
+DEFAULT_CONTAMINATION = 0.1  # Assume ~10% fraud rate
+N_NEIGHBORS = 5  # For LOF and kNN
+
+
+def import_detector_stack() -> float:
+    """Import PyOD and scikit-learn now instead of on first use; returns the seconds taken"""
+    start = time.perf_counter()
+    import pyod.models.combination  # noqa: F401
+    import pyod.models.ecod  # noqa: F401
+    import pyod.models.iforest  # noqa: F401
+    import pyod.models.lof  # noqa: F401
+    import sklearn.neighbors  # noqa: F401
+    return time.perf_counter() - start
+
+
+# PyOD combiners for (n_samples, n_detectors) raw scores
+COMBINERS = ("average", "maximization", "median")
+# Combiners that pick one detector's score per row, which only means
+# something once the scores share a scale
+STANDARDIZED_COMBINERS = ("maximization", "median")
+
+
+def combine_scores(scores: np.ndarray, combiner: str = "average", standardize: bool = False) -> np.ndarray:
+    """
+    Combine per-detector scores into one per row. Raw scores are on each
+    detector's own scale; standardize z-scores them first, which
+    maximization and median require.
+    """
+    from pyod.models import combination
+
+    if combiner not in COMBINERS:
+        raise ValueError(f"Unknown combiner {combiner!r}, expected one of {COMBINERS}")
+    if combiner in STANDARDIZED_COMBINERS and not standardize:
+        raise ValueError(f"The {combiner} combiner needs standardized scores")
+    if standardize:
+        from pyod.utils.utility import standardizer
+        scores = standardizer(scores)
+    return getattr(combination, combiner)(scores)
+
+
+def build_detectors(
+    n_samples: int,
+    contamination: float = DEFAULT_CONTAMINATION,
+    params: Optional[Dict[str, Dict[str, Any]]] = None,
+    names: Iterable[str] = ("iforest", "lof", "ecod")
+) -> Dict[str, object]:
+    """Unfitted detectors named in names, with the service's standard parameters updated from params[name]"""
+    from pyod.models.ecod import ECOD
+    from pyod.models.iforest import IForest
+    from pyod.models.lof import LOF
+
+    params = params or {}
+    constructors = {
+        # Isolation Forest - good for high-dimensional anomalies
+        "iforest": lambda: IForest(**{
+            "contamination": contamination, "random_state": 42, "n_estimators": 100, **params.get("iforest", {})
+        }),
+        # Local Outlier Factor - good for density-based anomalies
+        # (KD-tree: scikit-learn's default is brute force for 20 features)
+        "lof": lambda: LOF(contamination=contamination, n_neighbors=min(N_NEIGHBORS, n_samples - 1), algorithm="kd_tree"),
+        # ECOD - good for tail-based anomalies
+        "ecod": lambda: ECOD(**{"contamination": contamination, **params.get("ecod", {})}),
+    }
+    return {name: constructors[name]() for name in names}
+
+
+def run_concurrently(
+    jobs: Dict[str, Callable[[], Any]],
+    threads: Optional[int] = None,
+    timings: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Call every job, up to threads at once (None = all of them), and return
+    their results by name. Each job's own run time goes into timings.
+    """
+    if timings is None:
+        timings = {}
+
+    def timed(name: str) -> Any:
+        start = time.perf_counter()
+        result = jobs[name]()
+        timings[name] = time.perf_counter() - start
+        return result
+
+    threads = min(threads or len(jobs), len(jobs))
+    if threads <= 1:
+        return {name: timed(name) for name in jobs}
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="detector") as pool:
+        futures = {name: pool.submit(timed, name) for name in jobs}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def fit_detectors(
+    feature_vectors: np.ndarray,
+    contamination: float = DEFAULT_CONTAMINATION,
+    timings: Optional[Dict[str, float]] = None
+) -> Tuple[Dict[str, object], np.ndarray]:
+    """
+    Fit every detector on the matrix; returns the models and combined training scores.
+    Pass a timings dict to collect each detector's fit time in seconds.
+    """
+    detectors = build_detectors(len(feature_vectors), contamination)
+    jobs = {name: (lambda d=detector: d.fit(feature_vectors).decision_scores_) for name, detector in detectors.items()}
+    detector_scores = run_concurrently(jobs, timings=timings)
+
+    # Combiners expect (n_samples, n_detectors)
+    return detectors, combine_scores(np.column_stack(list(detector_scores.values())))
+
+
+# Detectors fitted per batch by fit_batch_scores(); "knn" is also available
+DEFAULT_BATCH_DETECTORS = ("iforest", "lof", "ecod")
+BATCH_DETECTOR_NAMES = ("iforest", "lof", "ecod", "knn")
+
+# Parameters an EnsembleSpec may set per detector. IForest and ECOD take
+# them as PyOD arguments; LOF and kNN read them off the neighbour graph.
+DETECTOR_PARAMS = {
+    "iforest": ("n_estimators", "max_samples", "max_features", "bootstrap", "n_jobs", "random_state"),
+    "lof": ("n_neighbors",),
+    "ecod": ("n_jobs",),
+    "knn": ("n_neighbors", "method"),
+}
+GRAPH_DETECTORS = ("lof", "knn")
+
+
+@dataclass
+class EnsembleSpec:
+    """
+    Which detectors fit_batch_detectors() runs, in order, with their
+    parameters, and how their scores are combined. standardize defaults to
+    on for maximization and median, which can't be used without it.
+    threads caps how many fit at once (None = all, 1 = one after another).
+    """
+    detectors: Dict[str, Dict[str, Any]] = field(
+        default_factory=lambda: {name: {} for name in DEFAULT_BATCH_DETECTORS}
+    )
+    combiner: str = "average"
+    standardize: Optional[bool] = None
+    threads: Optional[int] = None
+
+    def __post_init__(self):
+        if not self.detectors:
+            raise ValueError("An ensemble needs at least one detector")
+        unknown = set(self.detectors) - set(BATCH_DETECTOR_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown detectors: {sorted(unknown)}")
+        for name, params in self.detectors.items():
+            bad = set(params) - set(DETECTOR_PARAMS[name])
+            if bad:
+                raise ValueError(f"Unknown {name} parameters {sorted(bad)}, expected some of {DETECTOR_PARAMS[name]}")
+        if self.combiner not in COMBINERS:
+            raise ValueError(f"Unknown combiner {self.combiner!r}, expected one of {COMBINERS}")
+        if self.standardize is None:
+            self.standardize = self.combiner in STANDARDIZED_COMBINERS
+        elif self.combiner in STANDARDIZED_COMBINERS and not self.standardize:
+            raise ValueError(f"The {self.combiner} combiner needs standardize, raw detector scores don't share a scale")
+        if self.threads is not None and self.threads < 1:
+            raise ValueError(f"threads must be at least 1, got {self.threads}")
+
+    @classmethod
+    def from_names(
+        cls,
+        names: Iterable[str],
+        defaults: Optional[Dict[str, Dict[str, Any]]] = None,
+        **options: Any
+    ) -> "EnsembleSpec":
+        """Named detectors with default parameters (plus defaults[name])"""
+        defaults = defaults or {}
+        return cls(detectors={name: dict(defaults.get(name, {})) for name in names}, **options)
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: Optional[Dict[str, Dict[str, Any]]] = None) -> "EnsembleSpec":
+        """
+        Parse {"detectors": ["lof", {"name": "iforest", "params": {...}}, ...],
+        "combiner": "average", "standardize": null, "threads": null};
+        defaults[name] fills parameters an entry leaves out.
+        """
+        defaults = defaults or {}
+        detectors: Dict[str, Dict[str, Any]] = {}
+        for entry in data.get("detectors") or ():
+            if isinstance(entry, str):
+                entry = {"name": entry}
+            try:
+                name = str(entry["name"])
+                params = dict(entry.get("params") or {})
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Detector entries need a 'name': {entry!r}") from e
+            if name in detectors:
+                raise ValueError(f"Detector {name!r} listed twice")
+            detectors[name] = {**defaults.get(name, {}), **params}
+        return cls(
+            detectors=detectors,
+            combiner=str(data.get("combiner", "average")),
+            standardize=bool(data["standardize"]) if data.get("standardize") is not None else None,
+            threads=int(data["threads"]) if data.get("threads") is not None else None,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "detectors": [{"name": name, "params": params} for name, params in self.detectors.items()],
+            "combiner": self.combiner,
+            "standardize": self.standardize,
+            "threads": self.threads,
+        }
+
+
+DEFAULT_ENSEMBLE = EnsembleSpec()
+
+
+def fit_batch_detectors(
+    feature_vectors: np.ndarray,
+    contamination: float = DEFAULT_CONTAMINATION,
+    ensemble: EnsembleSpec = DEFAULT_ENSEMBLE,
+    timings: Optional[Dict[str, float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score the batch against itself with the ensemble's detectors and return
+    the combined raw scores and each row's standardized distance to its
+    nearest other row. LOF, kNN and that distance share one neighbour
+    graph on the standardized matrix, so only the models that need a
+    fitted object (IForest, ECOD) go through PyOD. The graph and those
+    models are fitted concurrently.
+    """
+    if timings is None:
+        timings = {}
+
+    n_samples = len(feature_vectors)
+    neighbors = {
+        name: min(ensemble.detectors[name].get("n_neighbors", N_NEIGHBORS), n_samples - 1)
+        for name in GRAPH_DETECTORS if name in ensemble.detectors
+    }
+    pyod_names = [name for name in ensemble.detectors if name not in GRAPH_DETECTORS]
+    pyod_detectors = build_detectors(n_samples, contamination, ensemble.detectors, pyod_names)
+
+    # Without a graph detector only the nearest neighbour is needed
+    k = max(neighbors.values(), default=1)
+    jobs = {"knn_graph": lambda: NeighborGraph.build(standardize(feature_vectors), k)}
+    for name in pyod_names:
+        jobs[name] = lambda d=pyod_detectors[name]: d.fit(feature_vectors).decision_scores_
+    results = run_concurrently(jobs, ensemble.threads, timings)
+
+    graph = results["knn_graph"]
+    detector_scores = []
+    for name in ensemble.detectors:
+        start = time.perf_counter()
+        if name == "lof":
+            results[name] = graph.lof_scores(neighbors[name])
+        elif name == "knn":
+            results[name] = graph.knn_scores(neighbors[name], ensemble.detectors[name].get("method", "largest"))
+        if name in GRAPH_DETECTORS:
+            timings[name] = time.perf_counter() - start
+        detector_scores.append(results[name])
+
+    # Combiners expect (n_samples, n_detectors)
+    combined = combine_scores(np.column_stack(detector_scores), ensemble.combiner, ensemble.standardize)
+    return combined, graph.nearest_distances()
+
+
+def fit_batch_scores(feature_vectors: np.ndarray, contamination: float = DEFAULT_CONTAMINATION) -> np.ndarray:
+    """
+    Fit the ensemble on the batch itself and return combined raw scores.
+    Higher = more anomalous relative to the rest of the batch.
+    """
+    return fit_batch_detectors(feature_vectors, contamination)[0]
+
+
+def fit_batch_scores_timed(
+    feature_vectors: np.ndarray,
+    contamination: float = DEFAULT_CONTAMINATION,
+    ensemble: EnsembleSpec = DEFAULT_ENSEMBLE
+) -> Tuple[np.ndarray, Dict[str, float], np.ndarray]:
+    """
+    fit_batch_detectors() plus per-detector seconds, as (scores, timings,
+    nearest distances). Returns plain data so it survives the trip back
+    from a worker process.
+    """
+    timings: Dict[str, float] = {}
+    scores, nearest_distances = fit_batch_detectors(feature_vectors, contamination, ensemble, timings)
+    return scores, timings, nearest_distances
+
+
+def normalize_batch_scores(combined_scores: np.ndarray) -> np.ndarray:
+    """Min-max normalize combined scores to 0-100 within the batch"""
+    min_score = combined_scores.min()
+    max_score = combined_scores.max()
+    if max_score > min_score:
+        return (combined_scores - min_score) / (max_score - min_score) * 100
+    return np.zeros(len(combined_scores))
+
+
+class PretrainedEnsemble:
+    """
+    Detectors fitted on a historical corpus.
+    Scores are normalized against the training score range, so a
+    submission's score no longer depends on the rest of its batch.
+    """
+
+    def __init__(
+        self,
+        detectors: Dict[str, object],
+        version: str,
+        feature_schema_hash: str,
+        score_min: float,
+        score_max: float,
+        n_training_rows: int,
+        contamination: float = DEFAULT_CONTAMINATION,
+        created_at: Optional[str] = None
+    ):
+        self.detectors = detectors
+        self.version = version
+        self.feature_schema_hash = feature_schema_hash
+        self.score_min = float(score_min)
+        self.score_max = float(score_max)
+        self.n_training_rows = int(n_training_rows)
+        self.contamination = contamination
+        self.created_at = created_at or datetime.now(timezone.utc).isoformat()
+        self._reference: Optional[ReferenceDistribution] = None
+
+    def __getstate__(self) -> dict:
+        # The attribution reference is rebuilt from the detectors after loading
+        state = self.__dict__.copy()
+        state.pop("_reference", None)
+        return state
+
+    @classmethod
+    def fit(
+        cls,
+        feature_vectors: np.ndarray,
+        version: str,
+        feature_schema_hash: str,
+        contamination: float = DEFAULT_CONTAMINATION
+    ) -> "PretrainedEnsemble":
+        """Fit the ensemble on a training corpus"""
+        n_samples = len(feature_vectors)
+        if n_samples < 5:
+            raise ValueError(f"Need at least 5 training rows, got {n_samples}")
+
+        detectors, training_scores = fit_detectors(feature_vectors, contamination)
+
+        return cls(
+            detectors=detectors,
+            version=version,
+            feature_schema_hash=feature_schema_hash,
+            score_min=training_scores.min(),
+            score_max=training_scores.max(),
+            n_training_rows=n_samples,
+            contamination=contamination,
+        )
+
+    def combined_scores(self, feature_vectors: np.ndarray) -> np.ndarray:
+        """Raw combined decision_function scores (inference only)"""
+        detector_scores = [d.decision_function(feature_vectors) for d in self.detectors.values()]
+        return combine_scores(np.column_stack(detector_scores))
+
+    def normalized_scores(self, feature_vectors: np.ndarray) -> np.ndarray:
+        """Scores on 0-100, scaled by the training score range"""
+        combined = self.combined_scores(feature_vectors)
+        span = self.score_max - self.score_min
+        if span <= 0:
+            return np.zeros(len(combined))
+        return np.clip((combined - self.score_min) / span * 100, 0.0, 100.0)
+
+    def attribution_reference(self) -> Optional[ReferenceDistribution]:
+        """Training data distribution that feature attributions are measured against"""
+        reference = getattr(self, "_reference", None)
+        if reference is None:
+            reference = self._reference = reference_for_detectors(self.detectors)
+        return reference
+
+    def metadata(self) -> dict:
+        return {
+            "version": self.version,
+            "feature_schema_hash": self.feature_schema_hash,
+            "detectors": list(self.detectors),
+            "contamination": self.contamination,
+            "n_training_rows": self.n_training_rows,
+            "score_min": self.score_min,
+            "score_max": self.score_max,
+            "created_at": self.created_at,
+        }
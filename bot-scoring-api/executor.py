@@ -0,0 +1,137 @@
+"""
+Process-pool executor for the CPU-bound scoring stage.
+
+Fitting IForest/LOF/ECOD holds the GIL for most of its runtime; running it
+on the asyncio event loop stalls /health and every other request. This pool
+runs it in pre-warmed worker processes (pyod imported once per worker) so one
+uvicorn worker can keep several cores busy and stay responsive.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker() -> None:
+    """Import the heavy detector stack once per worker process"""
+    from detectors import import_detector_stack
+    import_detector_stack()  # pyod, scikit-learn, numba
+
+
+def _ping() -> bool:
+    return True
+
+
+class ScoringExecutor:
+    """
+    Configurable process pool with queue-depth tracking.
+    max_workers=0 disables the pool: work runs in the thread pool instead.
+    """
+
+    def __init__(self, max_workers: int, start_method: str = "spawn"):
+        self.max_workers = max(int(max_workers), 0)
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Tasks submitted but not finished (queued or running)"""
+        return self._pending
+
+    def start(self, warm: bool = True) -> None:
+        """Create the pool; with warm, spawn every worker up front"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+            )
+            pool = self._pool
+        if warm:
+            # One task per worker forces every process to start and import pyod
+            for future in [pool.submit(_ping) for _ in range(self.max_workers)]:
+                future.result()
+            logger.info("Scoring pool warmed with %d workers", self.max_workers)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken pool without waiting for it; the next task starts a new one"""
+        with self._lock:
+            if self._pool is not pool:
+                return  # Another request already replaced it
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn: Callable, *args: Any) -> Tuple[ProcessPoolExecutor, Future]:
+        """Submit to the current pool; returns the pool with the future so a failure can discard it"""
+        if self._pool is None:
+            self.start(warm=False)
+        with self._lock:
+            pool = self._pool
+            self._pending += 1
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException as e:
+            with self._lock:
+                self._pending -= 1
+            if isinstance(e, BrokenProcessPool):
+                self._discard(pool)
+            raise
+        future.add_done_callback(self._on_done)
+        return pool, future
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) off the event loop and await its result"""
+        if not self.enabled:
+            return await run_in_threadpool(fn, *args)
+        pool, future = self._submit(fn, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died - replace the pool for the next request
+            logger.error("Scoring pool broken, restarting it")
+            self._discard(pool)
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "start_method": self.start_method,
+            "running": self._pool is not None,
+            "queue_depth": self._pending,
+            "completed": self._completed,
+            "failed": self._failed,
+        }
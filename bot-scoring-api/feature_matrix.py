@@ -0,0 +1,316 @@
+"""
+Vectorized, columnar feature extraction for whole batches of submissions.
+
+build_feature_matrix() produces exactly what stacking extract_feature_vector()
+row by row would, but with one pass to gather columns and NumPy array
+operations for all 20 features.
+"""
+
+import hashlib
+import json
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+FEATURE_NAMES = [
+    # Original 12
+    "like_ratio", "comment_ratio", "share_ratio", "bookmark_ratio",
+    "engagement_rate", "view_velocity", "total_views", "submission_delay",
+    "trust_score", "account_age", "fraud_history", "campaign_deviation",
+    # TikTok 8
+    "follower_following_ratio", "duet_ratio", "stitch_ratio",
+    "watch_completion", "posting_frequency", "hashtag_usage",
+    "sound_signal", "comment_bot_score",
+]
+
+N_FEATURES = len(FEATURE_NAMES)
+
+# Bump when a feature's computation changes so stale models are rejected
+FEATURE_SCHEMA_VERSION = 1
+
+
+def feature_schema_hash() -> str:
+    """Fingerprint of the feature layout that trained models depend on"""
+    payload = json.dumps({"version": FEATURE_SCHEMA_VERSION, "features": FEATURE_NAMES})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+# Submission attributes gathered into columns: name -> (dtype, optional)
+SUBMISSION_COLUMNS = {
+    "views": (np.int64, False),
+    "likes": (np.int64, False),
+    "comments": (np.int64, False),
+    "shares": (np.int64, False),
+    "bookmarks": (np.int64, True),
+    "hours_since_upload": (np.float64, False),
+    "hours_since_submission": (np.float64, False),
+    "author_verified": (np.bool_, False),
+    "author_follower_count": (np.int64, True),
+    "author_following_count": (np.int64, True),
+    "account_age_days": (np.int64, False),
+    "creator_previous_submissions": (np.int64, True),
+    "creator_previous_flags": (np.int64, True),
+    "creator_trust_score": (np.float64, True),
+    "campaign_avg_engagement_rate": (np.float64, True),
+    "campaign_avg_views": (np.float64, True),
+    "duets": (np.int64, True),
+    "stitches": (np.int64, True),
+    "sound_is_original": (np.bool_, True),
+    "sound_is_trending": (np.bool_, True),
+    "video_duration_seconds": (np.float64, True),
+    "avg_watch_time_seconds": (np.float64, True),
+    "hashtag_count": (np.int64, True),
+    "uses_trending_hashtag": (np.bool_, True),
+    "uses_challenge_hashtag": (np.bool_, True),
+    "author_total_videos": (np.int64, True),
+    "author_videos_last_30_days": (np.int64, True),
+}
+
+# Values for optional columns left unset, where not 0/False
+COLUMN_DEFAULTS = {
+    "creator_trust_score": 100.0,
+}
+
+# Comment analysis metrics gathered into columns (0 when no comments)
+COMMENT_COLUMNS = {
+    "total_comments": np.int64,
+    "avg_length": np.float64,
+    "emoji_ratio": np.float64,
+    "generic_ratio": np.float64,
+    "duplicate_ratio": np.float64,
+    "short_comment_ratio": np.float64,
+    "bot_pattern_score": np.float64,
+}
+
+# Service-side campaign baselines, filled by campaign_store.apply_campaign_baselines
+CAMPAIGN_BASELINE_COLUMNS = (
+    "campaign_baseline_samples",
+    "campaign_engagement_rate_std",
+    "campaign_engagement_rate_p90",
+    "campaign_views_p90",
+    "campaign_velocity_avg",
+    "campaign_velocity_p90",
+)
+
+# Growth-curve features, filled by view_history.apply_video_history
+VIDEO_HISTORY_COLUMNS = (
+    "view_history_snapshots",
+    "view_spike_ratio",
+    "view_spike_share",
+    "view_engagement_lag",
+)
+
+# Columns the service fills in after extraction from its own state; they are
+# 0 and not present until then, but always exist so rules can name them
+STATE_COLUMNS = CAMPAIGN_BASELINE_COLUMNS + VIDEO_HISTORY_COLUMNS + (
+    # Standardized distance to the closest other row in the batch (knn_index.py)
+    "nearest_submission_distance",
+    # Comments with near-duplicates under other videos (comment_lsh.py)
+    "comment_cross_video_ratio",
+    "comment_cross_video_videos",
+)
+
+
+class SubmissionColumns:
+    """
+    Column arrays for a batch of submissions.
+    columns[name] holds values with None filled as 0/False (or COLUMN_DEFAULTS);
+    present[name] is the null-mask (True where the field was set).
+    Comment metrics are stored as "comment_<metric>".
+    """
+
+    def __init__(self, n_rows: int):
+        self.n_rows = n_rows
+        self.values: Dict[str, np.ndarray] = {}
+        self.present: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.values[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.values
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def truthy(self, name: str) -> np.ndarray:
+        """Mask matching Python truthiness of the original Optional field"""
+        values = self.values[name]
+        mask = values != 0 if values.dtype != np.bool_ else values.copy()
+        if name in self.present:
+            mask &= self.present[name]
+        return mask
+
+
+_COLUMN_NAMES = tuple(SUBMISSION_COLUMNS)
+_GET_COLUMNS = attrgetter(*_COLUMN_NAMES)
+_GET_COMMENT_METRICS = itemgetter(*COMMENT_COLUMNS)
+_NO_COMMENT_METRICS = (0,) * len(COMMENT_COLUMNS)
+
+
+def extract_columns(
+    submissions: Sequence[Any],
+    comment_analyses: Optional[Sequence[Optional[dict]]] = None
+) -> SubmissionColumns:
+    """
+    Turn a list of VideoFeatures into column arrays with null-masks.
+    comment_analyses, if given, is aligned with submissions (None = no comments).
+    """
+    n = len(submissions)
+    columns = SubmissionColumns(n)
+
+    # One attrgetter call per row, transposed into columns by zip()
+    rows = list(map(_GET_COLUMNS, submissions))
+    raw_columns = zip(*rows) if rows else ((),) * len(_COLUMN_NAMES)
+    for name, raw in zip(_COLUMN_NAMES, raw_columns):
+        dtype, optional = SUBMISSION_COLUMNS[name]
+        if optional:
+            raw = np.array(raw, dtype=object)
+            present = raw != None  # noqa: E711 - elementwise None check
+            columns.present[name] = present
+            raw = np.where(present, raw, COLUMN_DEFAULTS.get(name, 0))
+        columns.values[name] = np.asarray(raw, dtype=dtype)
+
+    columns.values["platform"] = np.array([sub.platform for sub in submissions], dtype=object)
+    columns.values["is_tiktok"] = columns.values["platform"] == "tiktok"
+    columns.values["campaign_id"] = np.array([sub.campaign_id for sub in submissions], dtype=object)
+    columns.values["video_id"] = np.array([sub.video_id for sub in submissions], dtype=object)
+    columns.values["creator_id"] = np.array([sub.creator_id for sub in submissions], dtype=object)
+    for name in STATE_COLUMNS:
+        columns.values[name] = np.zeros(n)
+        columns.present[name] = np.zeros(n, dtype=np.bool_)
+
+    # Raw comment text count (used for confidence), 0 without comment_data
+    columns.values["comment_text_count"] = np.fromiter(
+        (len(sub.comment_data.texts) if sub.comment_data else 0 for sub in submissions),
+        dtype=np.int64, count=n,
+    )
+
+    if comment_analyses is None:
+        comment_analyses = [None] * n
+    has_analysis = np.fromiter((a is not None for a in comment_analyses), dtype=np.bool_, count=n)
+    columns.present["comment_analysis"] = has_analysis
+    metric_rows = [
+        _GET_COMMENT_METRICS(a) if a is not None else _NO_COMMENT_METRICS
+        for a in comment_analyses
+    ]
+    raw_metrics = zip(*metric_rows) if metric_rows else ((),) * len(COMMENT_COLUMNS)
+    for (metric, dtype), raw in zip(COMMENT_COLUMNS.items(), raw_metrics):
+        columns.values[f"comment_{metric}"] = np.asarray(raw, dtype=dtype)
+
+    return columns
+
+
+def build_feature_matrix(
+    submissions: Sequence[Any] = (),
+    comment_analyses: Optional[Sequence[Optional[dict]]] = None,
+    dtype=np.float64,
+    columns: Optional[SubmissionColumns] = None,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Compute the (n, 20) feature matrix for a batch.
+    Matches np.array([extract_feature_vector(s) for s in submissions]).
+    Pass precomputed columns to skip gathering, and out to reuse a buffer.
+    """
+    if columns is None:
+        columns = extract_columns(submissions, comment_analyses)
+    n = len(columns)
+
+    if out is None:
+        out = np.empty((n, N_FEATURES), dtype=dtype)
+    elif out.shape != (n, N_FEATURES):
+        raise ValueError(f"out must have shape {(n, N_FEATURES)}, got {out.shape}")
+
+    if n == 0:
+        return out
+
+    c = columns
+    ones = np.ones(n)
+
+    # Engagement ratios (views floored at 1)
+    views = np.maximum(c["views"], 1)
+    out[:, 0] = c["likes"] / views
+    out[:, 1] = c["comments"] / views
+    out[:, 2] = c["shares"] / views
+    out[:, 3] = c["bookmarks"] / views
+    total_engagement_rate = (c["likes"] + c["comments"] + c["shares"]) / views
+    out[:, 4] = total_engagement_rate
+
+    # Velocity and log scale
+    hours_since_upload = np.maximum(c["hours_since_upload"], 0.1)
+    out[:, 5] = np.log1p(c["views"] / hours_since_upload)
+    out[:, 6] = np.log1p(c["views"].astype(np.float64))
+    out[:, 7] = c["hours_since_submission"] / hours_since_upload
+
+    # Trust and history
+    out[:, 8] = c["creator_trust_score"] / 100.0
+    out[:, 9] = np.minimum(c["account_age_days"] / 365, 1.0)
+    out[:, 10] = np.minimum(c["creator_previous_flags"] / 5, 1.0)
+
+    # Campaign deviation (0 when no positive campaign average)
+    campaign_rate = c["campaign_avg_engagement_rate"]
+    has_campaign = c.truthy("campaign_avg_engagement_rate") & (campaign_rate > 0)
+    safe_rate = np.where(has_campaign, campaign_rate, 1.0)
+    out[:, 11] = np.where(
+        has_campaign,
+        np.abs(total_engagement_rate - campaign_rate) / safe_rate,
+        0.0,
+    )
+
+    # Follower/following ratio (neutral 1.0 when unknown)
+    followers = c["author_follower_count"]
+    following = c["author_following_count"]
+    has_ff = c.truthy("author_follower_count") & c.truthy("author_following_count")
+    positive_following = following > 0
+    ff_ratio = np.where(
+        has_ff,
+        np.where(
+            positive_following,
+            followers / np.where(positive_following, following, 1),
+            followers.astype(np.float64),
+        ),
+        ones,
+    )
+    out[:, 12] = np.minimum(ff_ratio / 10, 1.0)
+
+    out[:, 13] = c["duets"] / views
+    out[:, 14] = c["stitches"] / views
+
+    # Watch completion (neutral 0.5 when unknown)
+    duration = c["video_duration_seconds"]
+    has_watch = c.truthy("video_duration_seconds") & c.truthy("avg_watch_time_seconds")
+    safe_duration = np.where(has_watch, duration, 1.0)
+    out[:, 15] = np.where(
+        has_watch,
+        np.minimum(c["avg_watch_time_seconds"] / safe_duration, 1.0),
+        0.5,
+    )
+
+    # Posting frequency (neutral 0.5) and hashtag usage (neutral-low 0.3)
+    out[:, 16] = np.where(
+        c.present["author_videos_last_30_days"],
+        np.minimum(c["author_videos_last_30_days"] / 30 / 5, 1.0),
+        0.5,
+    )
+    out[:, 17] = np.where(
+        c.present["hashtag_count"],
+        np.minimum(c["hashtag_count"] / 15, 1.0),
+        0.3,
+    )
+
+    # Sound signal: trending 0.3, else original 0.4, else neutral 0.5
+    out[:, 18] = np.where(
+        c.truthy("sound_is_trending"),
+        0.3,
+        np.where(c.truthy("sound_is_original"), 0.4, 0.5),
+    )
+
+    out[:, 19] = np.where(
+        c.present["comment_analysis"],
+        c["comment_bot_pattern_score"] / 100.0,
+        0.0,
+    )
+
+    return out
+
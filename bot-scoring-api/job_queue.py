@@ -0,0 +1,357 @@
+"""
+Durable asynchronous scoring jobs.
+
+A job is a batch of submissions of any size, split into chunks when it is
+submitted. Chunks and their results live in SQLite, so jobs survive
+restarts; background workers claim queued jobs and run them chunk by chunk
+through a caller-supplied coroutine (the /score pipeline in main.py):
+
+- a chunk's results and its progress are written in one transaction, and
+  its input is deleted then, so a restarted job resumes at the next chunk
+- a running job is owned by one worker and heartbeats after every chunk;
+  one whose heartbeat goes stale (the process died) is queued again
+- finished jobs are deleted after the retention period
+
+Payloads are opaque bytes here; main.py stores JSON-encoded chunks.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+_JOB_COLUMNS = (
+    "job_id", "status", "total", "processed", "chunk_size",
+    "created_at", "started_at", "finished_at", "error",
+)
+
+
+class JobStore:
+    """Jobs, their pending input chunks and their result chunks, in one SQLite file"""
+
+    def __init__(self, db_path: str, retention_seconds: float = 72 * 3600):
+        self.db_path = db_path
+        self.retention_seconds = float(retention_seconds)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " total INTEGER NOT NULL,"
+                " processed INTEGER NOT NULL DEFAULT 0,"
+                " chunk_size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL,"
+                " error TEXT,"
+                " worker TEXT,"
+                " heartbeat_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_inputs ("
+                " job_id TEXT NOT NULL, chunk INTEGER NOT NULL, rows INTEGER NOT NULL, data BLOB NOT NULL,"
+                " PRIMARY KEY (job_id, chunk))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_results ("
+                " job_id TEXT NOT NULL, chunk INTEGER NOT NULL, rows INTEGER NOT NULL, data BLOB NOT NULL,"
+                " PRIMARY KEY (job_id, chunk))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], object]) -> object:
+        """Run fn in an IMMEDIATE transaction (lock held), so claims are atomic across processes too"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return result
+
+    @staticmethod
+    def _job(row: Optional[tuple]) -> Optional[dict]:
+        return dict(zip(_JOB_COLUMNS, row)) if row is not None else None
+
+    def create(self, chunks: Sequence[Tuple[int, bytes]], chunk_size: int) -> dict:
+        """Queue a job made of (rows, payload) chunks; returns its status"""
+        job_id = uuid.uuid4().hex
+        total = sum(rows for rows, _ in chunks)
+
+        def insert(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, total, chunk_size, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, total, chunk_size, time.time()),
+            )
+            conn.executemany(
+                "INSERT INTO job_inputs (job_id, chunk, rows, data) VALUES (?, ?, ?, ?)",
+                [(job_id, i, rows, data) for i, (rows, data) in enumerate(chunks)],
+            )
+
+        self._transaction(insert)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._job(row)
+
+    def claim(self, worker: str, stale_seconds: float) -> Optional[dict]:
+        """
+        Take the oldest queued job for worker, first re-queueing running jobs
+        whose heartbeat is older than stale_seconds.
+        """
+        def take(conn: sqlite3.Connection) -> Optional[dict]:
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, now - stale_seconds),
+            )
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, heartbeat_at = ?,"
+                " started_at = COALESCE(started_at, ?) WHERE job_id = ?",
+                (RUNNING, worker, now, now, row[0]),
+            )
+            return self._job(conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (row[0],)
+            ).fetchone())
+
+        return self._transaction(take)
+
+    def next_chunk(self, job_id: str) -> Optional[Tuple[int, int, bytes]]:
+        """(chunk, rows, payload) of the job's first unprocessed chunk, or None when all are done"""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT chunk, rows, data FROM job_inputs WHERE job_id = ? ORDER BY chunk LIMIT 1", (job_id,)
+            ).fetchone()
+
+    def complete_chunk(self, job_id: str, worker: str, chunk: int, rows: int, result: bytes) -> bool:
+        """
+        Store a chunk's result and drop its input. False (and nothing
+        written) if the job is no longer running under this worker, e.g.
+        it was cancelled.
+        """
+        def store(conn: sqlite3.Connection) -> bool:
+            owned = conn.execute(
+                "SELECT 1 FROM jobs WHERE job_id = ? AND status = ? AND worker = ?", (job_id, RUNNING, worker)
+            ).fetchone()
+            if owned is None:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, chunk, rows, data) VALUES (?, ?, ?, ?)",
+                (job_id, chunk, rows, result),
+            )
+            conn.execute("DELETE FROM job_inputs WHERE job_id = ? AND chunk = ?", (job_id, chunk))
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ?,"
+                " processed = (SELECT COALESCE(SUM(rows), 0) FROM job_results WHERE job_id = ?)"
+                " WHERE job_id = ?",
+                (time.time(), job_id, job_id),
+            )
+            return True
+
+        return self._transaction(store)
+
+    def finish(self, job_id: str, worker: str, status: str, error: Optional[str] = None) -> None:
+        """Mark a job this worker runs completed or failed; its remaining input is dropped"""
+        def update(conn: sqlite3.Connection) -> None:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, worker = NULL"
+                " WHERE job_id = ? AND status = ? AND worker = ?",
+                (status, error, time.time(), job_id, RUNNING, worker),
+            )
+            if cursor.rowcount:
+                conn.execute("DELETE FROM job_inputs WHERE job_id = ?", (job_id,))
+
+        self._transaction(update)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued or running job (a running one stops after its current chunk)"""
+        def update(conn: sqlite3.Connection) -> None:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, worker = NULL WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+            )
+            if cursor.rowcount:
+                conn.execute("DELETE FROM job_inputs WHERE job_id = ?", (job_id,))
+
+        self._transaction(update)
+        return self.get(job_id)
+
+    def release(self, workers: Sequence[str]) -> None:
+        """Put the workers' running jobs back in the queue (graceful shutdown)"""
+        if not workers:
+            return
+
+        def update(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                f"UPDATE jobs SET status = ?, worker = NULL"
+                f" WHERE status = ? AND worker IN ({','.join('?' * len(workers))})",
+                (QUEUED, RUNNING, *workers),
+            )
+
+        self._transaction(update)
+
+    def results(self, job_id: str, first_chunk: int, last_chunk: int) -> List[Tuple[int, bytes]]:
+        """(chunk, payload) of the finished chunks in [first_chunk, last_chunk], in order"""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT chunk, data FROM job_results WHERE job_id = ? AND chunk BETWEEN ? AND ? ORDER BY chunk",
+                (job_id, first_chunk, last_chunk),
+            ).fetchall()
+
+    def prune(self) -> int:
+        """Delete jobs that finished more than retention_seconds ago; returns how many"""
+        def delete(conn: sqlite3.Connection) -> int:
+            expired = [row[0] for row in conn.execute(
+                f"SELECT job_id FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))})"
+                " AND finished_at < ?",
+                (*FINISHED_STATUSES, time.time() - self.retention_seconds),
+            )]
+            for table in ("job_results", "job_inputs", "jobs"):
+                conn.executemany(f"DELETE FROM {table} WHERE job_id = ?", [(job_id,) for job_id in expired])
+            return len(expired)
+
+        return self._transaction(delete)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JobRunner:
+    """
+    concurrency worker tasks, each running one job at a time: claim it,
+    then pass its chunks one by one to process_chunk (payload in, result
+    payload out). notify() wakes idle workers after a submission; otherwise
+    they poll every poll_interval seconds (other processes may share the store).
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        process_chunk: Callable[[bytes], Awaitable[bytes]],
+        concurrency: int = 2,
+        poll_interval: float = 2.0,
+        stale_seconds: float = 600.0
+    ):
+        self.store = store
+        self.process_chunk = process_chunk
+        self.concurrency = max(int(concurrency), 1)
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self._workers = [f"{os.getpid()}-{uuid.uuid4().hex[:8]}" for _ in range(self.concurrency)]
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._active: Dict[str, str] = {}  # worker -> job_id
+        self.chunks_processed = 0
+
+    def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._wake.set()  # Pick up anything queued before this start
+        self._tasks = [asyncio.create_task(self._work(worker)) for worker in self._workers]
+
+    async def stop(self) -> None:
+        """Stop the workers and hand their jobs back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await run_in_threadpool(self.store.release, self._workers)
+
+    def notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _work(self, worker: str) -> None:
+        while True:
+            try:
+                job = await run_in_threadpool(self.store.claim, worker, self.stale_seconds)
+            except sqlite3.Error as e:
+                logger.error("Job claim failed: %s", e)
+                job = None
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._active[worker] = job["job_id"]
+            try:
+                await self._run(worker, job["job_id"])
+            except sqlite3.Error as e:
+                # The job stays running and is re-queued once its heartbeat is stale
+                logger.error("Job %s store error: %s", job["job_id"], e)
+            finally:
+                self._active.pop(worker, None)
+
+    async def _run(self, worker: str, job_id: str) -> None:
+        while True:
+            chunk = await run_in_threadpool(self.store.next_chunk, job_id)
+            if chunk is None:
+                await run_in_threadpool(self.store.finish, job_id, worker, COMPLETED)
+                return
+            index, rows, payload = chunk
+            try:
+                result = await self.process_chunk(payload)
+            except Exception as e:
+                logger.exception("Job %s failed on chunk %d: %s", job_id, index, e)
+                await run_in_threadpool(self.store.finish, job_id, worker, FAILED, str(e))
+                return
+            if not await run_in_threadpool(self.store.complete_chunk, job_id, worker, index, rows, result):
+                return  # Cancelled, or re-queued as stale and taken by another worker
+            self.chunks_processed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.concurrency,
+            "active_jobs": len(self._active),
+            "chunks_processed": self.chunks_processed,
+            "jobs": self.store.counts(),
+            "db_path": self.store.db_path,
+        }
@@ -0,0 +1,107 @@
+"""
+One k-nearest-neighbour index per batch, shared by the density detectors
+and the near-duplicate check.
+
+PyOD's LOF builds its own neighbour search on every fit, and for our 20
+features scikit-learn picks brute force, which is quadratic in the batch
+size. NeighborGraph queries a KD-tree once for the largest k anyone needs;
+LOF, the kNN-distance detector and the near-duplicate rule all read from it:
+
+- lof_scores() reproduces PyOD's LOF decision_scores_ from the graph
+- knn_scores() is PyOD's KNN detector (distance to the k-th neighbour)
+- nearest_distances() is each row's distance to its closest other row
+
+The tree is built on the standardized matrix (see standardize()): raw
+distances are dominated by the view counts, which would leave LOF and kNN
+blind to every other feature and make near-duplicates meaningless.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_LEAF_SIZE = 40
+
+
+def standardize(feature_vectors: np.ndarray) -> np.ndarray:
+    """Every feature scaled to unit variance within the batch; constant features become 0"""
+    std = feature_vectors.std(axis=0)
+    return np.divide(
+        feature_vectors - feature_vectors.mean(axis=0), std,
+        out=np.zeros(feature_vectors.shape), where=std > 0
+    )
+
+
+class NeighborGraph:
+    """Distances and indices of each row's k nearest other rows, nearest first"""
+
+    def __init__(self, distances: np.ndarray, indices: np.ndarray):
+        self.distances = distances
+        self.indices = indices
+
+    @classmethod
+    def build(
+        cls,
+        feature_vectors: np.ndarray,
+        n_neighbors: int,
+        n_jobs: Optional[int] = None,
+        leaf_size: int = DEFAULT_LEAF_SIZE
+    ) -> "NeighborGraph":
+        """
+        Query a KD-tree for every row's n_neighbors nearest other rows.
+        Pass a standardized matrix (standardize()) for batch scoring.
+        """
+        from sklearn.neighbors import NearestNeighbors  # Deferred with the rest of the detector stack
+
+        n_samples = len(feature_vectors)
+        if n_samples < 2:
+            raise ValueError(f"Need at least 2 rows for a neighbour graph, got {n_samples}")
+        n_neighbors = min(n_neighbors, n_samples - 1)
+        search = NearestNeighbors(
+            n_neighbors=n_neighbors, algorithm="kd_tree", leaf_size=leaf_size, n_jobs=n_jobs
+        ).fit(feature_vectors)
+        # Without X, kneighbors() leaves each row out of its own neighbours
+        distances, indices = search.kneighbors()
+        return cls(distances, indices)
+
+    @property
+    def n_neighbors(self) -> int:
+        return self.distances.shape[1]
+
+    def _k(self, n_neighbors: int) -> int:
+        if n_neighbors > self.n_neighbors:
+            raise ValueError(f"Graph has {self.n_neighbors} neighbours per row, {n_neighbors} requested")
+        return n_neighbors
+
+    def nearest_distances(self) -> np.ndarray:
+        """Distance from each row to its closest other row"""
+        return self.distances[:, 0].copy()
+
+    def lof_scores(self, n_neighbors: int) -> np.ndarray:
+        """Local outlier factor per row (higher = more anomalous), as scikit-learn computes it"""
+        k = self._k(n_neighbors)
+        distances = self.distances[:, :k]
+        indices = self.indices[:, :k]
+        k_distance = distances[:, -1]
+        reach_distances = np.maximum(distances, k_distance[indices])
+        lrd = 1.0 / (reach_distances.mean(axis=1) + 1e-10)
+        return (lrd[indices] / lrd[:, np.newaxis]).mean(axis=1)
+
+    def knn_scores(self, n_neighbors: int, method: str = "largest") -> np.ndarray:
+        """Distance to the k-th neighbour ("largest"), or the mean/median over the first k"""
+        distances = self.distances[:, :self._k(n_neighbors)]
+        if method == "largest":
+            return distances[:, -1].copy()
+        if method == "mean":
+            return distances.mean(axis=1)
+        if method == "median":
+            return np.median(distances, axis=1)
+        raise ValueError(f"Unknown kNN method {method!r}")
+
+
+def nearest_standardized_distances(feature_vectors: np.ndarray, leaf_size: int = DEFAULT_LEAF_SIZE) -> np.ndarray:
+    """
+    Distance from each row to the closest other row, with every feature
+    scaled to unit variance within the batch (constant features drop out)
+    """
+    return NeighborGraph.build(standardize(feature_vectors), 1, leaf_size=leaf_size).nearest_distances()
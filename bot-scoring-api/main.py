@@ -6,133 +6,159 @@ Enhanced for TikTok with platform-specific features and comment analysis.
 Inspired by: github.com/gv-1280/DETECTION-OF-FAKE-ENGAGEMENTS-ON-INSTAGRAM-USING-MACHINE-LEARNING
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, ValidationError
+from typing import AsyncIterator, Dict, Optional, List, Tuple, Type, TypeVar, Union
 import numpy as np
-import re
+import asyncio
+import os
+import json
+import hashlib
+import logging
+import hmac
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from collections import Counter
 
-# PyOD models
-from pyod.models.iforest import IForest
-from pyod.models.lof import LOF
-from pyod.models.ecod import ECOD
-from pyod.models.combination import average, maximization
+from attribution import MIN_ATTRIBUTION_ROWS, batch_contributions, top_contributions
+from cache import LRUTTLCache
+from campaign_store import CampaignBaselineStore, record_campaign_values
+from codec import ModelCodec
+from comment_lsh import CrossVideoCommentIndex
+from comment_scanner import scan_many
+from creator_store import CreatorReputationStore, record_creator_outcomes
+from feature_matrix import N_FEATURES, SubmissionColumns, build_feature_matrix, extract_columns, feature_schema_hash
+from rules import RuleEngine
+from detectors import (
+    DEFAULT_BATCH_DETECTORS, DEFAULT_CONTAMINATION, EnsembleSpec, PretrainedEnsemble, fit_batch_scores_timed,
+    import_detector_stack, normalize_batch_scores,
+)
+from model_registry import ModelRegistry, ModelRegistryError
+from executor import ScoringExecutor
+from job_queue import JobRunner, JobStore
+from micro_batcher import MicroBatcher
+from online_detector import OnlineDetector
+from quick_check import quick_check_profiles
+from submissions import (
+    GENERIC_BOT_COMMENTS, CommentData, ScoringRequest, VideoFeatures, analyze_comments, fill_from_stores,
+)
+from view_history import VideoHistoryStore, apply_video_history
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REQUEST_START, MetricsMiddleware, MetricsRegistry
+
+logger = logging.getLogger(__name__)
 
 
 # ============================================================================
-# COMMENT ANALYSIS (No training data required - pattern-based)
+# COMMENT ANALYSIS CACHE (the analysis itself is in submissions.py)
 # ============================================================================
 
-# Generic bot comments commonly seen on TikTok/Instagram
-GENERIC_BOT_COMMENTS = [
-    r"^nice\s*[!.]*$",
-    r"^cool\s*[!.]*$",
-    r"^amazing\s*[!.]*$",
-    r"^great\s*[!.]*$",
-    r"^love\s*(it|this)?\s*[!.]*$",
-    r"^wow\s*[!.]*$",
-    r"^fire\s*[!.]*$",
-    r"^beautiful\s*[!.]*$",
-    r"^awesome\s*[!.]*$",
-    r"^perfect\s*[!.]*$",
-    r"^follow\s*(me|back)",
-    r"^check\s*(out\s*)?(my|profile)",
-    r"^dm\s*(me|for)",
-    r"^link\s*in\s*bio",
-    r"^f4f",
-    r"^l4l",
-    r"^follow\s*for\s*follow",
-    r"^like\s*for\s*like",
-    r"^[🔥💯❤️👏👍😍🙌]+$",  # Emoji-only comments
-    r"^.{1,3}$",  # Very short comments (1-3 chars)
-]
+# Comment analysis cache - pollers rescore the same videos every few minutes
+COMMENT_CACHE_SIZE = int(os.getenv("COMMENT_CACHE_SIZE", "4096"))
+COMMENT_CACHE_TTL_SECONDS = float(os.getenv("COMMENT_CACHE_TTL_SECONDS", "900"))
 
-COMPILED_BOT_PATTERNS = [re.compile(p, re.IGNORECASE) for p in GENERIC_BOT_COMMENTS]
+COMMENT_ANALYSIS_CACHE = LRUTTLCache(
+    maxsize=COMMENT_CACHE_SIZE,
+    ttl_seconds=COMMENT_CACHE_TTL_SECONDS,
+)
 
 
-def analyze_comments(comments: List[str]) -> dict:
+def comment_cache_key(comments: List[str]) -> str:
     """
-    Analyze a list of comments for bot-like patterns.
-    Returns metrics that don't require ML training.
-    """
-    if not comments:
-        return {
-            "total_comments": 0,
-            "avg_length": 0,
-            "emoji_ratio": 0,
-            "generic_ratio": 0,
-            "duplicate_ratio": 0,
-            "short_comment_ratio": 0,
-            "bot_pattern_score": 0,
-        }
-
-    total = len(comments)
-
-    # Average comment length
-    lengths = [len(c) for c in comments]
-    avg_length = sum(lengths) / total
-
-    # Emoji analysis
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "]+", flags=re.UNICODE
-    )
+    Content hash of a comment list.
+    Each comment is length-prefixed so different splits never collide.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for comment in comments:
+        encoded = comment.encode("utf-8", "surrogatepass")
+        digest.update(len(encoded).to_bytes(4, "little"))
+        digest.update(encoded)
+    return digest.hexdigest()
 
-    emoji_counts = [len(emoji_pattern.findall(c)) for c in comments]
-    total_chars = sum(lengths) or 1
-    total_emojis = sum(emoji_counts)
-    emoji_ratio = total_emojis / total_chars
 
-    # Generic/bot comment detection
-    generic_count = 0
-    for comment in comments:
-        comment_lower = comment.strip().lower()
-        for pattern in COMPILED_BOT_PATTERNS:
-            if pattern.match(comment_lower):
-                generic_count += 1
-                break
-    generic_ratio = generic_count / total
-
-    # Duplicate detection
-    comment_counts = Counter(c.lower().strip() for c in comments)
-    duplicates = sum(count - 1 for count in comment_counts.values() if count > 1)
-    duplicate_ratio = duplicates / total
-
-    # Short comment ratio (< 5 chars)
-    short_comments = sum(1 for c in comments if len(c.strip()) < 5)
-    short_comment_ratio = short_comments / total
-
-    # Combined bot pattern score (0-100)
-    bot_pattern_score = min(100, (
-        generic_ratio * 40 +
-        duplicate_ratio * 30 +
-        short_comment_ratio * 20 +
-        (1 if emoji_ratio > 0.5 else 0) * 10
-    ))
+def analyze_comments_cached(comments: List[str]) -> dict:
+    """
+    analyze_comments() backed by COMMENT_ANALYSIS_CACHE.
+    The returned dict is shared between callers and must not be mutated.
+    """
+    key = comment_cache_key(comments)
+    analysis = COMMENT_ANALYSIS_CACHE.get(key)
+    if analysis is None:
+        analysis = analyze_comments(comments)
+        COMMENT_ANALYSIS_CACHE.set(key, analysis)
+    return analysis
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the active pretrained model, then import and warm the detector
+    stack as STARTUP_MODE says: before serving, in the background, or not
+    at all (lazy). /ready reports when it is done.
+    """
+    await run_in_threadpool(MODEL_REGISTRY.load_active, MODEL_VERSION)
+
+    background_tasks = []
+    if STARTUP_MODE == "eager":
+        await warm_up()
+    elif STARTUP_MODE == "background":
+        background_tasks.append(asyncio.create_task(warm_up()))
+    else:
+        STARTUP["ready"] = True
+
+    if ONLINE_DETECTOR is not None:
+        await run_in_threadpool(ONLINE_DETECTOR.load)
+        background_tasks.append(asyncio.create_task(run_periodically(
+            ONLINE_CHECKPOINT_INTERVAL_SECONDS, ONLINE_DETECTOR.checkpoint, "Online detector checkpoint"
+        )))
+    if VIDEO_HISTORY is not None:
+        await run_in_threadpool(VIDEO_HISTORY.load)
+        background_tasks.append(asyncio.create_task(run_periodically(
+            VIDEO_HISTORY_CHECKPOINT_INTERVAL_SECONDS, VIDEO_HISTORY.checkpoint, "Video history checkpoint"
+        )))
+    if CAMPAIGN_STORE is not None:
+        background_tasks.append(asyncio.create_task(run_periodically(
+            CAMPAIGN_FLUSH_INTERVAL_SECONDS, CAMPAIGN_STORE.flush, "Campaign baseline flush"
+        )))
+    if CREATOR_STORE is not None:
+        background_tasks.append(asyncio.create_task(run_periodically(
+            CREATOR_FLUSH_INTERVAL_SECONDS, CREATOR_STORE.flush, "Creator reputation flush"
+        )))
+    if JOB_RUNNER is not None:
+        JOB_RUNNER.start()
+        background_tasks.append(asyncio.create_task(run_periodically(
+            JOB_PRUNE_INTERVAL_SECONDS, JOB_STORE.prune, "Job pruning"
+        )))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    if JOB_RUNNER is not None:
+        await JOB_RUNNER.stop()
+        await run_in_threadpool(JOB_STORE.close)
+    if ONLINE_DETECTOR is not None:
+        await run_in_threadpool(ONLINE_DETECTOR.checkpoint)
+    if VIDEO_HISTORY is not None:
+        await run_in_threadpool(VIDEO_HISTORY.checkpoint)
+    if CAMPAIGN_STORE is not None:
+        await run_in_threadpool(CAMPAIGN_STORE.close)
+    if CREATOR_STORE is not None:
+        await run_in_threadpool(CREATOR_STORE.close)
+    await run_in_threadpool(SCORING_EXECUTOR.shutdown)
 
-    return {
-        "total_comments": total,
-        "avg_length": avg_length,
-        "emoji_ratio": emoji_ratio,
-        "generic_ratio": generic_ratio,
-        "duplicate_ratio": duplicate_ratio,
-        "short_comment_ratio": short_comment_ratio,
-        "bot_pattern_score": bot_pattern_score,
-    }
 
 app = FastAPI(
     title="Bot Scoring API",
     description="Anomaly detection for video submission fraud",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration - restrict to production domains
@@ -153,72 +179,71 @@ app.add_middleware(
 )
 
 
-class CommentData(BaseModel):
-    """Optional comment data for deeper analysis"""
-    texts: List[str] = []  # Raw comment texts for pattern analysis
-
-
-class VideoFeatures(BaseModel):
-    """Features extracted from a video submission"""
-    # Core engagement metrics
-    views: int
-    likes: int
-    comments: int
-    shares: int
-    bookmarks: Optional[int] = 0
-
-    # Temporal features
-    hours_since_upload: float
-    hours_since_submission: float
-
-    # Author/account features
-    author_verified: bool = False
-    author_follower_count: Optional[int] = None
-    author_following_count: Optional[int] = None  # NEW: for follower ratio
-    account_age_days: int
-
-    # Historical features
-    creator_previous_submissions: int = 0
-    creator_previous_flags: int = 0
-    creator_trust_score: float = 100.0
-
-    # Campaign context
-    campaign_avg_engagement_rate: Optional[float] = None
-    campaign_avg_views: Optional[float] = None
-    platform: str  # tiktok, instagram, youtube
-
-    # =========================================================================
-    # TIKTOK-SPECIFIC FEATURES
-    # =========================================================================
+# =============================================================================
+# METRICS (Prometheus text format on /metrics)
+# =============================================================================
 
-    # TikTok engagement metrics
-    duets: Optional[int] = None  # Number of duets (TikTok unique)
-    stitches: Optional[int] = None  # Number of stitches (TikTok unique)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS = MetricsRegistry(enabled=METRICS_ENABLED)
 
-    # Sound/audio features
-    sound_is_original: Optional[bool] = None  # Original vs trending sound
-    sound_is_trending: Optional[bool] = None  # Is sound currently viral
+REQUEST_SECONDS = METRICS.histogram(
+    "bot_scoring_request_duration_seconds", "HTTP request latency by route",
+    ("method", "path", "status"),
+)
+STAGE_SECONDS = METRICS.histogram(
+    "bot_scoring_stage_duration_seconds", "Time spent in each scoring pipeline stage", ("stage",)
+)
+DETECTOR_FIT_SECONDS = METRICS.histogram(
+    "bot_scoring_detector_fit_duration_seconds", "Fit time of each ensemble detector", ("detector",)
+)
+BATCH_SIZE = METRICS.histogram(
+    "bot_scoring_batch_size", "Submissions per scored batch",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 1000, 10000),
+)
+SCORING_PATH_TOTAL = METRICS.counter(
+    "bot_scoring_batches_total", "Scored batches by path (rules, ensemble_fit, pretrained, online)", ("path",)
+)
+FALLBACKS_TOTAL = METRICS.counter(
+    "bot_scoring_fallbacks_total", "Batches that fell back to rule-based scoring after a detector error"
+)
+FLAGS_TOTAL = METRICS.counter("bot_scoring_flags_total", "Rule flags fired", ("flag",))
 
-    # Video metadata
-    video_duration_seconds: Optional[float] = None
-    avg_watch_time_seconds: Optional[float] = None  # If available
+METRICS.gauge(
+    "bot_scoring_executor_queue_depth", "Scoring pool tasks queued or running",
+    lambda: {(): SCORING_EXECUTOR.queue_depth},
+)
+METRICS.gauge(
+    "bot_scoring_comment_cache", "Comment analysis cache counters",
+    lambda: {(key,): value for key, value in COMMENT_ANALYSIS_CACHE.stats().items()
+             if key in ("size", "hits", "misses", "evictions")},
+    ("stat",),
+)
+METRICS.gauge(
+    "bot_scoring_score_cache", "/score response cache counters",
+    lambda: {(key,): value for key, value in SCORE_CACHE.stats().items()
+             if key in ("size", "hits", "misses", "evictions")},
+    ("stat",),
+)
+METRICS.gauge(
+    "bot_scoring_startup_seconds", "Detector import, pool start and warm-up time at startup",
+    lambda: {(phase,): STARTUP[f"{phase}_seconds"] for phase in STARTUP_PHASES
+             if STARTUP[f"{phase}_seconds"] is not None},
+    ("phase",),
+)
 
-    # Hashtag analysis
-    hashtag_count: Optional[int] = None
-    uses_trending_hashtag: Optional[bool] = None
-    uses_challenge_hashtag: Optional[bool] = None
+app.add_middleware(MetricsMiddleware, histogram=REQUEST_SECONDS)
 
-    # Posting behavior
-    author_total_videos: Optional[int] = None
-    author_videos_last_30_days: Optional[int] = None
 
-    # Comment data for pattern analysis (optional)
-    comment_data: Optional[CommentData] = None
+def observe_parse_time() -> None:
+    """Request start to handler entry: reading the body and pydantic validation"""
+    start = REQUEST_START.get()
+    if start is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="parse")
 
 
-class ScoringRequest(BaseModel):
-    """Request to score one or more submissions"""
-    submissions: List[VideoFeatures]
+def observe_detector_timings(timings: dict) -> None:
+    for name, seconds in timings.items():
+        DETECTOR_FIT_SECONDS.observe(seconds, detector=name)
 
 
 class SubmissionScore(BaseModel):
@@ -227,6 +252,11 @@ class SubmissionScore(BaseModel):
     confidence: float  # 0-1 confidence in the score
     flags: List[str]  # Human-readable flags
     feature_contributions: dict  # Which features contributed most
+    # How the top features in feature_contributions were ranked: "pretrained" or
+    # "online" (ECOD tail scores against that model's reference), "batch" (against
+    # the batch itself), "batch_deviation" (distance from the batch mean, for
+    # batches below MIN_ATTRIBUTION_ROWS); None for rule-based scores
+    attribution: Optional[str] = None
 
 
 class ScoringResponse(BaseModel):
@@ -234,10 +264,59 @@ class ScoringResponse(BaseModel):
     scores: List[SubmissionScore]
 
 
-def extract_feature_vector(features: VideoFeatures) -> np.ndarray:
+# Large bodies are decoded with codec.ModelCodec instead of FastAPI's body
+# parsing ("pydantic" skips msgspec even when it is installed)
+JSON_DECODER = os.getenv("JSON_DECODER", "msgspec")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def decode_body(codec: ModelCodec[ModelT], body: bytes) -> ModelT:
+    """Decode a request body, reporting errors like FastAPI's own body validation (422)"""
+    try:
+        return codec.decode(body)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+
+
+def json_body_openapi(model: Type[BaseModel]) -> dict:
+    """openapi_extra documenting a JSON body the handler decodes itself"""
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    # Nested models are already components through the endpoints that take them directly
+    schema.pop("$defs", None)
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+
+def json_response(instance: BaseModel, status_code: int = 200) -> Response:
+    """Serialize a response model without FastAPI's response_model re-validation"""
+    return Response(content=ModelCodec.encode(instance), media_type="application/json", status_code=status_code)
+
+
+SCORING_REQUEST_CODEC = ModelCodec(ScoringRequest, use_msgspec=JSON_DECODER == "msgspec")
+VIDEO_FEATURES_CODEC = ModelCodec(VideoFeatures, use_msgspec=JSON_DECODER == "msgspec")
+
+
+def get_comment_analysis(features: VideoFeatures) -> Optional[dict]:
+    """
+    Comment analysis for a submission, or None if it has no comment texts.
+    Computed once per submission and passed through the scoring pipeline.
+    """
+    if features.comment_data and features.comment_data.texts:
+        return analyze_comments_cached(features.comment_data.texts)
+    return None
+
+
+def extract_feature_vector(
+    features: VideoFeatures,
+    comment_analysis: Optional[dict] = None
+) -> np.ndarray:
     """
     Convert video features to a normalized feature vector for ML models.
     Returns array of 20 features (expanded for TikTok).
+    Pass comment_analysis to reuse an analysis already computed for this submission.
     """
     # Engagement ratios (handle division by zero)
     views = max(features.views, 1)
@@ -261,11 +340,12 @@ def extract_feature_vector(features: VideoFeatures) -> np.ndarray:
     time_gap_ratio = features.hours_since_submission / max(features.hours_since_upload, 0.1)
 
     # Account trust signals
-    trust_score_normalized = features.creator_trust_score / 100.0
+    trust_score = features.creator_trust_score
+    trust_score_normalized = (trust_score if trust_score is not None else 100.0) / 100.0
     account_age_score = min(features.account_age_days / 365, 1.0)  # Cap at 1 year
 
     # Historical fraud indicator
-    fraud_history_score = min(features.creator_previous_flags / 5, 1.0)  # Cap at 5 flags
+    fraud_history_score = min((features.creator_previous_flags or 0) / 5, 1.0)  # Cap at 5 flags
 
     # Follower engagement ratio (if available)
     if features.author_follower_count and features.author_follower_count > 0:
@@ -330,8 +410,9 @@ def extract_feature_vector(features: VideoFeatures) -> np.ndarray:
 
     # Comment quality score (from pattern analysis)
     comment_bot_score = 0.0
-    if features.comment_data and features.comment_data.texts:
-        comment_analysis = analyze_comments(features.comment_data.texts)
+    if comment_analysis is None:
+        comment_analysis = get_comment_analysis(features)
+    if comment_analysis is not None:
         comment_bot_score = comment_analysis["bot_pattern_score"] / 100.0
 
     return np.array([
@@ -360,330 +441,695 @@ def extract_feature_vector(features: VideoFeatures) -> np.ndarray:
     ])
 
 
-def detect_rule_based_flags(features: VideoFeatures) -> List[str]:
+def detect_rule_based_flags(
+    features: VideoFeatures,
+    comment_analysis: Optional[dict] = None
+) -> List[str]:
     """
     Rule-based checks that complement ML scoring.
     Returns list of human-readable flags.
-    Includes TikTok-specific patterns.
+    Single-submission view of the rule table (see rules.py).
+    Pass comment_analysis to reuse an analysis already computed for this submission.
     """
-    flags = []
-    views = max(features.views, 1)
+    if comment_analysis is None:
+        comment_analysis = get_comment_analysis(features)
 
-    # =========================================================================
-    # UNIVERSAL FLAGS (all platforms)
-    # =========================================================================
+    ruleset = RULE_ENGINE.ruleset
+    flags = ruleset.evaluate(extract_columns([features], [comment_analysis]))
+    return ruleset.flag_lists(flags)[0]
 
-    # Extremely low engagement (potential view botting)
-    engagement_rate = (features.likes + features.comments) / views
-    if features.views > 1000 and engagement_rate < 0.001:
-        flags.append("extremely_low_engagement")
-
-    # Suspiciously perfect ratios (bot fingerprint)
-    if features.views > 100:
-        like_ratio = features.likes / views
-        if 0.09 < like_ratio < 0.11:  # Exactly ~10% likes
-            flags.append("suspicious_like_ratio")
-
-    # Very high velocity for non-verified accounts
-    hours = max(features.hours_since_upload, 0.1)
-    velocity = features.views / hours
-    if velocity > 10000 and not features.author_verified:
-        flags.append("high_velocity_unverified")
-
-    # New account with high views
-    if features.account_age_days < 30 and features.views > 50000:
-        flags.append("new_account_viral")
-
-    # Previous fraud history
-    if features.creator_previous_flags >= 2:
-        flags.append("repeat_fraud_history")
-
-    # Low trust score
-    if features.creator_trust_score < 50:
-        flags.append("low_trust_score")
-
-    # Zero comments with high views (unnatural)
-    if features.views > 5000 and features.comments == 0:
-        flags.append("zero_comments_high_views")
-
-    # Engagement significantly above campaign average
-    if features.campaign_avg_engagement_rate:
-        total_rate = (features.likes + features.comments + features.shares) / views
-        if total_rate > features.campaign_avg_engagement_rate * 5:
-            flags.append("engagement_far_above_average")
 
-    # =========================================================================
-    # TIKTOK-SPECIFIC FLAGS
-    # =========================================================================
+# Rule table - reloaded automatically when RULES_CONFIG_PATH changes
+RULES_CONFIG_PATH = os.getenv("RULES_CONFIG_PATH")
+RULE_ENGINE = RuleEngine(RULES_CONFIG_PATH)
 
-    if features.platform == "tiktok":
-        # Follower/Following ratio anomalies (common bot pattern)
-        if features.author_follower_count and features.author_following_count:
-            if features.author_following_count > 0:
-                ff_ratio = features.author_follower_count / features.author_following_count
-
-                # Very low ratio with high views = likely bought followers/views
-                if ff_ratio < 0.1 and features.views > 10000:
-                    flags.append("tiktok_low_follower_ratio_high_views")
-
-                # Following way more than followers (engagement pod behavior)
-                if features.author_following_count > 5000 and ff_ratio < 0.5:
-                    flags.append("tiktok_engagement_pod_pattern")
-
-            # Following exactly 0 with followers (bot pattern)
-            elif features.author_follower_count > 1000:
-                flags.append("tiktok_zero_following_suspicious")
-
-        # No duets or stitches with viral views (inorganic)
-        # Real viral TikToks usually get some duets/stitches
-        if features.views > 100000:
-            duets = features.duets or 0
-            stitches = features.stitches or 0
-            if duets == 0 and stitches == 0:
-                flags.append("tiktok_viral_no_engagement_actions")
-
-        # Excessive hashtag usage (spam pattern)
-        if features.hashtag_count and features.hashtag_count > 12:
-            flags.append("tiktok_excessive_hashtags")
-
-        # Very short watch time for long videos (view botting signal)
-        if features.video_duration_seconds and features.avg_watch_time_seconds:
-            if features.video_duration_seconds > 30:
-                completion = features.avg_watch_time_seconds / features.video_duration_seconds
-                if completion < 0.1 and features.views > 5000:
-                    flags.append("tiktok_low_watch_completion")
-
-        # Mass posting pattern (content farms)
-        if features.author_videos_last_30_days and features.author_videos_last_30_days > 90:
-            flags.append("tiktok_mass_posting")
-
-        # Original sound but trending engagement (unusual)
-        if features.sound_is_original and not features.sound_is_trending:
-            if features.views > 500000 and engagement_rate < 0.01:
-                flags.append("tiktok_original_sound_viral_low_engagement")
 
-    # =========================================================================
-    # COMMENT ANALYSIS FLAGS
-    # =========================================================================
+def evaluate_rules(columns: SubmissionColumns) -> Tuple[List[List[str]], np.ndarray]:
+    """
+    Run the rule table over a whole batch.
+    Returns the flag names per row and each row's summed flag weight.
+    """
+    ruleset = RULE_ENGINE.ruleset
+    with STAGE_SECONDS.time(stage="rules"):
+        flags = ruleset.evaluate(columns)
+        flag_lists, flag_points = ruleset.flag_lists(flags), flags @ ruleset.weights
 
-    if features.comment_data and features.comment_data.texts:
-        comment_analysis = analyze_comments(features.comment_data.texts)
-
-        # High generic comment ratio
-        if comment_analysis["generic_ratio"] > 0.5:
-            flags.append("high_generic_comments")
-
-        # High duplicate comments
-        if comment_analysis["duplicate_ratio"] > 0.3:
-            flags.append("high_duplicate_comments")
-
-        # Very short average comment length
-        if comment_analysis["avg_length"] < 5 and comment_analysis["total_comments"] > 10:
-            flags.append("very_short_comments")
-
-        # High emoji-only ratio
-        if comment_analysis["emoji_ratio"] > 0.7:
-            flags.append("emoji_heavy_comments")
-
-        # Overall bot comment pattern
-        if comment_analysis["bot_pattern_score"] > 60:
-            flags.append("bot_comment_pattern_detected")
-
-    return flags
-
-
-# Flag severity weights for scoring
-FLAG_WEIGHTS = {
-    # High severity (20+ points)
-    "repeat_fraud_history": 25,
-    "bot_comment_pattern_detected": 25,
-    "extremely_low_engagement": 20,
-    "tiktok_engagement_pod_pattern": 20,
-
-    # Medium severity (15 points)
-    "high_velocity_unverified": 15,
-    "new_account_viral": 15,
-    "tiktok_low_follower_ratio_high_views": 15,
-    "tiktok_viral_no_engagement_actions": 15,
-    "high_generic_comments": 15,
-    "high_duplicate_comments": 15,
-
-    # Lower severity (10 points)
-    "suspicious_like_ratio": 10,
-    "low_trust_score": 10,
-    "zero_comments_high_views": 10,
-    "engagement_far_above_average": 10,
-    "tiktok_zero_following_suspicious": 10,
-    "tiktok_excessive_hashtags": 10,
-    "tiktok_low_watch_completion": 10,
-    "tiktok_mass_posting": 10,
-    "tiktok_original_sound_viral_low_engagement": 10,
-    "very_short_comments": 10,
-    "emoji_heavy_comments": 10,
-}
+    if METRICS.enabled and len(flags):
+        fired = flags.sum(axis=0)
+        FLAGS_TOTAL.inc_many({name: int(c) for name, c in zip(ruleset.names, fired) if c}, "flag")
+    return flag_lists, flag_points
 
-DEFAULT_FLAG_WEIGHT = 8  # For any flag not in the dict
+
+def calculate_rule_based_scores(
+    features_list: List[VideoFeatures],
+    comment_analyses: Optional[List[Optional[dict]]] = None,
+    columns: Optional[SubmissionColumns] = None
+) -> List[SubmissionScore]:
+    """
+    Score submissions from rule flags and comment analysis only.
+    Used for batches too small to train on and as the PyOD fallback.
+    """
+    if columns is None:
+        if comment_analyses is None:
+            comment_analyses = [get_comment_analysis(f) for f in features_list]
+        columns = extract_columns(features_list, comment_analyses)
+
+    SCORING_PATH_TOTAL.inc(path="rules")
+    rule_flags, flag_points = evaluate_rules(columns)
+    has_comments = columns.present["comment_analysis"]
+
+    # Weighted score from rules, plus comment bot score (0-100 scaled to 0-30)
+    base_scores = np.where(
+        has_comments,
+        flag_points + columns["comment_bot_pattern_score"] * 0.3,
+        flag_points,
+    )
+    bot_scores = np.minimum(base_scores, 100.0)
+
+    # Confidence based on how much data we have
+    confidences = (
+        0.4
+        + np.where(columns["comment_text_count"] > 5, 0.1, 0.0)
+        + np.where(columns.truthy("author_follower_count"), 0.05, 0.0)
+        + np.where(columns["is_tiktok"] & columns.present["duets"], 0.05, 0.0)
+    )
+    confidences = np.minimum(confidences, 0.7)  # Cap at 0.7 for rule-based
+
+    return [
+        SubmissionScore(
+            bot_score=float(bot_scores[i]),
+            confidence=float(confidences[i]),
+            flags=rule_flags[i],
+            feature_contributions={"rule_based": True, "flag_count": len(rule_flags[i])}
+        )
+        for i in range(len(columns))
+    ]
+
+
+# Smallest batch the detectors can be fitted on
+MIN_ENSEMBLE_BATCH = 5
+
+# Detectors fitted on each batch (see detectors.BATCH_DETECTOR_NAMES), e.g. "iforest,lof,ecod,knn"
+BATCH_DETECTORS = tuple(
+    name.strip() for name in os.getenv("BATCH_DETECTORS", ",".join(DEFAULT_BATCH_DETECTORS)).split(",")
+    if name.strip()
+)
+IFOREST_N_JOBS = int(os.getenv("IFOREST_N_JOBS", "1"))  # Threads inside IForest's own fit
+DETECTOR_THREADS = int(os.getenv("DETECTOR_THREADS", "0"))  # Detectors fitted at once; 0 = all, 1 = sequential
+# Full ensemble spec as JSON - detectors with parameters, combiner (see
+# detectors.EnsembleSpec.from_dict); replaces BATCH_DETECTORS and DETECTOR_THREADS
+ENSEMBLE_CONFIG_PATH = os.getenv("ENSEMBLE_CONFIG_PATH")
+
+
+def load_batch_ensemble() -> EnsembleSpec:
+    defaults = {"iforest": {"n_jobs": IFOREST_N_JOBS}}
+    if ENSEMBLE_CONFIG_PATH:
+        with open(ENSEMBLE_CONFIG_PATH) as f:
+            return EnsembleSpec.from_dict(json.load(f), defaults)
+    return EnsembleSpec.from_names(BATCH_DETECTORS, defaults, threads=DETECTOR_THREADS or None)
+
+
+BATCH_ENSEMBLE = load_batch_ensemble()
 
 
 def calculate_bot_score(
     feature_vectors: np.ndarray,
-    features_list: List[VideoFeatures]
+    features_list: List[VideoFeatures],
+    comment_analyses: Optional[List[Optional[dict]]] = None,
+    columns: Optional[SubmissionColumns] = None,
+    batch_scores: Optional[np.ndarray] = None,
+    ensemble: Optional[PretrainedEnsemble] = None,
+    online_scores: Optional[np.ndarray] = None,
+    online_samples: int = 0,
+    online_dimension_scores: Optional[np.ndarray] = None,
+    nearest_distances: Optional[np.ndarray] = None
 ) -> List[SubmissionScore]:
     """
     Calculate bot scores using PyOD ensemble methods.
     Uses combination of Isolation Forest, LOF, and ECOD.
     Enhanced with TikTok-specific features and weighted flag scoring.
+    Pass columns (from extract_columns) to reuse the batch's column arrays,
+    and batch_scores (from fit_batch_scores) if the detectors were already
+    fitted elsewhere, e.g. in SCORING_EXECUTOR. Pass ensemble to score with
+    a specific pretrained model instead of the active one, and online_scores
+    (0-100, from ONLINE_DETECTOR) to use the streaming detector when there is
+    no pretrained model, with online_dimension_scores to explain them.
+    nearest_distances (standardized, from the batch fit) enables the
+    near-duplicate submission rule.
     """
     n_samples = len(feature_vectors)
 
     if n_samples == 0:
         return []
 
-    # For single samples, we can't train models - use rule-based scoring
-    if n_samples < 5:
-        scores = []
-        for i, features in enumerate(features_list):
-            rule_flags = detect_rule_based_flags(features)
-
-            # Weighted score from rules
-            base_score = sum(
-                FLAG_WEIGHTS.get(flag, DEFAULT_FLAG_WEIGHT)
-                for flag in rule_flags
-            )
-
-            # Add comment analysis score if available
-            if features.comment_data and features.comment_data.texts:
-                comment_analysis = analyze_comments(features.comment_data.texts)
-                # Blend in comment bot score (0-100 scaled to 0-30 contribution)
-                base_score += comment_analysis["bot_pattern_score"] * 0.3
+    if columns is None:
+        if comment_analyses is None:
+            comment_analyses = [get_comment_analysis(f) for f in features_list]
+        columns = extract_columns(features_list, comment_analyses)
 
-            # Cap at 100
-            bot_score = min(base_score, 100.0)
+    if batch_scores is not None:
+        ensemble = None
+    elif ensemble is None:
+        # Read the active model once so a hot-swap can't change it mid-request
+        ensemble = MODEL_REGISTRY.active
 
-            # Confidence based on how much data we have
-            confidence = 0.4
-            if features.comment_data and len(features.comment_data.texts) > 5:
-                confidence += 0.1
-            if features.author_follower_count:
-                confidence += 0.05
-            if features.platform == "tiktok" and features.duets is not None:
-                confidence += 0.05
-
-            scores.append(SubmissionScore(
-                bot_score=bot_score,
-                confidence=min(confidence, 0.7),  # Cap at 0.7 for rule-based
-                flags=rule_flags,
-                feature_contributions={"rule_based": True, "flag_count": len(rule_flags)}
-            ))
-        return scores
+    # Without a pretrained or online model, small batches can't train models - use rule-based scoring
+    if ensemble is None and batch_scores is None and online_scores is None and n_samples < MIN_ENSEMBLE_BATCH:
+        return calculate_rule_based_scores(features_list, columns=columns)
 
-    # For multiple samples, use PyOD ensemble
     try:
-        # Initialize models with contamination estimate
-        contamination = 0.1  # Assume ~10% fraud rate
-
-        # Isolation Forest - good for high-dimensional anomalies
-        iforest = IForest(contamination=contamination, random_state=42, n_estimators=100)
-        iforest.fit(feature_vectors)
-        iforest_scores = iforest.decision_scores_
-
-        # Local Outlier Factor - good for density-based anomalies
-        lof = LOF(contamination=contamination, n_neighbors=min(5, n_samples - 1))
-        lof.fit(feature_vectors)
-        lof_scores = lof.decision_scores_
-
-        # ECOD - good for tail-based anomalies
-        ecod = ECOD(contamination=contamination)
-        ecod.fit(feature_vectors)
-        ecod_scores = ecod.decision_scores_
-
-        # Combine scores using average
-        combined_scores = average([iforest_scores, lof_scores, ecod_scores])
-
-        # Normalize to 0-100 range
-        min_score = combined_scores.min()
-        max_score = combined_scores.max()
-        if max_score > min_score:
-            normalized_scores = (combined_scores - min_score) / (max_score - min_score) * 100
+        # Per-feature outlier scores against what the row was scored against
+        # (the batch itself unless a model provides its own reference)
+        dimension_scores = None
+        if batch_scores is not None:
+            # Detectors already fitted on this batch
+            normalized_scores = normalize_batch_scores(batch_scores)
+            reference_samples = n_samples
+            path = "ensemble_fit"
+        elif ensemble is not None:
+            # Pretrained ensemble - inference only, normalized to the training range
+            with STAGE_SECONDS.time(stage="inference"):
+                normalized_scores = ensemble.normalized_scores(feature_vectors)
+            reference_samples = ensemble.n_training_rows
+            path = "pretrained"
+            reference = ensemble.attribution_reference()
+            if reference is not None:
+                dimension_scores = reference.dimension_scores(feature_vectors)
+        elif online_scores is not None:
+            # Streaming detector - scored against every submission seen before this batch
+            normalized_scores = online_scores
+            reference_samples = online_samples
+            path = "online"
+            dimension_scores = online_dimension_scores
         else:
-            normalized_scores = np.zeros(n_samples)
+            # Fit the batch ensemble (IForest, LOF and ECOD by default), normalize to 0-100 within it
+            with STAGE_SECONDS.time(stage="ensemble_fit"):
+                combined_scores, fit_timings, nearest_distances = fit_batch_scores_timed(
+                    feature_vectors, ensemble=BATCH_ENSEMBLE
+                )
+            observe_detector_timings(fit_timings)
+            normalized_scores = normalize_batch_scores(combined_scores)
+            reference_samples = n_samples
+            path = "ensemble_fit"
+
+        with STAGE_SECONDS.time(stage="attribution"):
+            if dimension_scores is None:
+                contributions_list = batch_contributions(feature_vectors)
+                attribution = "batch" if n_samples >= MIN_ATTRIBUTION_ROWS else "batch_deviation"
+            else:
+                contributions_list = top_contributions(dimension_scores)
+                attribution = path
+
+        if nearest_distances is not None:
+            columns.values["nearest_submission_distance"] = nearest_distances
+            columns.present["nearest_submission_distance"] = np.ones(n_samples, dtype=np.bool_)
+
+        # Weighted boost from rule flags (30% of flag weight)
+        rule_flags, flag_points = evaluate_rules(columns)
+        flag_boosts = flag_points * 0.3
+
+        # Add comment analysis contribution
+        comment_contributions = np.where(
+            columns.present["comment_analysis"],
+            columns["comment_bot_pattern_score"] * 0.2,
+            0.0,
+        )
+
+        # Combine ML score with rule-based boosts
+        final_scores = np.minimum(normalized_scores + flag_boosts + comment_contributions, 100.0)
+
+        # Confidence based on sample size and data quality
+        base_confidence = min(0.7 + (reference_samples / 100) * 0.2, 0.9)
+        confidences = np.minimum(
+            base_confidence + np.where(columns["comment_text_count"] > 10, 0.05, 0.0),
+            0.95,
+        )
 
         # Build response
+        response_started = time.perf_counter()
         scores = []
-        for i, features in enumerate(features_list):
-            rule_flags = detect_rule_based_flags(features)
-
-            # Weighted boost from rule flags
-            flag_boost = sum(
-                FLAG_WEIGHTS.get(flag, DEFAULT_FLAG_WEIGHT) * 0.3  # 30% of flag weight
-                for flag in rule_flags
-            )
-
-            # Add comment analysis contribution
-            comment_contribution = 0
-            if features.comment_data and features.comment_data.texts:
-                comment_analysis = analyze_comments(features.comment_data.texts)
-                comment_contribution = comment_analysis["bot_pattern_score"] * 0.2
-
-            # Combine ML score with rule-based boosts
-            ml_score = normalized_scores[i]
-            final_score = min(ml_score + flag_boost + comment_contribution, 100.0)
-
-            # Calculate feature contributions
-            feature_names = [
-                # Original 12
-                "like_ratio", "comment_ratio", "share_ratio", "bookmark_ratio",
-                "engagement_rate", "view_velocity", "total_views", "submission_delay",
-                "trust_score", "account_age", "fraud_history", "campaign_deviation",
-                # TikTok 8
-                "follower_following_ratio", "duet_ratio", "stitch_ratio",
-                "watch_completion", "posting_frequency", "hashtag_usage",
-                "sound_signal", "comment_bot_score"
-            ]
-
-            # Get feature importances (simplified - based on deviation from mean)
-            mean_features = feature_vectors.mean(axis=0)
-            deviations = np.abs(feature_vectors[i] - mean_features)
-            top_contributors = np.argsort(deviations)[-5:][::-1]  # Top 5
-
-            contributions = {
-                feature_names[idx] if idx < len(feature_names) else f"feature_{idx}": float(deviations[idx])
-                for idx in top_contributors
-            }
-
-            # Add ML vs rule contribution breakdown
-            contributions["ml_score"] = float(ml_score)
-            contributions["rule_boost"] = float(flag_boost)
-            contributions["comment_boost"] = float(comment_contribution)
-
-            # Confidence based on sample size and data quality
-            base_confidence = min(0.7 + (n_samples / 100) * 0.2, 0.9)
-            if features.comment_data and len(features.comment_data.texts) > 10:
-                base_confidence += 0.05
+        ml_scores = normalized_scores.tolist()
+        rule_boosts = flag_boosts.tolist()
+        comment_boosts = comment_contributions.tolist()
+        for i in range(n_samples):
+            # Top features by ECOD tail score, plus the ML vs rule breakdown
+            contributions = contributions_list[i]
+            contributions["ml_score"] = ml_scores[i]
+            contributions["rule_boost"] = rule_boosts[i]
+            contributions["comment_boost"] = comment_boosts[i]
 
             scores.append(SubmissionScore(
-                bot_score=float(final_score),
-                confidence=min(base_confidence, 0.95),
-                flags=rule_flags,
-                feature_contributions=contributions
+                bot_score=float(final_scores[i]),
+                confidence=float(confidences[i]),
+                flags=rule_flags[i],
+                feature_contributions=contributions,
+                attribution=attribution
             ))
+        STAGE_SECONDS.observe(time.perf_counter() - response_started, stage="response")
 
+        SCORING_PATH_TOTAL.inc(path=path)
         return scores
 
     except Exception as e:
         # Fallback to rule-based on error
-        print(f"PyOD error, falling back to rules: {e}")
-        return calculate_bot_score(feature_vectors[:0], features_list)
+        logger.exception("PyOD error, falling back to rules: %s", e)
+        FALLBACKS_TOTAL.inc()
+        return calculate_rule_based_scores(features_list, columns=columns)
+
+
+# Pretrained models - loaded at startup, hot-swapped via /admin/models/activate
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_VERSION = os.getenv("MODEL_VERSION")  # Overrides the ACTIVE file
+MODEL_REGISTRY = ModelRegistry(MODEL_DIR, feature_schema_hash())
+
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+# Process pool for detector fitting (0 = run in the thread pool instead)
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1))))
+SCORING_POOL_START_METHOD = os.getenv("SCORING_POOL_START_METHOD", "spawn")
+SCORING_EXECUTOR = ScoringExecutor(SCORING_WORKERS, SCORING_POOL_START_METHOD)
+
+
+# Streaming detector that learns from every scored submission (see online_detector.py)
+ONLINE_DETECTOR_ENABLED = os.getenv("ONLINE_DETECTOR_ENABLED", "false").lower() in ("1", "true", "yes")
+ONLINE_DETECTOR_PER_PLATFORM = os.getenv("ONLINE_DETECTOR_PER_PLATFORM", "false").lower() in ("1", "true", "yes")
+ONLINE_DETECTOR_STATE_DIR = os.getenv("ONLINE_DETECTOR_STATE_DIR", "state/online")
+ONLINE_DETECTOR_WARMUP = int(os.getenv("ONLINE_DETECTOR_WARMUP", "256"))
+ONLINE_DETECTOR_HALF_LIFE = float(os.getenv("ONLINE_DETECTOR_HALF_LIFE", "50000"))  # In submissions
+ONLINE_CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("ONLINE_CHECKPOINT_INTERVAL_SECONDS", "60"))
+
+ONLINE_DETECTOR: Optional[OnlineDetector] = (
+    OnlineDetector(
+        N_FEATURES,
+        feature_schema_hash(),
+        state_dir=ONLINE_DETECTOR_STATE_DIR,
+        per_platform=ONLINE_DETECTOR_PER_PLATFORM,
+        warmup=ONLINE_DETECTOR_WARMUP,
+        half_life=ONLINE_DETECTOR_HALF_LIFE,
+    )
+    if ONLINE_DETECTOR_ENABLED else None
+)
+
+
+# Per-campaign engagement baselines (see campaign_store.py); off by default,
+# since it keeps state on disk at CAMPAIGN_STORE_PATH
+CAMPAIGN_BASELINES_ENABLED = os.getenv("CAMPAIGN_BASELINES_ENABLED", "false").lower() in ("1", "true", "yes")
+CAMPAIGN_STORE_PATH = os.getenv("CAMPAIGN_STORE_PATH", "state/campaigns.sqlite3")
+CAMPAIGN_STORE_CACHE_SIZE = int(os.getenv("CAMPAIGN_STORE_CACHE_SIZE", "10000"))
+CAMPAIGN_BASELINE_MIN_SAMPLES = int(os.getenv("CAMPAIGN_BASELINE_MIN_SAMPLES", "20"))
+CAMPAIGN_FLUSH_INTERVAL_SECONDS = float(os.getenv("CAMPAIGN_FLUSH_INTERVAL_SECONDS", "30"))
+
+CAMPAIGN_STORE: Optional[CampaignBaselineStore] = (
+    CampaignBaselineStore(CAMPAIGN_STORE_PATH, max_cached=CAMPAIGN_STORE_CACHE_SIZE)
+    if CAMPAIGN_BASELINES_ENABLED else None
+)
+
+
+# Decayed per-creator history keyed by creator_id (see creator_store.py);
+# off by default, since it keeps state on disk at CREATOR_STORE_PATH
+CREATOR_REPUTATION_ENABLED = os.getenv("CREATOR_REPUTATION_ENABLED", "false").lower() in ("1", "true", "yes")
+CREATOR_STORE_PATH = os.getenv("CREATOR_STORE_PATH", "state/creators.sqlite3")
+CREATOR_STORE_CACHE_SIZE = int(os.getenv("CREATOR_STORE_CACHE_SIZE", "100000"))
+CREATOR_REPUTATION_HALF_LIFE_DAYS = float(os.getenv("CREATOR_REPUTATION_HALF_LIFE_DAYS", "90"))
+CREATOR_FLAG_SCORE = float(os.getenv("CREATOR_FLAG_SCORE", "60"))  # bot_score that counts as a flag
+CREATOR_TRUST_PRIOR = float(os.getenv("CREATOR_TRUST_PRIOR", "3"))  # Pseudo-submissions at full trust
+CREATOR_FLUSH_INTERVAL_SECONDS = float(os.getenv("CREATOR_FLUSH_INTERVAL_SECONDS", "30"))
+
+CREATOR_STORE: Optional[CreatorReputationStore] = (
+    CreatorReputationStore(
+        CREATOR_STORE_PATH,
+        max_cached=CREATOR_STORE_CACHE_SIZE,
+        half_life_days=CREATOR_REPUTATION_HALF_LIFE_DAYS,
+        flag_score=CREATOR_FLAG_SCORE,
+        trust_prior=CREATOR_TRUST_PRIOR,
+    )
+    if CREATOR_REPUTATION_ENABLED else None
+)
+
+
+# View-count snapshots per video_id for growth-curve features (see view_history.py);
+# off by default, since it checkpoints to VIDEO_HISTORY_STATE_PATH
+VIDEO_HISTORY_ENABLED = os.getenv("VIDEO_HISTORY_ENABLED", "false").lower() in ("1", "true", "yes")
+VIDEO_HISTORY_MAX_VIDEOS = int(os.getenv("VIDEO_HISTORY_MAX_VIDEOS", "50000"))
+VIDEO_HISTORY_LENGTH = int(os.getenv("VIDEO_HISTORY_LENGTH", "12"))  # Snapshots kept per video
+VIDEO_HISTORY_MIN_INTERVAL_SECONDS = float(os.getenv("VIDEO_HISTORY_MIN_INTERVAL_SECONDS", "60"))
+VIDEO_HISTORY_STATE_PATH = os.getenv("VIDEO_HISTORY_STATE_PATH", "state/video_history.npz")
+VIDEO_HISTORY_CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("VIDEO_HISTORY_CHECKPOINT_INTERVAL_SECONDS", "60"))
+
+VIDEO_HISTORY: Optional[VideoHistoryStore] = (
+    VideoHistoryStore(
+        max_videos=VIDEO_HISTORY_MAX_VIDEOS,
+        history_length=VIDEO_HISTORY_LENGTH,
+        min_interval_seconds=VIDEO_HISTORY_MIN_INTERVAL_SECONDS,
+        state_path=VIDEO_HISTORY_STATE_PATH,
+    )
+    if VIDEO_HISTORY_ENABLED else None
+)
+
+
+# Near-duplicate comments across videos (see comment_lsh.py)
+CROSS_VIDEO_COMMENTS_ENABLED = os.getenv("CROSS_VIDEO_COMMENTS_ENABLED", "false").lower() in ("1", "true", "yes")
+CROSS_VIDEO_COMMENT_WINDOW = int(os.getenv("CROSS_VIDEO_COMMENT_WINDOW", "50000"))  # Comments kept
+CROSS_VIDEO_COMMENT_THRESHOLD = float(os.getenv("CROSS_VIDEO_COMMENT_THRESHOLD", "0.6"))  # Jaccard
+
+CROSS_VIDEO_COMMENT_INDEX: Optional[CrossVideoCommentIndex] = (
+    CrossVideoCommentIndex(threshold=CROSS_VIDEO_COMMENT_THRESHOLD, max_entries=CROSS_VIDEO_COMMENT_WINDOW)
+    if CROSS_VIDEO_COMMENTS_ENABLED else None
+)
+
+
+def apply_cross_video_comments(submissions: List[VideoFeatures], columns: SubmissionColumns) -> None:
+    """Match the batch's comments against other videos and fill the comment_cross_video_* columns"""
+    texts = [sub.comment_data.texts if sub.comment_data else [] for sub in submissions]
+    # Without a video_id, a row is its own video for this pass only
+    nonce = uuid.uuid4().hex
+    video_keys = [
+        f"video:{sub.video_id}" if sub.video_id is not None else f"row:{nonce}:{row}"
+        for row, sub in enumerate(submissions)
+    ]
+    keep = [sub.video_id is not None for sub in submissions]
+    checked, matched, videos = CROSS_VIDEO_COMMENT_INDEX.add_and_match(video_keys, texts, keep)
+    has_checked = checked > 0
+    columns.values["comment_cross_video_ratio"] = matched / np.maximum(checked, 1)
+    columns.values["comment_cross_video_videos"] = videos.astype(np.float64)
+    columns.present["comment_cross_video_ratio"] = has_checked
+    columns.present["comment_cross_video_videos"] = has_checked.copy()
+
+
+# A scoring pass that uses one of the stores above reads state other
+# requests changed and adds its own batch to it. Those passes are counted so
+# the /score cache never serves a response computed against older state.
+STATE_GENERATION = 0  # Scoring passes that used the stateful stores
+
+
+def uses_state(submissions: List[VideoFeatures]) -> bool:
+    """
+    Whether scoring the batch reads or writes service state: always with the
+    online detector or cross-video comment index, otherwise only when a row
+    carries an id one of the enabled stores is keyed by
+    """
+    if ONLINE_DETECTOR is not None or CROSS_VIDEO_COMMENT_INDEX is not None:
+        return True
+    return any(
+        (CAMPAIGN_STORE is not None and sub.campaign_id is not None)
+        or (CREATOR_STORE is not None and sub.creator_id is not None)
+        or (VIDEO_HISTORY is not None and sub.video_id is not None)
+        for sub in submissions
+    )
+
+
+# Cold start: "eager" imports and warms the detector stack before serving,
+# "background" serves at once and warms in a task (/ready is 503 until done),
+# "lazy" skips both and pays on the first request that needs them
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager").lower()
+if STARTUP_MODE not in ("eager", "background", "lazy"):
+    raise ValueError(f"STARTUP_MODE must be eager, background or lazy, got {STARTUP_MODE!r}")
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", "64"))  # 0 skips the warm-up scoring pass
+
+STARTUP_PHASES = ("detector_import", "pool_start", "warmup")
+STARTUP = {
+    "mode": STARTUP_MODE,
+    "ready": False,
+    **{f"{phase}_seconds": None for phase in STARTUP_PHASES},
+    "error": None,
+}
+
+
+def warmup_submissions(n: int, seed: int = 0) -> List[VideoFeatures]:
+    """Seeded synthetic submissions, a few of them bot-like, for the warm-up pass"""
+    rng = np.random.default_rng(seed)
+    views = rng.integers(1_000, 1_000_000, n)
+    bot_like = rng.random(n) < 0.2
+    like_rate = np.where(bot_like, rng.uniform(0.0005, 0.003, n), rng.uniform(0.02, 0.12, n))
+    return [
+        VideoFeatures(
+            views=int(views[i]),
+            likes=int(views[i] * like_rate[i]),
+            comments=int(views[i] * like_rate[i] / 20),
+            shares=int(views[i] * like_rate[i] / 10),
+            hours_since_upload=float(rng.uniform(1, 200)),
+            hours_since_submission=float(rng.uniform(0, 24)),
+            account_age_days=int(rng.integers(1, 2000)),
+            author_follower_count=int(rng.integers(10, 500_000)),
+            author_following_count=int(rng.integers(0, 5000)),
+            creator_trust_score=float(rng.uniform(20, 100)),
+            creator_previous_flags=int(rng.integers(0, 3)),
+            bookmarks=int(rng.integers(0, 500)),
+            duets=int(rng.integers(0, 50)),
+            stitches=int(rng.integers(0, 50)),
+            video_duration_seconds=float(rng.uniform(10, 90)),
+            avg_watch_time_seconds=float(rng.uniform(2, 30)),
+            hashtag_count=int(rng.integers(0, 20)),
+            author_videos_last_30_days=int(rng.integers(0, 60)),
+            sound_is_trending=bool(rng.random() < 0.5),
+            platform="tiktok" if i % 2 else "instagram",
+            comment_data=CommentData(
+                texts=["nice", "follow back", "🔥🔥"] * 3 if bot_like[i]
+                else ["where is this place?", "the ending got me", "saving this for later"]
+            ),
+        )
+        for i in range(n)
+    ]
+
+
+def warm_up_pipeline(n: int, fit_batch: bool) -> np.ndarray:
+    """
+    One scoring pass over synthetic data through the stateless stages, so
+    first-call overheads are paid before real traffic. Leaves caches,
+    metrics and the online/campaign state untouched. Returns the matrix.
+    """
+    submissions = warmup_submissions(n)
+    comment_analyses = [analyze_comments(sub.comment_data.texts) for sub in submissions]
+    columns = extract_columns(submissions, comment_analyses)
+    feature_vectors = build_feature_matrix(columns=columns)
+    RULE_ENGINE.ruleset.evaluate(columns)
+
+    ensemble = MODEL_REGISTRY.active
+    if ensemble is not None:
+        ensemble.normalized_scores(feature_vectors)
+        reference = ensemble.attribution_reference()
+        if reference is not None:
+            top_contributions(reference.dimension_scores(feature_vectors))
+    else:
+        if fit_batch:
+            batch_scores = fit_batch_scores_timed(feature_vectors, DEFAULT_CONTAMINATION, BATCH_ENSEMBLE)[0]
+            normalize_batch_scores(batch_scores)
+        batch_contributions(feature_vectors)
+    return feature_vectors
+
+
+async def warm_up() -> None:
+    """Import the detector stack, start the scoring pool and run the warm-up pass, timing each"""
+    phase_start = time.perf_counter()
+    try:
+        STARTUP["detector_import_seconds"] = await run_in_threadpool(import_detector_stack)
+
+        phase_start = time.perf_counter()
+        await run_in_threadpool(SCORING_EXECUTOR.start)
+        STARTUP["pool_start_seconds"] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        if WARMUP_BATCH_SIZE >= MIN_ENSEMBLE_BATCH:
+            # Batch fits run in the pool when there is one, so warm them there
+            feature_vectors = await run_in_threadpool(
+                warm_up_pipeline, WARMUP_BATCH_SIZE, not SCORING_EXECUTOR.enabled
+            )
+            if SCORING_EXECUTOR.enabled and MODEL_REGISTRY.active is None:
+                # One fit per worker (best effort - the pool picks who runs what)
+                await asyncio.gather(*[
+                    SCORING_EXECUTOR.run(
+                        fit_batch_scores_timed, feature_vectors, DEFAULT_CONTAMINATION, BATCH_ENSEMBLE
+                    )
+                    for _ in range(SCORING_EXECUTOR.max_workers)
+                ])
+        STARTUP["warmup_seconds"] = time.perf_counter() - phase_start
+    except Exception as e:
+        # Still serve: scoring falls back to rules if the detectors are broken
+        STARTUP["error"] = str(e)
+        logger.exception("Warm-up failed after %.2fs: %s", time.perf_counter() - phase_start, e)
+    STARTUP["ready"] = True
+    logger.info("Startup (%s): %s", STARTUP_MODE, ", ".join(
+        f"{phase} {STARTUP[f'{phase}_seconds']:.2f}s"
+        for phase in STARTUP_PHASES if STARTUP[f"{phase}_seconds"] is not None
+    ))
+
+
+async def run_periodically(interval: float, func, description: str):
+    """Run a blocking save in the thread pool every interval seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(func)
+        except (OSError, sqlite3.Error) as e:
+            logger.error("%s failed: %s", description, e)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "version": "1.0.0"}
+    ensemble = MODEL_REGISTRY.active
+    return {
+        "status": "healthy",
+        "version": "1.0.0",
+        "model_version": ensemble.version if ensemble else None,
+        "executor": SCORING_EXECUTOR.stats(),
+        "batch_ensemble": BATCH_ENSEMBLE.to_dict(),
+        "micro_batcher": SINGLE_SCORE_BATCHER.stats() if SINGLE_SCORE_BATCHER else None,
+        "online_detector": ONLINE_DETECTOR.stats() if ONLINE_DETECTOR else None,
+        "campaign_store": CAMPAIGN_STORE.stats() if CAMPAIGN_STORE else None,
+        "creator_reputation": CREATOR_STORE.stats() if CREATOR_STORE else None,
+        "video_history": VIDEO_HISTORY.stats() if VIDEO_HISTORY else None,
+        "cross_video_comments": CROSS_VIDEO_COMMENT_INDEX.stats() if CROSS_VIDEO_COMMENT_INDEX else None,
+        "score_cache": SCORE_CACHE.stats(),
+        "jobs": JOB_RUNNER.stats() if JOB_RUNNER else None,
+        "startup": STARTUP,
+    }
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the detector stack is imported and warmed (see STARTUP_MODE)"""
+    return JSONResponse(STARTUP, status_code=200 if STARTUP["ready"] else 503)
 
 
-@app.post("/score", response_model=ScoringResponse)
-async def score_submissions(request: ScoringRequest):
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint (empty when METRICS_ENABLED is off)"""
+    return PlainTextResponse(METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+async def score_features(submissions: List[VideoFeatures]) -> List[SubmissionScore]:
+    """
+    Full scoring pipeline for a batch, without request-size limits.
+    Per-batch detector fitting runs in SCORING_EXECUTOR, off the event loop.
+    """
+    global STATE_GENERATION
+    stateful = uses_state(submissions)
+    try:
+        return await _score_features(submissions)
+    finally:
+        if stateful:
+            STATE_GENERATION += 1
+
+
+async def _score_features(submissions: List[VideoFeatures]) -> List[SubmissionScore]:
+    BATCH_SIZE.observe(len(submissions))
+
+    # Analyze comments once per submission and reuse it across the pipeline
+    with STAGE_SECONDS.time(stage="comment_analysis"):
+        comment_analyses = [get_comment_analysis(sub) for sub in submissions]
+
+    # Extract feature vectors for the whole batch at once
+    with STAGE_SECONDS.time(stage="features"):
+        columns = extract_columns(submissions, comment_analyses)
+
+    # Look for the batch's comments under other videos (this batch and recent ones)
+    if CROSS_VIDEO_COMMENT_INDEX is not None:
+        with STAGE_SECONDS.time(stage="cross_video_comments"):
+            await run_in_threadpool(apply_cross_video_comments, submissions, columns)
+
+    # Fill campaign averages, baselines and creator history the caller left out
+    # from the service's own history (train.py applies the same step)
+    if CAMPAIGN_STORE is not None or CREATOR_STORE is not None:
+        with STAGE_SECONDS.time(stage="store_fill"):
+            await run_in_threadpool(
+                fill_from_stores, columns, CAMPAIGN_STORE, CREATOR_STORE, CAMPAIGN_BASELINE_MIN_SAMPLES
+            )
+
+    # Rows are compared with their campaign baselines as they were before this batch
+    if CAMPAIGN_STORE is not None:
+        with STAGE_SECONDS.time(stage="campaign_baselines"):
+            await run_in_threadpool(record_campaign_values, columns, CAMPAIGN_STORE)
+
+    # Compare each video_id's counters with its earlier snapshots
+    if VIDEO_HISTORY is not None:
+        with STAGE_SECONDS.time(stage="video_history"):
+            await run_in_threadpool(apply_video_history, columns, VIDEO_HISTORY, time.time())
+
+    with STAGE_SECONDS.time(stage="features"):
+        feature_vectors = build_feature_matrix(columns=columns)
+
+    # Score against the streaming detector, then let it learn from this batch
+    online_scores, online_samples, online_dimension_scores = None, 0, None
+    if ONLINE_DETECTOR is not None:
+        with STAGE_SECONDS.time(stage="online"):
+            scores, online_samples, dimension_scores = await run_in_threadpool(
+                ONLINE_DETECTOR.score_and_update, feature_vectors, columns["platform"]
+            )
+        if not np.isnan(scores).any():
+            online_scores, online_dimension_scores = scores, dimension_scores
+
+    # Fit the detectors in the process pool when there's no pretrained or online model
+    batch_scores, nearest_distances, results = None, None, None
+    if MODEL_REGISTRY.active is None and online_scores is None and len(submissions) >= MIN_ENSEMBLE_BATCH:
+        try:
+            # Includes time queued for a pool worker
+            with STAGE_SECONDS.time(stage="ensemble_fit"):
+                batch_scores, fit_timings, nearest_distances = await SCORING_EXECUTOR.run(
+                    fit_batch_scores_timed, feature_vectors, DEFAULT_CONTAMINATION, BATCH_ENSEMBLE
+                )
+            observe_detector_timings(fit_timings)
+        except Exception as e:
+            # Fallback to rule-based on error
+            logger.exception("PyOD error, falling back to rules: %s", e)
+            FALLBACKS_TOTAL.inc()
+            results = calculate_rule_based_scores(submissions, columns=columns)
+
+    # Calculate scores (pretrained inference, attribution and rules) off the event loop
+    if results is None:
+        results = await run_in_threadpool(
+            calculate_bot_score, feature_vectors, submissions, comment_analyses,
+            columns=columns, batch_scores=batch_scores,
+            online_scores=online_scores, online_samples=online_samples,
+            online_dimension_scores=online_dimension_scores, nearest_distances=nearest_distances
+        )
+
+    # Each outcome becomes part of its creator's reputation
+    if CREATOR_STORE is not None:
+        await run_in_threadpool(
+            record_creator_outcomes, columns, np.array([r.bot_score for r in results]), CREATOR_STORE
+        )
+    return results
+
+
+# /score response cache - dashboards resend identical batches on every refresh.
+# A hit skips the whole pipeline, including online-detector and campaign
+# baseline updates, so a resent batch is not learned from twice. Batches that
+# use the stateful stores are also keyed by STATE_GENERATION after their own
+# pass: a resend hits until another such batch is scored. Other batches don't
+# depend on that state and stay cached.
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", "512"))  # Responses kept; 0 disables
+SCORE_CACHE_TTL_SECONDS = float(os.getenv("SCORE_CACHE_TTL_SECONDS", "300"))
+
+SCORE_CACHE = LRUTTLCache(maxsize=SCORE_CACHE_SIZE, ttl_seconds=SCORE_CACHE_TTL_SECONDS)
+# Raw body digest -> canonical key, so byte-identical resends skip decoding
+SCORE_CACHE_ALIASES = LRUTTLCache(maxsize=SCORE_CACHE_SIZE, ttl_seconds=SCORE_CACHE_TTL_SECONDS)
+
+
+def score_cache_key(payload: bytes) -> str:
+    """
+    Hash of payload plus what else the response depends on: the active
+    pretrained model and the rule table version.
+    """
+    ensemble = MODEL_REGISTRY.active
+    RULE_ENGINE.reload_if_changed()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{ensemble.version if ensemble else ''}|{RULE_ENGINE.version}|".encode())
+    digest.update(payload)
+    return digest.hexdigest()
+
+
+def state_cache_key(key: str, stateful: bool, generation: int) -> str:
+    """SCORE_CACHE key for a canonical key, tied to the state generation when the batch uses state"""
+    return f"{key}@{generation}" if stateful else key
+
+
+def cached_json_response(content: bytes, status: str) -> Response:
+    return Response(content=content, media_type="application/json", headers={"X-Cache": status})
+
+
+@app.post("/score", response_model=ScoringResponse, openapi_extra=json_body_openapi(ScoringRequest))
+async def score_submissions(http_request: Request):
     """
     Score video submissions for bot/fraud probability.
 
@@ -693,22 +1139,60 @@ async def score_submissions(request: ScoringRequest):
     - 40-60: Uncertain, may need review
     - 60-80: Suspicious, likely fraudulent
     - 80-100: Very likely bot/fraud
+
+    Responses are cached by request content (X-Cache: HIT/MISS/BYPASS).
+    Send Cache-Control: no-cache to rescore and refresh the entry, or
+    no-store to rescore without caching.
     """
+    body = await http_request.body()
+    cache_control = http_request.headers.get("cache-control", "").lower()
+    use_cache = SCORE_CACHE.maxsize > 0 and "no-cache" not in cache_control and "no-store" not in cache_control
+    store = SCORE_CACHE.maxsize > 0 and "no-store" not in cache_control
+
+    generation = STATE_GENERATION
+    raw_key = score_cache_key(body) if store else None
+    if use_cache:
+        alias = SCORE_CACHE_ALIASES.get(raw_key)
+        content = SCORE_CACHE.get(state_cache_key(*alias, generation)) if alias is not None else None
+        if content is not None:
+            return cached_json_response(content, "HIT")
+
+    request = decode_body(SCORING_REQUEST_CODEC, body)
+    observe_parse_time()
     if not request.submissions:
         raise HTTPException(status_code=400, detail="No submissions provided")
 
     if len(request.submissions) > 100:
         raise HTTPException(status_code=400, detail="Maximum 100 submissions per request")
 
-    # Extract feature vectors
-    feature_vectors = np.array([
-        extract_feature_vector(sub) for sub in request.submissions
-    ])
-
-    # Calculate scores
-    scores = calculate_bot_score(feature_vectors, request.submissions)
-
-    return ScoringResponse(scores=scores)
+    # Canonical form: every field in model order, defaults filled in
+    key = score_cache_key(ModelCodec.encode(request)) if store else None
+    stateful = uses_state(request.submissions)
+    if use_cache:
+        content = SCORE_CACHE.get(state_cache_key(key, stateful, generation))
+        if content is not None:
+            SCORE_CACHE_ALIASES.set(raw_key, (key, stateful))
+            return cached_json_response(content, "HIT")
+
+    scores = await score_features(request.submissions)
+    content = ModelCodec.encode(ScoringResponse.model_construct(scores=scores))
+
+    # A stateful batch is only cached when no other pass changed the state while it ran
+    if store and (not stateful or STATE_GENERATION == generation + 1):
+        SCORE_CACHE.set(state_cache_key(key, stateful, STATE_GENERATION), content)
+        SCORE_CACHE_ALIASES.set(raw_key, (key, stateful))
+    return cached_json_response(content, "MISS" if use_cache else "BYPASS")
+
+
+# Opt-in micro-batching of concurrent /score/single calls
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "100"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "5"))
+
+SINGLE_SCORE_BATCHER: Optional[MicroBatcher] = (
+    MicroBatcher(score_features, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS)
+    if MICRO_BATCH_ENABLED else None
+)
 
 
 @app.post("/score/single", response_model=SubmissionScore)
@@ -716,9 +1200,343 @@ async def score_single_submission(features: VideoFeatures):
     """
     Score a single video submission.
     Convenience endpoint that wraps the batch scoring.
+    With MICRO_BATCH_ENABLED, concurrent calls are scored together as one batch.
+    """
+    observe_parse_time()
+    if SINGLE_SCORE_BATCHER is not None:
+        return await SINGLE_SCORE_BATCHER.submit(features)
+
+    return (await score_features([features]))[0]
+
+
+# =============================================================================
+# STREAMING BULK SCORING
+# =============================================================================
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "100"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator reads the request body as it goes.
+    Starlette's disconnect listener would swallow request body messages, so it
+    is skipped; a client disconnect surfaces through request.stream() instead.
     """
-    response = await score_submissions(ScoringRequest(submissions=[features]))
-    return response.scores[0]
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+class LineTooLongError(ValueError):
+    """An NDJSON line exceeded STREAM_MAX_LINE_BYTES"""
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int
+) -> AsyncIterator[Union[bytes, LineTooLongError]]:
+    """
+    Split a byte stream into non-blank lines without buffering the whole body.
+    Oversized lines are skipped and reported as LineTooLongError items.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                break
+            line, buffer = buffer[:newline], buffer[newline + 1:]
+            if skipping:
+                skipping = False
+                continue
+            if len(line) > max_line_bytes:
+                yield LineTooLongError(f"Line exceeds {max_line_bytes} bytes")
+            elif line.strip():
+                yield line
+        if len(buffer) > max_line_bytes and not skipping:
+            yield LineTooLongError(f"Line exceeds {max_line_bytes} bytes")
+            skipping = True
+        if skipping:
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield buffer
+
+
+async def _score_stream_chunk(entries: List[Union[VideoFeatures, dict]]) -> AsyncIterator[str]:
+    """Score the valid entries of a chunk and emit one NDJSON line per entry, in order"""
+    submissions = [e for e in entries if isinstance(e, VideoFeatures)]
+    scores = iter(await score_features(submissions) if submissions else [])
+    for entry in entries:
+        if isinstance(entry, VideoFeatures):
+            yield next(scores).model_dump_json() + "\n"
+        else:
+            yield json.dumps(entry, default=str) + "\n"
+
+
+@app.post("/score/stream")
+async def score_stream(request: Request):
+    """
+    Bulk-score newline-delimited VideoFeatures JSON with no size cap.
+
+    Input is read and scored in chunks of STREAM_CHUNK_SIZE, and results are
+    streamed back as NDJSON as each chunk finishes, so memory stays flat.
+    Output line i belongs to non-blank input line i: a SubmissionScore, or
+    {"error": ..., "detail": ...} if that line could not be parsed.
+    """
+    async def results() -> AsyncIterator[str]:
+        entries: List[Union[VideoFeatures, dict]] = []
+        async for line in iter_ndjson_lines(request.stream(), STREAM_MAX_LINE_BYTES):
+            if isinstance(line, LineTooLongError):
+                entries.append({"error": "line_too_long", "detail": str(line)})
+            else:
+                try:
+                    entries.append(VIDEO_FEATURES_CODEC.decode(line))
+                except ValidationError as e:
+                    entries.append({
+                        "error": "invalid_submission",
+                        "detail": e.errors(include_url=False, include_input=False),
+                    })
+
+            if len(entries) >= STREAM_CHUNK_SIZE:
+                async for out in _score_stream_chunk(entries):
+                    yield out
+                entries = []
+
+        if entries:
+            async for out in _score_stream_chunk(entries):
+                yield out
+
+    return RequestStreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# =============================================================================
+# SCORING JOBS (asynchronous, see job_queue.py)
+# =============================================================================
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() in ("1", "true", "yes")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "state/jobs.sqlite3")
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))  # Jobs processed at once
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "100"))  # Scores are relative to the chunk, as to a /score call
+JOB_MAX_SUBMISSIONS = int(os.getenv("JOB_MAX_SUBMISSIONS", "1000000"))
+JOB_RESULTS_PAGE_MAX = int(os.getenv("JOB_RESULTS_PAGE_MAX", "10000"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "72"))  # Finished jobs are deleted after this
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))  # Running job without progress is re-queued
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+JOB_PRUNE_INTERVAL_SECONDS = float(os.getenv("JOB_PRUNE_INTERVAL_SECONDS", "3600"))
+
+
+async def score_job_chunk(payload: bytes) -> bytes:
+    """One stored chunk (an encoded ScoringRequest) through the /score pipeline"""
+    request = SCORING_REQUEST_CODEC.decode(payload)
+    scores = await score_features(request.submissions)
+    return ModelCodec.encode(ScoringResponse.model_construct(scores=scores))
+
+
+JOB_STORE: Optional[JobStore] = (
+    JobStore(JOB_STORE_PATH, retention_seconds=JOB_RETENTION_HOURS * 3600) if JOBS_ENABLED else None
+)
+JOB_RUNNER: Optional[JobRunner] = (
+    JobRunner(
+        JOB_STORE, score_job_chunk,
+        concurrency=JOB_CONCURRENCY,
+        poll_interval=JOB_POLL_INTERVAL_SECONDS,
+        stale_seconds=JOB_STALE_SECONDS,
+    )
+    if JOBS_ENABLED else None
+)
+
+
+class JobStatus(BaseModel):
+    """Progress of a scoring job"""
+    job_id: str
+    status: str  # queued, running, completed, failed, cancelled
+    total: int
+    processed: int
+    chunk_size: int
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+
+class JobResultsResponse(BaseModel):
+    """A job's status and one page of its results, in submission order"""
+    job: JobStatus
+    offset: int
+    results: List[SubmissionScore]
+    next_offset: Optional[int] = None  # Set while more results exist or are still coming
+
+
+def job_status(job: dict) -> JobStatus:
+    def iso(timestamp: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp is not None else None
+
+    return JobStatus(**{
+        **job,
+        **{key: iso(job[key]) for key in ("created_at", "started_at", "finished_at")},
+    })
+
+
+def require_jobs() -> JobStore:
+    if JOB_STORE is None:
+        raise HTTPException(status_code=404, detail="Scoring jobs are disabled")
+    return JOB_STORE
+
+
+def encode_job_chunks(submissions: List[VideoFeatures], chunk_size: int) -> List[Tuple[int, bytes]]:
+    return [
+        (len(chunk), ModelCodec.encode(ScoringRequest.model_construct(submissions=chunk)))
+        for chunk in (submissions[i:i + chunk_size] for i in range(0, len(submissions), chunk_size))
+    ]
+
+
+@app.post("/jobs", response_model=JobStatus, status_code=202, openapi_extra=json_body_openapi(ScoringRequest))
+async def submit_job(http_request: Request):
+    """
+    Queue a batch of submissions of any size for background scoring.
+    Returns the job id at once; poll GET /jobs/{job_id} for progress and results.
+    """
+    store = require_jobs()
+    request = decode_body(SCORING_REQUEST_CODEC, await http_request.body())
+    if not request.submissions:
+        raise HTTPException(status_code=400, detail="No submissions provided")
+
+    if len(request.submissions) > JOB_MAX_SUBMISSIONS:
+        raise HTTPException(status_code=400, detail=f"Maximum {JOB_MAX_SUBMISSIONS} submissions per job")
+
+    chunks = await run_in_threadpool(encode_job_chunks, request.submissions, JOB_CHUNK_SIZE)
+    job = await run_in_threadpool(store.create, chunks, JOB_CHUNK_SIZE)
+    JOB_RUNNER.notify()
+    return json_response(job_status(job), status_code=202)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResultsResponse)
+async def get_job(job_id: str, offset: int = 0, limit: int = 1000):
+    """A job's progress and the page of results starting at offset (results so far while it runs)"""
+    store = require_jobs()
+    if offset < 0 or not 1 <= limit <= JOB_RESULTS_PAGE_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"offset must be >= 0 and limit between 1 and {JOB_RESULTS_PAGE_MAX}"
+        )
+    job = await run_in_threadpool(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    chunk_size = job["chunk_size"]
+    end = min(offset + limit, job["total"])
+    results: List[dict] = []
+    if offset < end:
+        chunks = await run_in_threadpool(store.results, job_id, offset // chunk_size, (end - 1) // chunk_size)
+        # Chunks finish in order; stop at the first one not done yet
+        for expected, (chunk, payload) in enumerate(chunks, start=offset // chunk_size):
+            if chunk != expected:
+                break
+            results.extend(json.loads(payload)["scores"])
+        skip = offset - (offset // chunk_size) * chunk_size
+        results = results[skip:skip + (end - offset)]
+
+    next_offset = offset + len(results)
+    pending = job["status"] in ("queued", "running")
+    return json_response(JobResultsResponse.model_construct(
+        job=job_status(job),
+        offset=offset,
+        results=[SubmissionScore.model_construct(**result) for result in results],
+        next_offset=next_offset if next_offset < job["total"] and (pending or next_offset < job["processed"]) else None,
+    ))
+
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; results scored so far stay available"""
+    store = require_jobs()
+    job = await run_in_threadpool(store.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return json_response(job_status(job))
+
+
+# =============================================================================
+# ADMIN ENDPOINTS
+# =============================================================================
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """Bearer-token check for admin endpoints (disabled without ADMIN_API_TOKEN)"""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled")
+    expected = f"Bearer {ADMIN_API_TOKEN}"
+    if not authorization or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+class ModelActivationRequest(BaseModel):
+    """Request to switch the active pretrained model"""
+    version: str
+
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+async def list_models():
+    """List saved model versions and which one is active"""
+    ensemble = MODEL_REGISTRY.active
+    return {
+        "active_version": ensemble.version if ensemble else None,
+        "feature_schema_hash": MODEL_REGISTRY.feature_schema_hash,
+        "versions": await run_in_threadpool(MODEL_REGISTRY.list_versions),
+    }
+
+
+@app.post("/admin/models/activate", dependencies=[Depends(require_admin)])
+async def activate_model(request: ModelActivationRequest):
+    """
+    Atomically switch to another model version.
+    The new model is fully loaded before the swap; in-flight requests
+    finish on the model they started with.
+    """
+    try:
+        ensemble = await run_in_threadpool(MODEL_REGISTRY.activate, request.version)
+    except ModelRegistryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"active_version": ensemble.version, "metadata": ensemble.metadata()}
+
+
+@app.post("/admin/models/deactivate", dependencies=[Depends(require_admin)])
+async def deactivate_model():
+    """Stop using a pretrained model and go back to fitting per batch"""
+    await run_in_threadpool(MODEL_REGISTRY.deactivate)
+    return {"active_version": None}
+
+
+@app.get("/admin/campaigns/{campaign_id}/baseline", dependencies=[Depends(require_admin)])
+async def campaign_baseline(campaign_id: str):
+    """Current engagement baseline the service keeps for a campaign"""
+    if CAMPAIGN_STORE is None:
+        raise HTTPException(status_code=404, detail="Campaign baselines are disabled")
+    summaries = await run_in_threadpool(CAMPAIGN_STORE.summaries, [campaign_id])
+    return {
+        "campaign_id": campaign_id,
+        "min_samples": CAMPAIGN_BASELINE_MIN_SAMPLES,
+        **summaries[campaign_id],
+    }
+
+
+@app.get("/admin/creators/{creator_id}/reputation", dependencies=[Depends(require_admin)])
+async def creator_reputation(creator_id: str):
+    """Current decayed reputation the service keeps for a creator"""
+    if CREATOR_STORE is None:
+        raise HTTPException(status_code=404, detail="Creator reputation is disabled")
+    summaries = await run_in_threadpool(CREATOR_STORE.summaries, [creator_id])
+    return {
+        "creator_id": creator_id,
+        "flag_score": CREATOR_FLAG_SCORE,
+        **summaries[creator_id],
+    }
 
 
 # =============================================================================
@@ -730,6 +1548,9 @@ class CommentAnalysisRequest(BaseModel):
     comments: List[str]
 
 
+COMMENT_ANALYSIS_REQUEST_CODEC = ModelCodec(CommentAnalysisRequest, use_msgspec=JSON_DECODER == "msgspec")
+
+
 class CommentAnalysisResponse(BaseModel):
     """Response with comment analysis results"""
     total_comments: int
@@ -743,8 +1564,12 @@ class CommentAnalysisResponse(BaseModel):
     flags: List[str]
 
 
-@app.post("/analyze/comments", response_model=CommentAnalysisResponse)
-async def analyze_comments_endpoint(request: CommentAnalysisRequest):
+@app.post(
+    "/analyze/comments",
+    response_model=CommentAnalysisResponse,
+    openapi_extra=json_body_openapi(CommentAnalysisRequest)
+)
+async def analyze_comments_endpoint(http_request: Request):
     """
     Analyze a list of comments for bot-like patterns.
     Standalone endpoint - doesn't require video metrics.
@@ -756,15 +1581,18 @@ async def analyze_comments_endpoint(request: CommentAnalysisRequest):
     - 60-80: Suspicious patterns detected
     - 80-100: Strong bot/fake comment indicators
     """
+    request = decode_body(COMMENT_ANALYSIS_REQUEST_CODEC, await http_request.body())
     if not request.comments:
         raise HTTPException(status_code=400, detail="No comments provided")
 
     if len(request.comments) > 1000:
         raise HTTPException(status_code=400, detail="Maximum 1000 comments per request")
 
-    analysis = analyze_comments(request.comments)
+    return json_response(comment_analysis_response(analyze_comments_cached(request.comments)))
+
 
-    # Generate flags
+def comment_analysis_response(analysis: dict) -> CommentAnalysisResponse:
+    """Flags and verdict for a comment analysis"""
     flags = []
     if analysis["generic_ratio"] > 0.5:
         flags.append("high_generic_comments")
@@ -807,6 +1635,128 @@ async def analyze_comments_endpoint(request: CommentAnalysisRequest):
     )
 
 
+# Batch comment analysis - many videos' comment sets in one call
+COMMENT_BATCH_MAX_VIDEOS = int(os.getenv("COMMENT_BATCH_MAX_VIDEOS", "500"))
+# Below this many uncached comments the batch is scanned in one thread;
+# shipping it to the process pool would cost more than it saves
+COMMENT_BATCH_PARALLEL_MIN_COMMENTS = int(os.getenv("COMMENT_BATCH_PARALLEL_MIN_COMMENTS", "5000"))
+
+GENERIC_BOT_PATTERNS = tuple(GENERIC_BOT_COMMENTS)
+
+
+def split_by_weight(weights: List[int], n_chunks: int) -> List[slice]:
+    """Contiguous slices of roughly equal total weight (at most n_chunks, none empty)"""
+    bounds = np.cumsum(weights)
+    cuts = np.searchsorted(bounds, bounds[-1] * np.arange(1, n_chunks) / n_chunks) + 1
+    edges = np.unique(np.concatenate(([0], np.minimum(cuts, len(weights)), [len(weights)]))).tolist()
+    return [slice(start, stop) for start, stop in zip(edges, edges[1:])]
+
+
+async def analyze_comment_sets(comment_lists: List[List[str]]) -> List[dict]:
+    """
+    analyze_comments_cached() for many comment lists.
+    Cache misses are scanned across SCORING_EXECUTOR's processes in chunks
+    of about equal comment count, one per worker.
+    """
+    keys = [comment_cache_key(comments) for comments in comment_lists]
+    analyses = [COMMENT_ANALYSIS_CACHE.get(key) for key in keys]
+    missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+    if not missing:
+        return analyses
+
+    missing_lists = [comment_lists[i] for i in missing]
+    weights = [len(comments) for comments in missing_lists]
+    if SCORING_EXECUTOR.enabled and sum(weights) >= COMMENT_BATCH_PARALLEL_MIN_COMMENTS:
+        chunks = split_by_weight(weights, SCORING_EXECUTOR.max_workers)
+        results = await asyncio.gather(*[
+            SCORING_EXECUTOR.run(scan_many, GENERIC_BOT_PATTERNS, missing_lists[chunk])
+            for chunk in chunks
+        ])
+        scanned = [analysis for chunk_result in results for analysis in chunk_result]
+    else:
+        scanned = await run_in_threadpool(scan_many, GENERIC_BOT_PATTERNS, missing_lists)
+
+    for i, analysis in zip(missing, scanned):
+        analyses[i] = analysis
+        COMMENT_ANALYSIS_CACHE.set(keys[i], analysis)
+    return analyses
+
+
+class CommentBatchAnalysisRequest(BaseModel):
+    """Comment sets to analyze, keyed by video id"""
+    videos: Dict[str, List[str]]
+
+
+COMMENT_BATCH_REQUEST_CODEC = ModelCodec(CommentBatchAnalysisRequest, use_msgspec=JSON_DECODER == "msgspec")
+
+
+class CommentBatchAggregate(BaseModel):
+    """Totals across every video in a batch"""
+    total_videos: int
+    total_comments: int
+    avg_bot_pattern_score: float  # Weighted by comment count
+    max_bot_pattern_score: float
+    verdict_counts: Dict[str, int]
+    flagged_videos: List[str]  # Verdict suspicious or likely_fake
+
+
+class CommentBatchAnalysisResponse(BaseModel):
+    """Per-video comment analysis plus the batch aggregate"""
+    results: Dict[str, CommentAnalysisResponse]
+    aggregate: CommentBatchAggregate
+
+
+@app.post(
+    "/analyze/comments/batch",
+    response_model=CommentBatchAnalysisResponse,
+    openapi_extra=json_body_openapi(CommentBatchAnalysisRequest)
+)
+async def analyze_comments_batch_endpoint(http_request: Request):
+    """
+    Analyze the comments of many videos at once, e.g. a creator's recent uploads.
+    Each video gets the same result as /analyze/comments; the analysis runs
+    in parallel across the scoring process pool.
+    """
+    request = decode_body(COMMENT_BATCH_REQUEST_CODEC, await http_request.body())
+    if not request.videos:
+        raise HTTPException(status_code=400, detail="No videos provided")
+
+    if len(request.videos) > COMMENT_BATCH_MAX_VIDEOS:
+        raise HTTPException(status_code=400, detail=f"Maximum {COMMENT_BATCH_MAX_VIDEOS} videos per request")
+
+    for video_id, comments in request.videos.items():
+        if not comments:
+            raise HTTPException(status_code=400, detail=f"No comments provided for video {video_id}")
+        if len(comments) > 1000:
+            raise HTTPException(status_code=400, detail=f"Maximum 1000 comments per video ({video_id})")
+
+    video_ids = list(request.videos)
+    analyses = await analyze_comment_sets(list(request.videos.values()))
+    results = {video_id: comment_analysis_response(a) for video_id, a in zip(video_ids, analyses)}
+
+    total_comments = sum(a["total_comments"] for a in analyses)
+    verdict_counts: dict = {}
+    for result in results.values():
+        verdict_counts[result.verdict] = verdict_counts.get(result.verdict, 0) + 1
+
+    return json_response(CommentBatchAnalysisResponse(
+        results=results,
+        aggregate=CommentBatchAggregate(
+            total_videos=len(results),
+            total_comments=total_comments,
+            avg_bot_pattern_score=sum(
+                a["bot_pattern_score"] * a["total_comments"] for a in analyses
+            ) / total_comments,
+            max_bot_pattern_score=max(a["bot_pattern_score"] for a in analyses),
+            verdict_counts=verdict_counts,
+            flagged_videos=[
+                video_id for video_id, result in results.items()
+                if result.verdict in ("suspicious", "likely_fake")
+            ],
+        ),
+    ))
+
+
 # =============================================================================
 # TIKTOK-SPECIFIC ENDPOINT
 # =============================================================================
@@ -839,104 +1789,58 @@ async def tiktok_quick_check(request: TikTokQuickCheckRequest):
 
     Returns authenticity_score (0-100) where higher = more likely authentic.
     """
-    flags = []
-    risk_score = 0  # Lower is better
-
-    # Follower/Following ratio analysis
-    if request.following_count > 0:
-        ff_ratio = request.follower_count / request.following_count
-    else:
-        ff_ratio = request.follower_count if request.follower_count > 0 else 0
-
-    # Engagement per follower
-    if request.follower_count > 0:
-        likes_per_follower = request.total_likes / request.follower_count
-    else:
-        likes_per_follower = 0
-
-    # Videos per day (posting velocity)
-    if request.account_age_days > 0:
-        videos_per_day = request.video_count / request.account_age_days
-    else:
-        videos_per_day = request.video_count
-
-    # === FLAG CHECKS ===
-
-    # Following way more than followers (engagement farming)
-    if request.following_count > 3000 and ff_ratio < 0.3:
-        flags.append("engagement_farming_pattern")
-        risk_score += 25
-
-    # Very new account with lots of followers (bought followers)
-    if request.account_age_days < 30 and request.follower_count > 10000:
-        flags.append("new_account_high_followers")
-        risk_score += 20
+    try:
+        result = quick_check_profiles([request])[0]
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="Counts must fit in a 64-bit integer")
+    return TikTokQuickCheckResponse(**result)
 
-    # Low engagement relative to followers
-    if request.follower_count > 1000 and likes_per_follower < 0.1:
-        flags.append("low_engagement_ratio")
-        risk_score += 15
 
-    # Excessive posting (content farm)
-    if videos_per_day > 5:
-        flags.append("excessive_posting_rate")
-        risk_score += 15
+# Profile quick-checks per batch call
+QUICK_CHECK_BATCH_MAX_PROFILES = int(os.getenv("QUICK_CHECK_BATCH_MAX_PROFILES", "50000"))
 
-    # Zero following (often bot pattern)
-    if request.following_count == 0 and request.follower_count > 500:
-        flags.append("zero_following")
-        risk_score += 10
 
-    # Very high follower count but no verification
-    if request.follower_count > 100000 and not request.verified:
-        flags.append("high_followers_unverified")
-        risk_score += 10
+class TikTokQuickCheckBatchRequest(BaseModel):
+    """Many TikTok profiles to quick-check at once"""
+    profiles: List[TikTokQuickCheckRequest]
 
-    # Unusual engagement patterns if we have video-level data
-    if request.avg_views_per_video and request.avg_comments_per_video:
-        if request.avg_views_per_video > 10000 and request.avg_comments_per_video < 5:
-            flags.append("high_views_low_comments")
-            risk_score += 20
 
-    # === POSITIVE SIGNALS (reduce risk) ===
+TIKTOK_QUICK_CHECK_BATCH_CODEC = ModelCodec(TikTokQuickCheckBatchRequest, use_msgspec=JSON_DECODER == "msgspec")
 
-    if request.verified:
-        risk_score -= 20
 
-    if request.account_age_days > 365:
-        risk_score -= 10
+class TikTokQuickCheckBatchResponse(BaseModel):
+    """Quick check results, in request order"""
+    results: List[TikTokQuickCheckResponse]
 
-    if 1 < ff_ratio < 50:  # Healthy ratio
-        risk_score -= 5
 
-    if 0.1 < videos_per_day < 2:  # Normal posting rate
-        risk_score -= 5
+@app.post(
+    "/tiktok/quick-check/batch",
+    response_model=TikTokQuickCheckBatchResponse,
+    openapi_extra=json_body_openapi(TikTokQuickCheckBatchRequest)
+)
+async def tiktok_quick_check_batch(http_request: Request):
+    """
+    Quick authenticity check for many TikTok profiles, e.g. every creator
+    applying to a campaign. Each result is what /tiktok/quick-check returns
+    for that profile; the whole list is scored with column operations.
+    """
+    request = decode_body(TIKTOK_QUICK_CHECK_BATCH_CODEC, await http_request.body())
+    if not request.profiles:
+        raise HTTPException(status_code=400, detail="No profiles provided")
 
-    # Clamp risk score
-    risk_score = max(0, min(100, risk_score))
+    if len(request.profiles) > QUICK_CHECK_BATCH_MAX_PROFILES:
+        raise HTTPException(
+            status_code=400, detail=f"Maximum {QUICK_CHECK_BATCH_MAX_PROFILES} profiles per request"
+        )
 
-    # Convert to authenticity score (inverse of risk)
-    authenticity_score = 100 - risk_score
+    try:
+        results = quick_check_profiles(request.profiles)
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="Counts must fit in a 64-bit integer")
 
-    # Determine risk level
-    if risk_score < 25:
-        risk_level = "low"
-    elif risk_score < 50:
-        risk_level = "medium"
-    else:
-        risk_level = "high"
-
-    return TikTokQuickCheckResponse(
-        authenticity_score=authenticity_score,
-        risk_level=risk_level,
-        flags=flags,
-        metrics={
-            "follower_following_ratio": round(ff_ratio, 2),
-            "likes_per_follower": round(likes_per_follower, 2),
-            "videos_per_day": round(videos_per_day, 3),
-            "account_age_days": request.account_age_days,
-        }
-    )
+    return json_response(TikTokQuickCheckBatchResponse.model_construct(
+        results=[TikTokQuickCheckResponse.model_construct(**result) for result in results]
+    ))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+"""
+Versioned on-disk registry of pretrained detector ensembles.
+
+Layout under MODEL_DIR:
+    <version>/model.joblib     pickled PretrainedEnsemble
+    <version>/metadata.json    version, feature schema hash, training stats
+    ACTIVE                     name of the version served at startup
+
+The active ensemble is swapped by replacing a single reference, so requests
+already scoring with the old model finish with it undisturbed.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import List, Optional
+
+import joblib
+
+from detectors import PretrainedEnsemble
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = "model.joblib"
+METADATA_FILENAME = "metadata.json"
+ACTIVE_FILENAME = "ACTIVE"
+
+_VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+
+
+class ModelRegistryError(Exception):
+    """Raised when a model version can't be saved, found or activated"""
+
+
+def validate_version(version: str) -> str:
+    if not _VERSION_PATTERN.match(version or ""):
+        raise ModelRegistryError(f"Invalid model version {version!r}")
+    return version
+
+
+class ModelRegistry:
+    """
+    Saves, lists and loads ensemble versions and holds the active one.
+    Models whose feature schema hash differs from the running code are refused.
+    """
+
+    def __init__(self, model_dir: str, feature_schema_hash: str):
+        self.model_dir = model_dir
+        self.feature_schema_hash = feature_schema_hash
+        self._active: Optional[PretrainedEnsemble] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> Optional[PretrainedEnsemble]:
+        """The ensemble to score with (read once per request)"""
+        return self._active
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.model_dir, validate_version(version))
+
+    def list_versions(self) -> List[dict]:
+        versions = []
+        if not os.path.isdir(self.model_dir):
+            return versions
+        active_version = self._active.version if self._active else None
+        for name in sorted(os.listdir(self.model_dir)):
+            metadata_path = os.path.join(self.model_dir, name, METADATA_FILENAME)
+            if not os.path.isfile(metadata_path):
+                continue
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            metadata["active"] = metadata.get("version") == active_version
+            metadata["compatible"] = metadata.get("feature_schema_hash") == self.feature_schema_hash
+            versions.append(metadata)
+        return versions
+
+    def save(self, ensemble: PretrainedEnsemble) -> str:
+        """Write a new version; existing versions are never overwritten"""
+        target = self._version_dir(ensemble.version)
+        if os.path.exists(target):
+            raise ModelRegistryError(f"Model version {ensemble.version!r} already exists")
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.model_dir)
+        try:
+            joblib.dump(ensemble, os.path.join(staging, MODEL_FILENAME))
+            with open(os.path.join(staging, METADATA_FILENAME), "w", encoding="utf-8") as f:
+                json.dump(ensemble.metadata(), f, indent=2)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return target
+
+    def load(self, version: str) -> PretrainedEnsemble:
+        model_path = os.path.join(self._version_dir(version), MODEL_FILENAME)
+        if not os.path.isfile(model_path):
+            raise ModelRegistryError(f"Model version {version!r} not found")
+
+        ensemble = joblib.load(model_path)
+        if not isinstance(ensemble, PretrainedEnsemble):
+            raise ModelRegistryError(f"Model version {version!r} is not a PretrainedEnsemble")
+        if ensemble.feature_schema_hash != self.feature_schema_hash:
+            raise ModelRegistryError(
+                f"Model version {version!r} was trained on feature schema "
+                f"{ensemble.feature_schema_hash}, service uses {self.feature_schema_hash}"
+            )
+        return ensemble
+
+    def activate(self, version: str, persist: bool = True) -> PretrainedEnsemble:
+        """
+        Load a version fully, then atomically make it the active model.
+        With persist, the choice is recorded in ACTIVE for the next startup.
+        """
+        ensemble = self.load(version)
+        with self._lock:
+            if persist:
+                self._write_active(version)
+            self._active = ensemble
+        logger.info("Activated model version %s", version)
+        return ensemble
+
+    def deactivate(self) -> None:
+        """Go back to fitting detectors per batch"""
+        with self._lock:
+            active_path = os.path.join(self.model_dir, ACTIVE_FILENAME)
+            if os.path.exists(active_path):
+                os.remove(active_path)
+            self._active = None
+
+    def load_active(self, version: Optional[str] = None) -> Optional[PretrainedEnsemble]:
+        """
+        Startup load: the given version, else the one named in ACTIVE.
+        Problems are logged and leave the service on per-batch fitting.
+        """
+        if version is None:
+            active_path = os.path.join(self.model_dir, ACTIVE_FILENAME)
+            if not os.path.isfile(active_path):
+                return None
+            with open(active_path, "r", encoding="utf-8") as f:
+                version = f.read().strip()
+        try:
+            return self.activate(version, persist=False)
+        except (ModelRegistryError, OSError, ValueError) as e:
+            logger.error("Could not load model version %r, fitting per batch instead: %s", version, e)
+            return None
+
+    def _write_active(self, version: str) -> None:
+        os.makedirs(self.model_dir, exist_ok=True)
+        tmp_path = os.path.join(self.model_dir, f".{ACTIVE_FILENAME}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.model_dir, ACTIVE_FILENAME))
@@ -0,0 +1,355 @@
+"""
+Streaming anomaly detector that learns from every scored submission.
+
+StreamingECOD follows ECOD (empirical-CDF outlier detection) but keeps each
+feature's distribution in a fixed-size, exponentially decayed histogram
+instead of the raw batch. Scoring a row reads one bin per feature, updating
+adds one weighted count per feature, so memory is constant and each
+submission costs O(1) amortized:
+
+- features are compared on a sign(x) * log1p(|x|) scale; bin ranges are
+  fixed from the first `warmup` rows (values outside land in the edge bins)
+- decay is applied lazily: each new row gets a weight growing by a constant
+  factor, and everything is rescaled when the weights get large
+- raw ECOD scores are turned into 0-100 by their percentile among recent
+  raw scores, also kept in a decayed histogram
+
+OnlineDetector holds one StreamingECOD for all traffic and, optionally, one
+per platform, and checkpoints them to a directory so a restart resumes
+where it stopped. State is per process: give each uvicorn worker its own
+state directory.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from attribution import dimension_scores_from_tails
+
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT_VERSION = 1
+GLOBAL_KEY = "_all"
+
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Calibration histogram over log1p(raw score)
+_SCORE_BINS = 256
+_SCORE_LOG_MAX = 8.0
+
+
+def _transform(X: np.ndarray) -> np.ndarray:
+    return np.sign(X) * np.log1p(np.abs(X))
+
+
+class StreamingECOD:
+    """ECOD-style detector over decayed per-feature histograms"""
+
+    def __init__(self, n_features: int, n_bins: int = 64, warmup: int = 256, half_life: float = 50_000):
+        self.n_features = int(n_features)
+        self.n_bins = int(n_bins)
+        self.warmup = max(int(warmup), 2)
+        self.half_life = float(half_life)
+        self._growth = 2.0 ** (1.0 / self.half_life)
+
+        self.lo = np.zeros(self.n_features)
+        self.width = np.ones(self.n_features)
+        self.counts = np.zeros((self.n_features, self.n_bins))
+        self.moments = np.zeros((4, self.n_features))  # weighted sum of t^0..t^3
+        self.score_counts = np.zeros(_SCORE_BINS)
+        self.weight = 1.0  # Weight of the next row
+        self.n_seen = 0
+        self._buffer: List[np.ndarray] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.n_seen >= self.warmup
+
+    # -------------------------------------------------------------------------
+    # Scoring
+    # -------------------------------------------------------------------------
+
+    def _bins(self, T: np.ndarray) -> np.ndarray:
+        idx = np.floor((T - self.lo) / self.width).astype(np.int64)
+        return np.clip(idx, 0, self.n_bins - 1)
+
+    def _tails(self, T: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Left/right tail probabilities (n, d) and per-feature skew"""
+        idx = self._bins(T)
+        cdf = np.cumsum(self.counts, axis=1)
+        total = cdf[:, -1]
+        features = np.arange(self.n_features)
+
+        at_or_below = cdf[features, idx]
+        below = at_or_below - self.counts[features, idx]
+        # The row counts itself, as in ECOD's ECDF, so no tail is ever zero
+        w = self.weight
+        left = (at_or_below + w) / (total + w)
+        right = (total - below + w) / (total + w)
+
+        m0, m1, m2, m3 = self.moments
+        mean = m1 / m0
+        var = np.maximum(m2 / m0 - mean ** 2, 1e-12)
+        third = m3 / m0 - 3 * mean * m2 / m0 + 2 * mean ** 3
+        return left, right, third / var ** 1.5
+
+    def _raw_scores(self, T: np.ndarray) -> np.ndarray:
+        left, right, skew = self._tails(T)
+        neg_log_left = -np.log(left)
+        neg_log_right = -np.log(right)
+
+        o_left = neg_log_left.sum(axis=1)
+        o_right = neg_log_right.sum(axis=1)
+        o_auto = np.where(skew < 0, neg_log_left, neg_log_right).sum(axis=1)
+        return np.maximum(np.maximum(o_left, o_right), o_auto)
+
+    def _score_bins(self, raw: np.ndarray) -> np.ndarray:
+        idx = np.floor(np.log1p(raw) / _SCORE_LOG_MAX * _SCORE_BINS).astype(np.int64)
+        return np.clip(idx, 0, _SCORE_BINS - 1)
+
+    def _percentiles(self, raw: np.ndarray) -> np.ndarray:
+        total = self.score_counts.sum()
+        if total <= 0:
+            return np.full(len(raw), 50.0)
+        idx = self._score_bins(raw)
+        below = np.concatenate(([0.0], np.cumsum(self.score_counts)))[idx]
+        return (below + 0.5 * self.score_counts[idx]) / total * 100.0
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """0-100 anomaly scores against the current state; NaN until warmed up"""
+        if not self.ready:
+            return np.full(len(X), np.nan)
+        return self._percentiles(self._raw_scores(_transform(X)))
+
+    def dimension_scores(self, X: np.ndarray) -> np.ndarray:
+        """Per-feature outlier scores (n, d) for attribution; NaN until warmed up"""
+        if not self.ready:
+            return np.full(X.shape, np.nan)
+        return dimension_scores_from_tails(*self._tails(_transform(X)))
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+
+    def update(self, X: np.ndarray) -> None:
+        """Learn from a batch of feature vectors (after they were scored)"""
+        if len(X) == 0:
+            return
+        if not self.ready:
+            self._buffer.extend(np.asarray(X, dtype=np.float64))
+            self.n_seen += len(X)
+            if self.n_seen >= self.warmup:
+                self._finish_warmup()
+            return
+        self._ingest(_transform(np.asarray(X, dtype=np.float64)))
+        self.n_seen += len(X)
+
+    def _finish_warmup(self) -> None:
+        T = _transform(np.array(self._buffer))
+        self._buffer = []
+        low, high = T.min(axis=0), T.max(axis=0)
+        margin = np.maximum((high - low) * 0.05, 0.5)
+        self.lo = low - margin
+        self.width = (high - low + 2 * margin) / self.n_bins
+        self._ingest(T, calibrate=False)
+        # Seed the calibration with the warm-up rows scored against themselves
+        self._add_scores(self._raw_scores(T), np.ones(len(T)))
+
+    def _ingest(self, T: np.ndarray, calibrate: bool = True) -> None:
+        n = len(T)
+        weights = self.weight * self._growth ** np.arange(n)
+        if calibrate:
+            self._add_scores(self._raw_scores(T), weights)
+
+        flat = (np.arange(self.n_features) * self.n_bins + self._bins(T)).ravel()
+        self.counts += np.bincount(
+            flat, weights=np.repeat(weights, self.n_features), minlength=self.counts.size
+        ).reshape(self.counts.shape)
+        for power in range(4):
+            self.moments[power] += weights @ (T ** power)
+
+        self.weight *= self._growth ** n
+        if self.weight > 1e100:
+            self._rescale(1.0 / self.weight)
+
+    def _add_scores(self, raw: np.ndarray, weights: np.ndarray) -> None:
+        self.score_counts += np.bincount(self._score_bins(raw), weights=weights, minlength=_SCORE_BINS)
+
+    def _rescale(self, factor: float) -> None:
+        self.counts *= factor
+        self.moments *= factor
+        self.score_counts *= factor
+        self.weight *= factor
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def state_arrays(self) -> Dict[str, np.ndarray]:
+        """Copies of the state, so they can be written after the lock is released"""
+        meta = {
+            "n_features": self.n_features,
+            "n_bins": self.n_bins,
+            "warmup": self.warmup,
+            "half_life": self.half_life,
+            "weight": self.weight,
+            "n_seen": self.n_seen,
+        }
+        buffer = np.array(self._buffer).reshape(-1, self.n_features)
+        return {
+            "meta": np.array(json.dumps(meta)),
+            "lo": self.lo.copy(),
+            "width": self.width.copy(),
+            "counts": self.counts.copy(),
+            "moments": self.moments.copy(),
+            "score_counts": self.score_counts.copy(),
+            "buffer": buffer,
+        }
+
+    @classmethod
+    def from_state_arrays(cls, arrays: Dict[str, np.ndarray]) -> "StreamingECOD":
+        meta = json.loads(str(arrays["meta"]))
+        detector = cls(meta["n_features"], meta["n_bins"], meta["warmup"], meta["half_life"])
+        detector.weight = float(meta["weight"])
+        detector.n_seen = int(meta["n_seen"])
+        detector.lo = arrays["lo"]
+        detector.width = arrays["width"]
+        detector.counts = arrays["counts"]
+        detector.moments = arrays["moments"]
+        detector.score_counts = arrays["score_counts"]
+        detector._buffer = list(arrays["buffer"])
+        return detector
+
+
+class OnlineDetector:
+    """
+    StreamingECOD for all traffic plus, with per_platform, one per known
+    platform. A platform's own detector is used once it has warmed up; until
+    then its rows are scored by the shared one.
+    """
+
+    def __init__(
+        self,
+        n_features: int,
+        schema_hash: str,
+        state_dir: Optional[str] = None,
+        per_platform: bool = False,
+        platforms: Iterable[str] = ("tiktok", "instagram", "youtube"),
+        **detector_params
+    ):
+        self.n_features = n_features
+        self.schema_hash = schema_hash
+        self.state_dir = state_dir
+        self.per_platform = per_platform
+        self.platforms = frozenset(p for p in platforms if _KEY_PATTERN.match(p))
+        self.detector_params = detector_params
+        self.detectors: Dict[str, StreamingECOD] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _detector(self, key: str) -> StreamingECOD:
+        detector = self.detectors.get(key)
+        if detector is None:
+            detector = self.detectors[key] = StreamingECOD(self.n_features, **self.detector_params)
+        return detector
+
+    def score_and_update(self, X: np.ndarray, platforms: np.ndarray) -> Tuple[np.ndarray, int, np.ndarray]:
+        """
+        Score rows against the state so far, then learn from them.
+        Returns 0-100 scores (NaN while the shared detector warms up), the
+        number of rows the shared detector has seen, and the per-feature
+        scores behind each row's score.
+        """
+        with self._lock:
+            shared = self._detector(GLOBAL_KEY)
+            scores = shared.score(X)
+            dimension_scores = shared.dimension_scores(X)
+
+            if self.per_platform:
+                for platform in np.unique(platforms):
+                    if platform not in self.platforms:
+                        continue
+                    mask = platforms == platform
+                    detector = self._detector(platform)
+                    if detector.ready:
+                        scores[mask] = detector.score(X[mask])
+                        dimension_scores[mask] = detector.dimension_scores(X[mask])
+                    detector.update(X[mask])
+
+            shared.update(X)
+            self._dirty = True
+            return scores, shared.n_seen, dimension_scores
+
+    def stats(self) -> dict:
+        return {
+            "per_platform": self.per_platform,
+            "state_dir": self.state_dir,
+            "detectors": {
+                key: {"seen": d.n_seen, "ready": d.ready}
+                for key, d in sorted(self.detectors.items())
+            },
+        }
+
+    # -------------------------------------------------------------------------
+    # Checkpointing
+    # -------------------------------------------------------------------------
+
+    def checkpoint(self) -> bool:
+        """Write every detector to state_dir if anything changed; returns whether it wrote"""
+        if not self.state_dir:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            snapshots = {key: d.state_arrays() for key, d in self.detectors.items()}
+            self._dirty = False
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        for key, arrays in snapshots.items():
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{key}-", suffix=".tmp", dir=self.state_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, schema_hash=np.array(self.schema_hash),
+                             format_version=np.array(STATE_FORMAT_VERSION), **arrays)
+                os.replace(tmp_path, os.path.join(self.state_dir, f"{key}.npz"))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return True
+
+    def load(self) -> int:
+        """Restore detectors from state_dir; incompatible or unreadable files are skipped"""
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return 0
+        loaded = {}
+        for filename in sorted(os.listdir(self.state_dir)):
+            key, ext = os.path.splitext(filename)
+            if ext != ".npz" or not _KEY_PATTERN.match(key):
+                continue
+            if key != GLOBAL_KEY and key not in self.platforms:
+                continue
+            try:
+                with np.load(os.path.join(self.state_dir, filename)) as data:
+                    arrays = {name: data[name] for name in data.files}
+                if int(arrays["format_version"]) != STATE_FORMAT_VERSION:
+                    raise ValueError("unsupported state format")
+                if str(arrays["schema_hash"]) != self.schema_hash:
+                    raise ValueError("feature schema changed")
+                detector = StreamingECOD.from_state_arrays(arrays)
+                if detector.n_features != self.n_features:
+                    raise ValueError("feature count changed")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring online detector state %s: %s", filename, e)
+                continue
+            loaded[key] = detector
+
+        with self._lock:
+            self.detectors.update(loaded)
+        return len(loaded)
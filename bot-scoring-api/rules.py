@@ -0,0 +1,400 @@
+"""
+Declarative rule engine for bot-scoring flags.
+
+Each rule is a row in a table: flag name, a predicate over batch columns,
+an optional platform scope and a severity weight. A whole batch is evaluated
+at once as boolean masks, giving an (n_rows, n_rules) flags matrix and a
+weight vector.
+
+Predicates are small expressions over the names in rule_namespace(), e.g.
+    "views > 1000 and engagement_rate < 0.001"
+Supported: numbers, column names, + - * /, comparisons (chained too),
+and/or/not, abs(), parentheses. They are compiled to elementwise NumPy ops.
+
+The table can be replaced from a JSON file (RULES_CONFIG_PATH) and is
+reloaded automatically when the file changes - no restart needed:
+    {"default_weight": 8,
+     "rules": [{"name": "low_trust_score", "when": "creator_trust_score < 50",
+                "weight": 10, "platforms": null}, ...]}
+"""
+
+import ast
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from feature_matrix import SubmissionColumns, extract_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLAG_WEIGHT = 8  # For any rule without an explicit weight
+
+
+# ============================================================================
+# RULE NAMESPACE (columns and derived signals predicates can reference)
+# ============================================================================
+
+def rule_namespace(columns: SubmissionColumns) -> Dict[str, np.ndarray]:
+    """
+    Arrays visible to rule predicates.
+    Optional fields are filled with 0/False where unset. Integer columns are
+    float64 here (exact for counters up to 2**53), so arithmetic in a
+    predicate cannot wrap around.
+    """
+    ns: Dict[str, np.ndarray] = {
+        name: values.astype(np.float64) if values.dtype == np.int64 else values
+        for name, values in columns.values.items()
+    }
+
+    views = columns["views"]
+    views_floor = np.maximum(views, 1)
+    ns["views_floor"] = views_floor
+
+    # Likes + comments only (view-botting signal), and the full rate
+    ns["engagement_rate"] = (columns["likes"] + columns["comments"]) / views_floor
+    ns["total_engagement_rate"] = (
+        columns["likes"] + columns["comments"] + columns["shares"]
+    ) / views_floor
+    ns["like_ratio"] = columns["likes"] / views_floor
+    ns["velocity"] = views / np.maximum(columns["hours_since_upload"], 0.1)
+
+    # Follower/following ratio - only defined with both counts and following > 0
+    followers = columns["author_follower_count"]
+    following = columns["author_following_count"]
+    has_ff = columns.truthy("author_follower_count") & columns.truthy("author_following_count")
+    has_ratio = has_ff & (following > 0)
+    ns["has_follower_ratio"] = has_ratio
+    ns["ff_ratio"] = np.where(has_ratio, followers / np.where(has_ratio, following, 1), np.nan)
+
+    # Watch completion - only defined with both duration and watch time
+    duration = columns["video_duration_seconds"]
+    has_watch = columns.truthy("video_duration_seconds") & columns.truthy("avg_watch_time_seconds")
+    ns["has_watch_time"] = has_watch
+    ns["watch_ratio"] = np.where(
+        has_watch,
+        columns["avg_watch_time_seconds"] / np.where(has_watch, duration, 1.0),
+        np.nan,
+    )
+
+    ns["has_comments"] = columns.present["comment_analysis"]
+    for name, mask in columns.present.items():
+        ns.setdefault(f"has_{name}", mask)
+
+    return ns
+
+
+# ============================================================================
+# PREDICATE COMPILER
+# ============================================================================
+
+_ALLOWED_CMP = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+_ALLOWED_BINOP = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+_ALLOWED_FUNCS = {"abs": np.abs}
+
+
+class RuleConfigError(ValueError):
+    """Raised when a rule table or predicate is invalid"""
+
+
+class _ToElementwise(ast.NodeTransformer):
+    """Rewrite and/or/not and chained comparisons into NumPy bitwise ops"""
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=_as_bool(node.operand))
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=part)
+        return result
+
+
+def _as_bool(node: ast.AST) -> ast.AST:
+    """Wrap a node so `not x` means `x == 0` elementwise"""
+    return ast.Compare(left=node, ops=[ast.NotEq()], comparators=[ast.Constant(value=0)])
+
+
+def _validate(tree: ast.AST, names: Sequence[str], source: str) -> None:
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Expression, ast.Load, ast.And, ast.Or, ast.Not, ast.USub)):
+            continue
+        if isinstance(node, (ast.BoolOp, ast.UnaryOp)):
+            continue
+        if isinstance(node, ast.Compare) and all(isinstance(op, _ALLOWED_CMP) for op in node.ops):
+            continue
+        if isinstance(node, _ALLOWED_CMP + _ALLOWED_BINOP):
+            continue
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _ALLOWED_BINOP):
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, bool)):
+            continue
+        if isinstance(node, ast.Name):
+            if node.id in names or node.id in _ALLOWED_FUNCS:
+                continue
+            raise RuleConfigError(f"Unknown name {node.id!r} in rule {source!r}")
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in _ALLOWED_FUNCS and len(node.args) == 1 and not node.keywords):
+            # One argument only: NumPy ufuncs take a second as the output array
+            continue
+        raise RuleConfigError(f"Unsupported syntax {type(node).__name__} in rule {source!r}")
+
+
+def compile_predicate(source: str, names: Sequence[str]) -> Callable[[Dict[str, Any]], Any]:
+    """Compile a predicate expression into a function of the rule namespace"""
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise RuleConfigError(f"Invalid rule expression {source!r}: {e.msg}") from e
+    _validate(tree, names, source)
+    tree = ast.fix_missing_locations(_ToElementwise().visit(tree))
+    code = compile(tree, f"<rule: {source}>", "eval")
+
+    def predicate(ns: Dict[str, Any]) -> Any:
+        return eval(code, {"__builtins__": {}, **_ALLOWED_FUNCS}, ns)
+
+    return predicate
+
+
+# ============================================================================
+# RULE TABLE
+# ============================================================================
+
+@dataclass(frozen=True)
+class Rule:
+    """One row of the rule table"""
+    name: str
+    when: str
+    weight: float = DEFAULT_FLAG_WEIGHT
+    platforms: Optional[Tuple[str, ...]] = None  # None = all platforms
+    predicate: Callable = field(default=None, compare=False, repr=False)
+
+
+# Built-in rules, in the order flags are reported.
+# Weights: high severity 20+, medium 15, lower 10.
+DEFAULT_RULES: List[dict] = [
+    # Universal flags (all platforms)
+    {"name": "extremely_low_engagement", "weight": 20,
+     "when": "views > 1000 and engagement_rate < 0.001"},
+    {"name": "suspicious_like_ratio", "weight": 10,  # Exactly ~10% likes
+     "when": "views > 100 and 0.09 < like_ratio < 0.11"},
+    {"name": "high_velocity_unverified", "weight": 15,
+     "when": "velocity > 10000 and not author_verified"},
+    {"name": "new_account_viral", "weight": 15,
+     "when": "account_age_days < 30 and views > 50000"},
+    {"name": "repeat_fraud_history", "weight": 25,
+     "when": "creator_previous_flags >= 2"},
+    {"name": "low_trust_score", "weight": 10,
+     "when": "creator_trust_score < 50"},
+    {"name": "zero_comments_high_views", "weight": 10,
+     "when": "views > 5000 and comments == 0"},
+    {"name": "engagement_far_above_average", "weight": 10,
+     "when": "campaign_avg_engagement_rate != 0"
+             " and total_engagement_rate > campaign_avg_engagement_rate * 5"},
+    # Same feature vector as another submission in the batch, within 0.01
+    # batch standard deviations (only known when the batch detectors ran,
+    # i.e. without a pretrained/online model)
+    {"name": "near_duplicate_submission", "weight": 10,
+     "when": "has_nearest_submission_distance and nearest_submission_distance < 0.01"},
+    # Growth curve from earlier snapshots of the same video_id: most of the
+    # recent views arrived in one short interval, without matching engagement
+    {"name": "view_count_step_spike", "weight": 15,
+     "when": "has_view_spike_ratio and view_spike_ratio > 5 and view_spike_share > 0.5 and views > 10000"},
+    {"name": "engagement_lags_view_growth", "weight": 15,
+     "when": "has_view_engagement_lag and view_engagement_lag > 0.8"
+             " and view_spike_share > 0.5 and views > 10000"},
+
+    # TikTok-specific flags
+    {"name": "tiktok_low_follower_ratio_high_views", "weight": 15, "platforms": ["tiktok"],
+     "when": "has_follower_ratio and ff_ratio < 0.1 and views > 10000"},
+    {"name": "tiktok_engagement_pod_pattern", "weight": 20, "platforms": ["tiktok"],
+     "when": "has_follower_ratio and author_following_count > 5000 and ff_ratio < 0.5"},
+    # Reached only when following is set but not positive
+    {"name": "tiktok_zero_following_suspicious", "weight": 10, "platforms": ["tiktok"],
+     "when": "author_following_count < 0 and author_follower_count > 1000"},
+    {"name": "tiktok_viral_no_engagement_actions", "weight": 15, "platforms": ["tiktok"],
+     "when": "views > 100000 and duets == 0 and stitches == 0"},
+    {"name": "tiktok_excessive_hashtags", "weight": 10, "platforms": ["tiktok"],
+     "when": "hashtag_count > 12"},
+    {"name": "tiktok_low_watch_completion", "weight": 10, "platforms": ["tiktok"],
+     "when": "has_watch_time and video_duration_seconds > 30"
+             " and watch_ratio < 0.1 and views > 5000"},
+    {"name": "tiktok_mass_posting", "weight": 10, "platforms": ["tiktok"],
+     "when": "author_videos_last_30_days > 90"},
+    {"name": "tiktok_original_sound_viral_low_engagement", "weight": 10, "platforms": ["tiktok"],
+     "when": "sound_is_original and not sound_is_trending"
+             " and views > 500000 and engagement_rate < 0.01"},
+
+    # Comment analysis flags
+    {"name": "high_generic_comments", "weight": 15,
+     "when": "has_comments and comment_generic_ratio > 0.5"},
+    {"name": "high_duplicate_comments", "weight": 15,
+     "when": "has_comments and comment_duplicate_ratio > 0.3"},
+    {"name": "very_short_comments", "weight": 10,
+     "when": "has_comments and comment_avg_length < 5 and comment_total_comments > 10"},
+    {"name": "emoji_heavy_comments", "weight": 10,
+     "when": "has_comments and comment_emoji_ratio > 0.7"},
+    {"name": "bot_comment_pattern_detected", "weight": 25,
+     "when": "has_comments and comment_bot_pattern_score > 60"},
+    # Needs CROSS_VIDEO_COMMENTS_ENABLED
+    {"name": "cross_video_comment_cluster", "weight": 15,
+     "when": "has_comment_cross_video_ratio and comment_cross_video_ratio > 0.3"
+             " and comment_cross_video_videos >= 3"},
+]
+
+
+class RuleSet:
+    """
+    An immutable, compiled rule table.
+    evaluate() returns the (n_rows, n_rules) boolean flags matrix.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        self.names = [rule.name for rule in self.rules]
+        self.weights = np.array([rule.weight for rule in self.rules], dtype=np.float64)
+        if len(set(self.names)) != len(self.names):
+            raise RuleConfigError("Rule names must be unique")
+
+    @classmethod
+    def from_dicts(cls, entries: Sequence[dict], default_weight: float = DEFAULT_FLAG_WEIGHT) -> "RuleSet":
+        names = _namespace_names()
+        rules = []
+        for entry in entries:
+            try:
+                name = str(entry["name"])
+                when = str(entry["when"])
+            except (KeyError, TypeError) as e:
+                raise RuleConfigError(f"Rule entries need 'name' and 'when': {entry!r}") from e
+            platforms = entry.get("platforms")
+            rules.append(Rule(
+                name=name,
+                when=when,
+                weight=float(entry.get("weight", default_weight)),
+                platforms=tuple(platforms) if platforms else None,
+                predicate=compile_predicate(when, names),
+            ))
+        return cls(rules)
+
+    def evaluate(self, columns: SubmissionColumns) -> np.ndarray:
+        n = len(columns)
+        flags = np.zeros((n, len(self.rules)), dtype=np.bool_)
+        if n == 0:
+            return flags
+
+        ns = rule_namespace(columns)
+        platform = columns["platform"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for j, rule in enumerate(self.rules):
+                mask = np.broadcast_to(np.asarray(rule.predicate(ns), dtype=np.bool_), (n,))
+                if rule.platforms is not None:
+                    mask = mask & np.isin(platform, rule.platforms)
+                flags[:, j] = mask
+        return flags
+
+    def weight_of(self, name: str) -> float:
+        try:
+            return float(self.weights[self.names.index(name)])
+        except ValueError:
+            return float(DEFAULT_FLAG_WEIGHT)
+
+    def flag_lists(self, flags: np.ndarray) -> List[List[str]]:
+        """Human-readable flag names per row, in table order"""
+        names = self.names
+        return [[names[j] for j in np.flatnonzero(row)] for row in flags]
+
+
+def _namespace_names() -> List[str]:
+    """Names a predicate may reference"""
+    global _NAMESPACE_NAMES
+    if _NAMESPACE_NAMES is None:
+        _NAMESPACE_NAMES = sorted(rule_namespace(extract_columns([])))
+    return _NAMESPACE_NAMES
+
+
+_NAMESPACE_NAMES: Optional[List[str]] = None
+
+
+# ============================================================================
+# HOT-RELOADING ENGINE
+# ============================================================================
+
+def load_rule_file(path: str) -> RuleSet:
+    """Load a rule table from a JSON config file"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if isinstance(config, list):
+        config = {"rules": config}
+    return RuleSet.from_dicts(
+        config.get("rules", []),
+        default_weight=float(config.get("default_weight", DEFAULT_FLAG_WEIGHT)),
+    )
+
+
+class RuleEngine:
+    """
+    Holds the active RuleSet.
+    With a config path, the file is re-read whenever its mtime changes;
+    an invalid file is logged and the previous table stays active.
+    """
+
+    def __init__(self, config_path: Optional[str] = None):
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._ruleset = RuleSet.from_dicts(DEFAULT_RULES)
+        self.version = 0  # Bumped on every reload, so results can be tied to a table
+        self.reload_if_changed()
+
+    @property
+    def ruleset(self) -> RuleSet:
+        self.reload_if_changed()
+        return self._ruleset
+
+    def reload_if_changed(self) -> bool:
+        if not self.config_path:
+            return False
+        try:
+            mtime = os.stat(self.config_path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            try:
+                ruleset = load_rule_file(self.config_path)
+            except (OSError, ValueError) as e:
+                logger.error("Rule config %s not loaded, keeping current rules: %s", self.config_path, e)
+                self._mtime = mtime
+                return False
+            self._ruleset = ruleset
+            self._mtime = mtime
+            self.version += 1
+            logger.info("Loaded %d rules from %s", len(ruleset.rules), self.config_path)
+            return True
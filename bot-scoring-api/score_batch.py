@@ -0,0 +1,428 @@
+"""
+Offline batch scoring for the Bot Scoring API.
+
+Scores a file of submissions with the features, rules and detectors of
+/score, without going through HTTP. Input is read chunk by chunk and each
+chunk is scored in a worker process, so backfills of millions of rows use
+every core and never hold the whole dataset in memory.
+
+The service's stateful stores are not applied: campaign baselines, creator
+reputation, video history, cross-video comments and the online detector
+neither fill columns nor learn from the file, so each row is scored only
+on the fields it carries.
+
+Usage:
+    python score_batch.py submissions.csv scores.ndjson [--workers 8] [--chunk-size 1000]
+
+Input formats (picked from the extension, or --input-format):
+    .ndjson / .jsonl   one VideoFeatures JSON object per line
+    .json              a list of VideoFeatures, or {"submissions": [...]} as
+                       train.py reads it (loaded whole, not streamed)
+    .csv               one column per VideoFeatures field; comment texts go in
+                       a comment_texts column holding a JSON list
+    .parquet           one column per field (needs pyarrow)
+
+Output is NDJSON, or CSV when the output path ends in .csv. Each row carries
+its 0-based input position, the --id-column value if present, and either the
+score or an error.
+
+How ML scores are produced (--fit):
+    auto      the active registry model (or --model-version), else dataset
+    dataset   fit one ensemble on a sample of the whole file; the full feature
+              matrix is built in a memory-mapped .npy so it can exceed RAM
+    chunk     fit per chunk, like /score does per request (scores are
+              relative to the chunk)
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pydantic import ValidationError
+
+from detectors import DEFAULT_CONTAMINATION, PretrainedEnsemble
+from feature_matrix import N_FEATURES, build_feature_matrix, extract_columns, feature_schema_hash
+from main import (
+    MIN_ENSEMBLE_BATCH,
+    MODEL_DIR,
+    VideoFeatures,
+    calculate_bot_score,
+    get_comment_analysis,
+)
+from model_registry import ModelRegistry, ModelRegistryError
+
+INPUT_FORMATS = ("ndjson", "json", "csv", "parquet")
+FIT_MODES = ("auto", "dataset", "chunk")
+
+CSV_OUTPUT_FIELDS = ["row", "id", "bot_score", "confidence", "flags", "feature_contributions", "attribution", "error"]
+
+
+# =============================================================================
+# INPUT
+# =============================================================================
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if ext == ".json":
+        return "json"
+    if ext == ".csv":
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Can't tell the format of {path!r}, pass --input-format")
+
+
+def _clean_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty cells and unpack comment texts for tabular formats"""
+    record = {k: v for k, v in record.items() if v is not None and v != ""}
+    texts = record.pop("comment_texts", None)
+    if isinstance(texts, str):
+        texts = json.loads(texts)
+    if texts is not None and "comment_data" not in record:
+        record["comment_data"] = {"texts": list(texts)}
+    elif isinstance(record.get("comment_data"), str):
+        record["comment_data"] = json.loads(record["comment_data"])
+    return record
+
+
+def _import_pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet input needs pyarrow (pip install pyarrow)") from None
+    return pq
+
+
+def iter_records(path: str, fmt: str) -> Iterator[Any]:
+    """
+    Yield one raw record per submission: a JSON string for NDJSON and
+    JSON, a dict for CSV and Parquet. Parsing happens in the workers.
+    """
+    if fmt == "ndjson":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+    elif fmt == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("submissions", [])
+        if not isinstance(data, list):
+            raise ValueError(f"{path!r} must hold a list of submissions or {{\"submissions\": [...]}}")
+        for item in data:
+            # Re-encoded so items are validated like NDJSON lines, not cleaned like CSV cells
+            yield json.dumps(item)
+    elif fmt == "csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    elif fmt == "parquet":
+        parquet_file = _import_pyarrow_parquet().ParquetFile(path)
+        for batch in parquet_file.iter_batches():
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unknown input format {fmt!r}")
+
+
+def count_records(path: str, fmt: str) -> int:
+    """Number of records iter_records() will yield (needed to size the memmap)"""
+    if fmt == "parquet":
+        return _import_pyarrow_parquet().ParquetFile(path).metadata.num_rows
+    return sum(1 for _ in iter_records(path, fmt))
+
+
+def iter_chunks(records: Iterable[Any], chunk_size: int) -> Iterator[Tuple[int, List[Any]]]:
+    """Yield (offset of the first row, records) in chunks of chunk_size"""
+    iterator = iter(records)
+    offset = 0
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield offset, chunk
+        offset += len(chunk)
+
+
+# =============================================================================
+# WORKERS
+# =============================================================================
+
+# Set per worker process by _init_worker
+_ensemble: Optional[PretrainedEnsemble] = None
+_id_column: Optional[str] = None
+
+
+def _init_worker(ensemble: Optional[PretrainedEnsemble], id_column: Optional[str]) -> None:
+    global _ensemble, _id_column
+    _ensemble = ensemble
+    _id_column = id_column
+
+
+def _parse_chunk(offset: int, records: List[Any]) -> Tuple[List[VideoFeatures], List[dict]]:
+    """
+    Validate a chunk. Returns the valid submissions and one output row per
+    input record; rows for invalid records already carry their error.
+    """
+    submissions = []
+    rows = []
+    for i, record in enumerate(records):
+        row = {"row": offset + i}
+        try:
+            data = json.loads(record) if isinstance(record, str) else _clean_record(record)
+            if _id_column and isinstance(data, dict) and data.get(_id_column) is not None:
+                row["id"] = data[_id_column]
+            submissions.append(VideoFeatures.model_validate(data))
+        except (ValueError, ValidationError) as e:
+            row["error"] = str(e)
+        rows.append(row)
+    return submissions, rows
+
+
+def _chunk_features(submissions: List[VideoFeatures]):
+    comment_analyses = [get_comment_analysis(sub) for sub in submissions]
+    columns = extract_columns(submissions, comment_analyses)
+    return comment_analyses, columns, build_feature_matrix(columns=columns)
+
+
+def _write_features(features_path: Optional[str], rows: List[dict], feature_vectors: np.ndarray) -> List[int]:
+    """Store the chunk's feature rows in the shared memmap; returns their row numbers"""
+    valid_rows = [row["row"] for row in rows if "error" not in row]
+    if features_path and valid_rows:
+        matrix = np.load(features_path, mmap_mode="r+")
+        matrix[valid_rows] = feature_vectors
+        matrix.flush()
+        del matrix
+    return valid_rows
+
+
+def build_chunk_features(offset: int, records: List[Any], features_path: str) -> List[int]:
+    """Dataset pass 1: feature rows only"""
+    submissions, rows = _parse_chunk(offset, records)
+    if not submissions:
+        return []
+    _, _, feature_vectors = _chunk_features(submissions)
+    return _write_features(features_path, rows, feature_vectors)
+
+
+def score_chunk(offset: int, records: List[Any], features_path: Optional[str] = None) -> List[dict]:
+    """Score one chunk; returns an output row per input record, in order"""
+    submissions, rows = _parse_chunk(offset, records)
+    if not submissions:
+        return rows
+
+    comment_analyses, columns, feature_vectors = _chunk_features(submissions)
+    _write_features(features_path, rows, feature_vectors)
+
+    scores = iter(calculate_bot_score(
+        feature_vectors, submissions, comment_analyses,
+        columns=columns, ensemble=_ensemble
+    ))
+    for row in rows:
+        if "error" not in row:
+            row.update(next(scores).model_dump())
+    return rows
+
+
+def run_chunks(
+    fn: Callable,
+    chunks: Iterable[Tuple[int, List[Any]]],
+    extra_args: tuple,
+    workers: int,
+    initargs: tuple
+) -> Iterator[Any]:
+    """
+    Run fn(offset, records, *extra_args) for every chunk and yield the
+    results in input order. At most 2 * workers chunks are in flight, so
+    reading never runs far ahead of scoring.
+    """
+    if workers <= 0:
+        _init_worker(*initargs)
+        for offset, records in chunks:
+            yield fn(offset, records, *extra_args)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=initargs,
+    ) as pool:
+        pending = deque()
+        for offset, records in chunks:
+            pending.append(pool.submit(fn, offset, records, *extra_args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# =============================================================================
+# OUTPUT
+# =============================================================================
+
+class ScoreWriter:
+    """Writes output rows as NDJSON, or CSV for a .csv path"""
+
+    def __init__(self, path: str):
+        self.is_csv = path.lower().endswith(".csv")
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._csv = csv.DictWriter(self._file, CSV_OUTPUT_FIELDS) if self.is_csv else None
+        if self._csv:
+            self._csv.writeheader()
+        self.written = 0
+        self.errors = 0
+
+    def write(self, rows: List[dict]) -> None:
+        for row in rows:
+            if "error" in row:
+                self.errors += 1
+            if self._csv:
+                row = dict(row)
+                if "flags" in row:
+                    row["flags"] = ";".join(row["flags"])
+                    row["feature_contributions"] = json.dumps(row["feature_contributions"])
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(row, default=str) + "\n")
+        self.written += len(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def fit_dataset_ensemble(
+    features_path: str,
+    valid_rows: np.ndarray,
+    sample_size: int,
+    seed: int,
+    contamination: float = DEFAULT_CONTAMINATION
+) -> Optional[PretrainedEnsemble]:
+    """Fit one ensemble on a random sample of the memmapped feature matrix"""
+    if len(valid_rows) < MIN_ENSEMBLE_BATCH:
+        return None
+    rng = np.random.default_rng(seed)
+    if len(valid_rows) > sample_size:
+        valid_rows = np.sort(rng.choice(valid_rows, size=sample_size, replace=False))
+
+    matrix = np.load(features_path, mmap_mode="r")
+    sample = np.asarray(matrix[valid_rows])
+    del matrix
+
+    return PretrainedEnsemble.fit(
+        sample,
+        version="batch-" + datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S"),
+        feature_schema_hash=feature_schema_hash(),
+        contamination=contamination,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score a file of submissions offline")
+    parser.add_argument("input", help="CSV, Parquet, NDJSON or JSON file of VideoFeatures")
+    parser.add_argument("output", help="Output path (.csv for CSV, anything else for NDJSON)")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (0 = score in this process)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--fit", choices=FIT_MODES, default="auto")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--model-version", help="Registry model to score with (default: ACTIVE)")
+    parser.add_argument("--fit-sample", type=int, default=50000,
+                        help="Rows sampled to fit the ensemble with --fit dataset")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--features-out", help="Also keep the feature matrix as a .npy file")
+    parser.add_argument("--id-column", default="id", help="Input field copied to the output")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    started = time.perf_counter()
+    try:
+        fmt = args.input_format or detect_format(args.input)
+
+        ensemble = None
+        fit_mode = args.fit
+        if args.model_version or fit_mode == "auto":
+            registry = ModelRegistry(args.model_dir, feature_schema_hash())
+            if args.model_version:
+                ensemble = registry.load(args.model_version)
+            else:
+                ensemble = registry.load_active()
+            if ensemble is not None:
+                fit_mode = "model"
+                print(f"Scoring with model {ensemble.version}")
+            elif fit_mode == "auto":
+                fit_mode = "dataset"
+
+        features_path = args.features_out
+        temp_features = fit_mode == "dataset" and not features_path
+        if temp_features:
+            fd, features_path = tempfile.mkstemp(suffix=".npy")
+            os.close(fd)
+
+        if features_path:
+            n_records = count_records(args.input, fmt)
+            np.lib.format.open_memmap(
+                features_path, mode="w+", dtype=np.float64, shape=(n_records, N_FEATURES)
+            ).flush()
+            print(f"Feature matrix: {n_records} x {N_FEATURES} at {features_path}")
+
+        try:
+            if fit_mode == "dataset":
+                valid_rows = []
+                for chunk_rows in run_chunks(
+                    build_chunk_features, iter_chunks(iter_records(args.input, fmt), args.chunk_size),
+                    (features_path,), args.workers, (None, args.id_column)
+                ):
+                    valid_rows.extend(chunk_rows)
+                ensemble = fit_dataset_ensemble(
+                    features_path, np.asarray(valid_rows, dtype=np.int64), args.fit_sample, args.seed
+                )
+                if ensemble is not None:
+                    print(f"Fitted ensemble on {ensemble.n_training_rows} of {len(valid_rows)} rows")
+                # Feature rows are already written
+                score_features_path = None
+            else:
+                score_features_path = features_path
+
+            writer = ScoreWriter(args.output)
+            try:
+                for rows in run_chunks(
+                    score_chunk, iter_chunks(iter_records(args.input, fmt), args.chunk_size),
+                    (score_features_path,), args.workers, (ensemble, args.id_column)
+                ):
+                    writer.write(rows)
+            finally:
+                writer.close()
+        finally:
+            if temp_features:
+                os.remove(features_path)
+    except (ModelRegistryError, ValueError, OSError) as e:
+        print(f"Batch scoring failed: {e}", file=sys.stderr)
+        return 1
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {writer.written} rows ({writer.errors} errors) in {elapsed:.1f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Submission schema, comment analysis and the store fill step, shared by the
+API (main.py), train.py and score_batch.py.
+
+Importing this module has no side effects: unlike main.py it creates no
+stores, process pool or rule engine, so offline tools can build exactly
+the features the API builds without starting the service.
+
+fill_from_stores() fills the fields a submission leaves out from the
+service's stores, as /score does before building the feature matrix:
+campaign averages and baselines from campaign_store.py, creator history
+from creator_store.py. It only reads, so training on a corpus sees the
+same inputs as serving without the corpus being learned into the stores.
+"""
+
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, Field
+
+from campaign_store import CampaignBaselineStore, fill_campaign_baselines
+from comment_scanner import CommentScanner
+from creator_store import CreatorReputationStore, apply_creator_reputation
+from feature_matrix import SubmissionColumns
+
+
+# ============================================================================
+# COMMENT ANALYSIS (No training data required - pattern-based)
+# ============================================================================
+
+# Generic bot comments commonly seen on TikTok/Instagram
+GENERIC_BOT_COMMENTS = [
+    r"^nice\s*[!.]*$",
+    r"^cool\s*[!.]*$",
+    r"^amazing\s*[!.]*$",
+    r"^great\s*[!.]*$",
+    r"^love\s*(it|this)?\s*[!.]*$",
+    r"^wow\s*[!.]*$",
+    r"^fire\s*[!.]*$",
+    r"^beautiful\s*[!.]*$",
+    r"^awesome\s*[!.]*$",
+    r"^perfect\s*[!.]*$",
+    r"^follow\s*(me|back)",
+    r"^check\s*(out\s*)?(my|profile)",
+    r"^dm\s*(me|for)",
+    r"^link\s*in\s*bio",
+    r"^f4f",
+    r"^l4l",
+    r"^follow\s*for\s*follow",
+    r"^like\s*for\s*like",
+    r"^[🔥💯❤️👏👍😍🙌]+$",  # Emoji-only comments
+    r"^.{1,3}$",  # Very short comments (1-3 chars)
+]
+
+COMMENT_SCANNER = CommentScanner(GENERIC_BOT_COMMENTS)
+
+
+def analyze_comments(comments: List[str]) -> dict:
+    """
+    Analyze a list of comments for bot-like patterns.
+    Returns metrics that don't require ML training.
+    Single fused pass over unique comments (see comment_scanner.py).
+    """
+    return COMMENT_SCANNER.scan(comments)
+
+
+# ============================================================================
+# SCHEMA
+# ============================================================================
+
+class CommentData(BaseModel):
+    """Optional comment data for deeper analysis"""
+    texts: List[str] = []  # Raw comment texts for pattern analysis
+
+
+# Counters are bounded so batch columns hold them as int64 without overflow,
+# and sums of a few of them stay exact
+MAX_COUNT = 2 ** 53
+Count = Annotated[int, Field(ge=-MAX_COUNT, le=MAX_COUNT)]
+
+
+class VideoFeatures(BaseModel):
+    """Features extracted from a video submission"""
+    # Core engagement metrics
+    views: Count
+    likes: Count
+    comments: Count
+    shares: Count
+    bookmarks: Optional[Count] = 0
+
+    # Temporal features
+    hours_since_upload: float
+    hours_since_submission: float
+
+    # Author/account features
+    author_verified: bool = False
+    author_follower_count: Optional[Count] = None
+    author_following_count: Optional[Count] = None  # NEW: for follower ratio
+    account_age_days: Count
+
+    # Historical features (filled from the creator reputation index, if enabled, when
+    # omitted and creator_id is set; otherwise 0, 0 and 100)
+    creator_id: Optional[str] = None
+    creator_previous_submissions: Optional[Count] = None
+    creator_previous_flags: Optional[Count] = None
+    creator_trust_score: Optional[float] = None
+
+    # Identifies the video across requests (optional; keys its view-count history)
+    video_id: Optional[str] = None
+
+    # Campaign context (averages are filled from the campaign baseline store when omitted)
+    campaign_id: Optional[str] = None
+    campaign_avg_engagement_rate: Optional[float] = None
+    campaign_avg_views: Optional[float] = None
+    platform: str  # tiktok, instagram, youtube
+
+    # =========================================================================
+    # TIKTOK-SPECIFIC FEATURES
+    # =========================================================================
+
+    # TikTok engagement metrics
+    duets: Optional[Count] = None  # Number of duets (TikTok unique)
+    stitches: Optional[Count] = None  # Number of stitches (TikTok unique)
+
+    # Sound/audio features
+    sound_is_original: Optional[bool] = None  # Original vs trending sound
+    sound_is_trending: Optional[bool] = None  # Is sound currently viral
+
+    # Video metadata
+    video_duration_seconds: Optional[float] = None
+    avg_watch_time_seconds: Optional[float] = None  # If available
+
+    # Hashtag analysis
+    hashtag_count: Optional[Count] = None
+    uses_trending_hashtag: Optional[bool] = None
+    uses_challenge_hashtag: Optional[bool] = None
+
+    # Posting behavior
+    author_total_videos: Optional[Count] = None
+    author_videos_last_30_days: Optional[Count] = None
+
+    # Comment data for pattern analysis (optional)
+    comment_data: Optional[CommentData] = None
+
+
+class ScoringRequest(BaseModel):
+    """Request to score one or more submissions"""
+    submissions: List[VideoFeatures]
+
+
+# ============================================================================
+# STORE FILL
+# ============================================================================
+
+def fill_from_stores(
+    columns: SubmissionColumns,
+    campaign_store: Optional[CampaignBaselineStore] = None,
+    creator_store: Optional[CreatorReputationStore] = None,
+    campaign_min_samples: int = 20
+) -> None:
+    """
+    Fill campaign and creator columns the submissions left out from the
+    given stores (None skips one). Values sent by the caller are kept and
+    neither store is changed.
+    """
+    if campaign_store is not None:
+        fill_campaign_baselines(columns, campaign_store, campaign_min_samples)
+    if creator_store is not None:
+        apply_creator_reputation(columns, creator_store)
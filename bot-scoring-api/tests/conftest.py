@@ -0,0 +1,106 @@
+"""
+Shared test setup: modules are imported from the service directory, and
+main.py's stores are pointed at a throwaway state directory before it is
+first imported.
+"""
+
+import os
+import sys
+import tempfile
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+_STATE_DIR = tempfile.mkdtemp(prefix="bot-scoring-tests-")
+os.environ.setdefault("STARTUP_MODE", "lazy")
+os.environ.setdefault("SCORING_WORKERS", "0")
+os.environ.setdefault("JOBS_ENABLED", "false")
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(_STATE_DIR, "jobs.sqlite3"))
+os.environ.setdefault("CAMPAIGN_BASELINES_ENABLED", "true")
+os.environ.setdefault("CAMPAIGN_STORE_PATH", os.path.join(_STATE_DIR, "campaigns.sqlite3"))
+os.environ.setdefault("CREATOR_REPUTATION_ENABLED", "true")
+os.environ.setdefault("CREATOR_STORE_PATH", os.path.join(_STATE_DIR, "creators.sqlite3"))
+os.environ.setdefault("VIDEO_HISTORY_ENABLED", "true")
+os.environ.setdefault("VIDEO_HISTORY_STATE_PATH", os.path.join(_STATE_DIR, "video_history.npz"))
+os.environ.setdefault("ONLINE_DETECTOR_STATE_DIR", os.path.join(_STATE_DIR, "online"))
+os.environ.setdefault("MODEL_DIR", os.path.join(_STATE_DIR, "models"))
+
+
+import numpy as np
+import pytest
+
+
+def _maybe(rng, value, p_none=0.3):
+    return None if rng.random() < p_none else value
+
+
+COMMENT_POOL = [
+    "nice", "Nice!!", " cool ", "AMAZING.", "love it", "love this!", "wow", "fire", "🔥🔥", "💯", "❤️", "😍🙌",
+    "follow me", "follow back pls", "check out my profile", "dm me", "dm for promo", "link in bio", "f4f", "L4L",
+    "follow for follow", "like for like", "ok", "a", "lol", "", "   ", "great video, where did you film this?",
+    "This is the best thing I've seen all week 😂", "Niceee", "coolio", "so good", "👍 great", "beautiful!!!",
+    "Where can I buy this?", "first", "❤", "✂️ cut", "Ⓜ️ test",
+]
+
+
+def random_comments(rng: np.random.Generator) -> list:
+    """A comment list drawn from COMMENT_POOL plus random text, with repeats"""
+    n = int(rng.choice([1, 3, 12, 40, 200]))
+    comments = []
+    for _ in range(n):
+        if rng.random() < 0.8:
+            comments.append(str(rng.choice(COMMENT_POOL)))
+        else:
+            length = int(rng.integers(1, 40))
+            comments.append("".join(rng.choice(list("abcdef xyz!.🔥"), length)))
+    return comments
+
+
+def random_submission(rng: np.random.Generator) -> dict:
+    """One submission dict with a mix of typical, edge-case and missing values"""
+    views = int(rng.choice([0, 1, 99, 5_000, int(rng.integers(0, 10_000_000)), 2 ** 53]))
+    rate = float(rng.choice([0.0, 0.0005, 0.1, rng.uniform(0, 0.3)]))
+    likes = int(views * rate)
+    return {
+        "views": views,
+        "likes": likes,
+        "comments": int(rng.choice([0, likes // 20, int(rng.integers(0, 50))])),
+        "shares": int(rng.integers(0, 1 + likes // 10)),
+        "bookmarks": _maybe(rng, int(rng.integers(0, 1 + likes // 5))),
+        "hours_since_upload": float(rng.choice([0.0, 0.05, rng.uniform(0, 500)])),
+        "hours_since_submission": float(rng.uniform(0, 48)),
+        "author_verified": bool(rng.random() < 0.2),
+        "author_follower_count": _maybe(rng, int(rng.choice([0, rng.integers(0, 2_000_000)]))),
+        "author_following_count": _maybe(rng, int(rng.choice([0, -1, rng.integers(0, 10_000)]))),
+        "account_age_days": int(rng.choice([0, rng.integers(0, 3000)])),
+        "creator_previous_submissions": _maybe(rng, int(rng.integers(0, 40))),
+        "creator_previous_flags": _maybe(rng, int(rng.integers(0, 8))),
+        "creator_trust_score": _maybe(rng, float(rng.uniform(0, 100))),
+        "campaign_avg_engagement_rate": _maybe(rng, float(rng.choice([0.0, rng.uniform(0, 0.2)]))),
+        "campaign_avg_views": _maybe(rng, float(rng.uniform(0, 1e6))),
+        "platform": str(rng.choice(["tiktok", "instagram", "youtube"])),
+        "duets": _maybe(rng, int(rng.integers(0, 100))),
+        "stitches": _maybe(rng, int(rng.integers(0, 100))),
+        "sound_is_original": _maybe(rng, bool(rng.random() < 0.5)),
+        "sound_is_trending": _maybe(rng, bool(rng.random() < 0.5)),
+        "video_duration_seconds": _maybe(rng, float(rng.choice([0.0, rng.uniform(1, 180)]))),
+        "avg_watch_time_seconds": _maybe(rng, float(rng.uniform(0, 120))),
+        "hashtag_count": _maybe(rng, int(rng.integers(0, 30))),
+        "uses_trending_hashtag": _maybe(rng, bool(rng.random() < 0.5)),
+        "uses_challenge_hashtag": _maybe(rng, bool(rng.random() < 0.5)),
+        "author_total_videos": _maybe(rng, int(rng.integers(0, 2000))),
+        "author_videos_last_30_days": _maybe(rng, int(rng.choice([0, rng.integers(0, 400)]))),
+        "comment_data": _maybe(rng, {"texts": random_comments(rng)}, p_none=0.5),
+    }
+
+
+@pytest.fixture
+def make_submissions():
+    """make_submissions(n, seed) -> list of VideoFeatures built from random_submission"""
+    from main import VideoFeatures
+
+    def make(n: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        return [VideoFeatures(**random_submission(rng)) for _ in range(n)]
+
+    return make
@@ -0,0 +1,379 @@
+"""
+Reference implementations from before the vectorized rewrites, kept
+verbatim (apart from being lifted out of the endpoint code) so the tests
+can check the fast paths against them.
+"""
+
+import re
+from collections import Counter
+from typing import List
+
+# Generic bot comments commonly seen on TikTok/Instagram
+GENERIC_BOT_COMMENTS = [
+    r"^nice\s*[!.]*$",
+    r"^cool\s*[!.]*$",
+    r"^amazing\s*[!.]*$",
+    r"^great\s*[!.]*$",
+    r"^love\s*(it|this)?\s*[!.]*$",
+    r"^wow\s*[!.]*$",
+    r"^fire\s*[!.]*$",
+    r"^beautiful\s*[!.]*$",
+    r"^awesome\s*[!.]*$",
+    r"^perfect\s*[!.]*$",
+    r"^follow\s*(me|back)",
+    r"^check\s*(out\s*)?(my|profile)",
+    r"^dm\s*(me|for)",
+    r"^link\s*in\s*bio",
+    r"^f4f",
+    r"^l4l",
+    r"^follow\s*for\s*follow",
+    r"^like\s*for\s*like",
+    r"^[🔥💯❤️👏👍😍🙌]+$",  # Emoji-only comments
+    r"^.{1,3}$",  # Very short comments (1-3 chars)
+]
+
+COMPILED_BOT_PATTERNS = [re.compile(p, re.IGNORECASE) for p in GENERIC_BOT_COMMENTS]
+
+
+def analyze_comments(comments: List[str]) -> dict:
+    """
+    Analyze a list of comments for bot-like patterns.
+    Returns metrics that don't require ML training.
+    """
+    if not comments:
+        return {
+            "total_comments": 0,
+            "avg_length": 0,
+            "emoji_ratio": 0,
+            "generic_ratio": 0,
+            "duplicate_ratio": 0,
+            "short_comment_ratio": 0,
+            "bot_pattern_score": 0,
+        }
+
+    total = len(comments)
+
+    # Average comment length
+    lengths = [len(c) for c in comments]
+    avg_length = sum(lengths) / total
+
+    # Emoji analysis
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"  # emoticons
+        "\U0001F300-\U0001F5FF"  # symbols & pictographs
+        "\U0001F680-\U0001F6FF"  # transport & map symbols
+        "\U0001F1E0-\U0001F1FF"  # flags
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "]+", flags=re.UNICODE
+    )
+
+    emoji_counts = [len(emoji_pattern.findall(c)) for c in comments]
+    total_chars = sum(lengths) or 1
+    total_emojis = sum(emoji_counts)
+    emoji_ratio = total_emojis / total_chars
+
+    # Generic/bot comment detection
+    generic_count = 0
+    for comment in comments:
+        comment_lower = comment.strip().lower()
+        for pattern in COMPILED_BOT_PATTERNS:
+            if pattern.match(comment_lower):
+                generic_count += 1
+                break
+    generic_ratio = generic_count / total
+
+    # Duplicate detection
+    comment_counts = Counter(c.lower().strip() for c in comments)
+    duplicates = sum(count - 1 for count in comment_counts.values() if count > 1)
+    duplicate_ratio = duplicates / total
+
+    # Short comment ratio (< 5 chars)
+    short_comments = sum(1 for c in comments if len(c.strip()) < 5)
+    short_comment_ratio = short_comments / total
+
+    # Combined bot pattern score (0-100)
+    bot_pattern_score = min(100, (
+        generic_ratio * 40 +
+        duplicate_ratio * 30 +
+        short_comment_ratio * 20 +
+        (1 if emoji_ratio > 0.5 else 0) * 10
+    ))
+
+    return {
+        "total_comments": total,
+        "avg_length": avg_length,
+        "emoji_ratio": emoji_ratio,
+        "generic_ratio": generic_ratio,
+        "duplicate_ratio": duplicate_ratio,
+        "short_comment_ratio": short_comment_ratio,
+        "bot_pattern_score": bot_pattern_score,
+    }
+
+
+def detect_rule_based_flags(features) -> List[str]:
+    """
+    Rule-based checks that complement ML scoring.
+    Returns list of human-readable flags.
+    Includes TikTok-specific patterns.
+    """
+    flags = []
+    views = max(features.views, 1)
+
+    # =========================================================================
+    # UNIVERSAL FLAGS (all platforms)
+    # =========================================================================
+
+    # Extremely low engagement (potential view botting)
+    engagement_rate = (features.likes + features.comments) / views
+    if features.views > 1000 and engagement_rate < 0.001:
+        flags.append("extremely_low_engagement")
+
+    # Suspiciously perfect ratios (bot fingerprint)
+    if features.views > 100:
+        like_ratio = features.likes / views
+        if 0.09 < like_ratio < 0.11:  # Exactly ~10% likes
+            flags.append("suspicious_like_ratio")
+
+    # Very high velocity for non-verified accounts
+    hours = max(features.hours_since_upload, 0.1)
+    velocity = features.views / hours
+    if velocity > 10000 and not features.author_verified:
+        flags.append("high_velocity_unverified")
+
+    # New account with high views
+    if features.account_age_days < 30 and features.views > 50000:
+        flags.append("new_account_viral")
+
+    # Previous fraud history
+    if features.creator_previous_flags >= 2:
+        flags.append("repeat_fraud_history")
+
+    # Low trust score
+    if features.creator_trust_score < 50:
+        flags.append("low_trust_score")
+
+    # Zero comments with high views (unnatural)
+    if features.views > 5000 and features.comments == 0:
+        flags.append("zero_comments_high_views")
+
+    # Engagement significantly above campaign average
+    if features.campaign_avg_engagement_rate:
+        total_rate = (features.likes + features.comments + features.shares) / views
+        if total_rate > features.campaign_avg_engagement_rate * 5:
+            flags.append("engagement_far_above_average")
+
+    # =========================================================================
+    # TIKTOK-SPECIFIC FLAGS
+    # =========================================================================
+
+    if features.platform == "tiktok":
+        # Follower/Following ratio anomalies (common bot pattern)
+        if features.author_follower_count and features.author_following_count:
+            if features.author_following_count > 0:
+                ff_ratio = features.author_follower_count / features.author_following_count
+
+                # Very low ratio with high views = likely bought followers/views
+                if ff_ratio < 0.1 and features.views > 10000:
+                    flags.append("tiktok_low_follower_ratio_high_views")
+
+                # Following way more than followers (engagement pod behavior)
+                if features.author_following_count > 5000 and ff_ratio < 0.5:
+                    flags.append("tiktok_engagement_pod_pattern")
+
+            # Following exactly 0 with followers (bot pattern)
+            elif features.author_follower_count > 1000:
+                flags.append("tiktok_zero_following_suspicious")
+
+        # No duets or stitches with viral views (inorganic)
+        # Real viral TikToks usually get some duets/stitches
+        if features.views > 100000:
+            duets = features.duets or 0
+            stitches = features.stitches or 0
+            if duets == 0 and stitches == 0:
+                flags.append("tiktok_viral_no_engagement_actions")
+
+        # Excessive hashtag usage (spam pattern)
+        if features.hashtag_count and features.hashtag_count > 12:
+            flags.append("tiktok_excessive_hashtags")
+
+        # Very short watch time for long videos (view botting signal)
+        if features.video_duration_seconds and features.avg_watch_time_seconds:
+            if features.video_duration_seconds > 30:
+                completion = features.avg_watch_time_seconds / features.video_duration_seconds
+                if completion < 0.1 and features.views > 5000:
+                    flags.append("tiktok_low_watch_completion")
+
+        # Mass posting pattern (content farms)
+        if features.author_videos_last_30_days and features.author_videos_last_30_days > 90:
+            flags.append("tiktok_mass_posting")
+
+        # Original sound but trending engagement (unusual)
+        if features.sound_is_original and not features.sound_is_trending:
+            if features.views > 500000 and engagement_rate < 0.01:
+                flags.append("tiktok_original_sound_viral_low_engagement")
+
+    # =========================================================================
+    # COMMENT ANALYSIS FLAGS
+    # =========================================================================
+
+    if features.comment_data and features.comment_data.texts:
+        comment_analysis = analyze_comments(features.comment_data.texts)
+
+        # High generic comment ratio
+        if comment_analysis["generic_ratio"] > 0.5:
+            flags.append("high_generic_comments")
+
+        # High duplicate comments
+        if comment_analysis["duplicate_ratio"] > 0.3:
+            flags.append("high_duplicate_comments")
+
+        # Very short average comment length
+        if comment_analysis["avg_length"] < 5 and comment_analysis["total_comments"] > 10:
+            flags.append("very_short_comments")
+
+        # High emoji-only ratio
+        if comment_analysis["emoji_ratio"] > 0.7:
+            flags.append("emoji_heavy_comments")
+
+        # Overall bot comment pattern
+        if comment_analysis["bot_pattern_score"] > 60:
+            flags.append("bot_comment_pattern_detected")
+
+    return flags
+
+
+# Flag severity weights for scoring
+FLAG_WEIGHTS = {
+    # High severity (20+ points)
+    "repeat_fraud_history": 25,
+    "bot_comment_pattern_detected": 25,
+    "extremely_low_engagement": 20,
+    "tiktok_engagement_pod_pattern": 20,
+
+    # Medium severity (15 points)
+    "high_velocity_unverified": 15,
+    "new_account_viral": 15,
+    "tiktok_low_follower_ratio_high_views": 15,
+    "tiktok_viral_no_engagement_actions": 15,
+    "high_generic_comments": 15,
+    "high_duplicate_comments": 15,
+
+    # Lower severity (10 points)
+    "suspicious_like_ratio": 10,
+    "low_trust_score": 10,
+    "zero_comments_high_views": 10,
+    "engagement_far_above_average": 10,
+    "tiktok_zero_following_suspicious": 10,
+    "tiktok_excessive_hashtags": 10,
+    "tiktok_low_watch_completion": 10,
+    "tiktok_mass_posting": 10,
+    "tiktok_original_sound_viral_low_engagement": 10,
+    "very_short_comments": 10,
+    "emoji_heavy_comments": 10,
+}
+
+DEFAULT_FLAG_WEIGHT = 8  # For any flag not in the dict
+
+
+def tiktok_quick_check(request) -> dict:
+    """Body of the original /tiktok/quick-check endpoint, returning the response fields"""
+    flags = []
+    risk_score = 0  # Lower is better
+
+    # Follower/Following ratio analysis
+    if request.following_count > 0:
+        ff_ratio = request.follower_count / request.following_count
+    else:
+        ff_ratio = request.follower_count if request.follower_count > 0 else 0
+
+    # Engagement per follower
+    if request.follower_count > 0:
+        likes_per_follower = request.total_likes / request.follower_count
+    else:
+        likes_per_follower = 0
+
+    # Videos per day (posting velocity)
+    if request.account_age_days > 0:
+        videos_per_day = request.video_count / request.account_age_days
+    else:
+        videos_per_day = request.video_count
+
+    # === FLAG CHECKS ===
+
+    # Following way more than followers (engagement farming)
+    if request.following_count > 3000 and ff_ratio < 0.3:
+        flags.append("engagement_farming_pattern")
+        risk_score += 25
+
+    # Very new account with lots of followers (bought followers)
+    if request.account_age_days < 30 and request.follower_count > 10000:
+        flags.append("new_account_high_followers")
+        risk_score += 20
+
+    # Low engagement relative to followers
+    if request.follower_count > 1000 and likes_per_follower < 0.1:
+        flags.append("low_engagement_ratio")
+        risk_score += 15
+
+    # Excessive posting (content farm)
+    if videos_per_day > 5:
+        flags.append("excessive_posting_rate")
+        risk_score += 15
+
+    # Zero following (often bot pattern)
+    if request.following_count == 0 and request.follower_count > 500:
+        flags.append("zero_following")
+        risk_score += 10
+
+    # Very high follower count but no verification
+    if request.follower_count > 100000 and not request.verified:
+        flags.append("high_followers_unverified")
+        risk_score += 10
+
+    # Unusual engagement patterns if we have video-level data
+    if request.avg_views_per_video and request.avg_comments_per_video:
+        if request.avg_views_per_video > 10000 and request.avg_comments_per_video < 5:
+            flags.append("high_views_low_comments")
+            risk_score += 20
+
+    # === POSITIVE SIGNALS (reduce risk) ===
+
+    if request.verified:
+        risk_score -= 20
+
+    if request.account_age_days > 365:
+        risk_score -= 10
+
+    if 1 < ff_ratio < 50:  # Healthy ratio
+        risk_score -= 5
+
+    if 0.1 < videos_per_day < 2:  # Normal posting rate
+        risk_score -= 5
+
+    # Clamp risk score
+    risk_score = max(0, min(100, risk_score))
+
+    # Convert to authenticity score (inverse of risk)
+    authenticity_score = 100 - risk_score
+
+    # Determine risk level
+    if risk_score < 25:
+        risk_level = "low"
+    elif risk_score < 50:
+        risk_level = "medium"
+    else:
+        risk_level = "high"
+
+    return dict(
+        authenticity_score=authenticity_score,
+        risk_level=risk_level,
+        flags=flags,
+        metrics={
+            "follower_following_ratio": round(ff_ratio, 2),
+            "likes_per_follower": round(likes_per_follower, 2),
+            "videos_per_day": round(videos_per_day, 3),
+            "account_age_days": request.account_age_days,
+        }
+    )
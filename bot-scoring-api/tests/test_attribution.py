@@ -0,0 +1,64 @@
+import numpy as np
+
+import main
+from attribution import (
+    MIN_ATTRIBUTION_ROWS,
+    batch_contributions,
+    batch_dimension_scores,
+    standardized_deviations,
+    top_contributions,
+)
+from feature_matrix import FEATURE_NAMES, build_feature_matrix
+
+
+def _features(make_submissions, n, seed):
+    submissions = make_submissions(n, seed)
+    analyses = [main.get_comment_analysis(sub) for sub in submissions]
+    return build_feature_matrix(submissions, analyses)
+
+
+def test_small_batch_ranks_by_deviation_from_mean(make_submissions):
+    X = _features(make_submissions, MIN_ATTRIBUTION_ROWS - 1, 3)
+    deviations = np.abs(X - X.mean(axis=0))
+    for row, contributions in zip(deviations, batch_contributions(X)):
+        expected = np.argsort(row)[-5:][::-1]
+        assert list(contributions) == [FEATURE_NAMES[idx] for idx in expected]
+        assert list(contributions.values()) == [float(row[idx]) for idx in expected]
+        # Saturated ECOD scores would tie all five at ln(n)
+        assert len(set(contributions.values())) > 1
+
+
+def test_ties_broken_by_standardized_deviation(make_submissions):
+    X = _features(make_submissions, MIN_ATTRIBUTION_ROWS, 4)
+    scores = batch_dimension_scores(X)
+    z = standardized_deviations(X)
+    for i, contributions in enumerate(batch_contributions(X)):
+        idx = [FEATURE_NAMES.index(name) for name in contributions]
+        keys = [(-scores[i, j], -z[i, j]) for j in idx]
+        assert keys == sorted(keys)
+        assert list(contributions.values()) == [float(scores[i, j]) for j in idx]
+
+
+def test_tiebreak_only_reorders_equal_scores():
+    scores = np.array([[2.0, 3.0, 3.0, 1.0, 3.0]])
+    tiebreak = np.array([[9.0, 0.5, 2.0, 9.0, 1.0]])
+    names = ["a", "b", "c", "d", "e"]
+    assert list(top_contributions(scores, 4, names)[0]) == ["b", "c", "e", "a"]
+    assert list(top_contributions(scores, 4, names, tiebreak=tiebreak)[0]) == ["c", "e", "b", "a"]
+
+
+def test_tiebreak_matches_a_full_sort():
+    rng = np.random.default_rng(5)
+    scores = rng.integers(0, 4, size=(200, 12)).astype(float)
+    tiebreak = rng.integers(0, 3, size=(200, 12)).astype(float)
+    names = [f"f{j}" for j in range(12)]
+    expected = np.lexsort((-tiebreak, -scores), axis=1)[:, :5]
+    for row, contributions in zip(expected, top_contributions(scores, 5, names, tiebreak=tiebreak)):
+        assert list(contributions) == [names[j] for j in row]
+
+
+def test_response_names_the_attribution_path(make_submissions):
+    for n, attribution in [(MIN_ATTRIBUTION_ROWS - 1, "batch_deviation"), (MIN_ATTRIBUTION_ROWS, "batch")]:
+        submissions = make_submissions(n, 6)
+        X = build_feature_matrix(submissions, [main.get_comment_analysis(sub) for sub in submissions])
+        assert {score.attribution for score in main.calculate_bot_score(X, submissions)} == {attribution}
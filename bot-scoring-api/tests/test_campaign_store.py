@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from campaign_store import CampaignBaselineStore, RunningStats
+
+
+def _values(n):
+    return {metric: np.full(n, 1.0) for metric in ("engagement_rate", "views", "velocity")}
+
+
+def test_batch_with_more_campaigns_than_cache(tmp_path):
+    store = CampaignBaselineStore(str(tmp_path / "campaigns.sqlite3"), max_cached=2)
+    ids = [f"c{i}" for i in range(5)]
+
+    summaries = store.summaries(ids)
+    assert sorted(summaries) == ids
+    assert all(s["count"] == 0 for s in summaries.values())
+
+    store.update(np.array(ids * 2, dtype=object), _values(10))
+    assert store.stats()["cached"] == 2
+    store.close()
+
+    # Campaigns evicted mid-batch were written, not lost
+    reopened = CampaignBaselineStore(str(tmp_path / "campaigns.sqlite3"), max_cached=2)
+    assert all(s["count"] == 2 for s in reopened.summaries(ids).values())
+    reopened.close()
+
+
+def _metrics(rng, n):
+    return {
+        "engagement_rate": rng.uniform(0, 0.3, n),
+        "views": rng.lognormal(9, 2, n),
+        "velocity": rng.lognormal(6, 2, n),
+    }
+
+
+def test_rescoring_a_video_leaves_the_baseline_unchanged(tmp_path):
+    rng = np.random.default_rng(0)
+    store = CampaignBaselineStore(str(tmp_path / "campaigns.sqlite3"))
+    ids = np.array(["c"] * 30, dtype=object)
+    videos = np.array([f"v{i}" for i in range(30)], dtype=object)
+    values = _metrics(rng, 30)
+    store.update(ids, values, videos)
+    before = store.summaries(["c"])["c"]
+
+    # The dashboard polls the first five videos again, twice
+    for _ in range(2):
+        store.update(ids[:5], {m: v[:5] for m, v in values.items()}, videos[:5])
+    after = store.summaries(["c"])["c"]
+    assert after["count"] == before["count"] == 30
+    for metric in ("engagement_rate", "views", "velocity"):
+        for key in ("mean", "std", "p50", "p90"):
+            assert after[metric][key] == pytest.approx(before[metric][key], rel=1e-9)
+    store.close()
+
+
+def test_rescore_replaces_the_contribution(tmp_path):
+    rng = np.random.default_rng(1)
+    first, second = _metrics(rng, 20), _metrics(rng, 20)
+    ids = np.array(["c"] * 20, dtype=object)
+    videos = np.array([f"v{i}" for i in range(20)], dtype=object)
+    anonymous = {m: v[:3] for m, v in _metrics(rng, 3).items()}
+
+    path = str(tmp_path / "campaigns.sqlite3")
+    store = CampaignBaselineStore(path)
+    store.update(ids, first, videos)
+    store.update(ids[:3], anonymous, np.array([None] * 3, dtype=object))
+    store.close()
+    # The earlier contributions are read back from SQLite
+    store = CampaignBaselineStore(path)
+    store.update(ids, second, videos)
+    replaced = store.summaries(["c"])["c"]
+    store.close()
+
+    fresh = CampaignBaselineStore(str(tmp_path / "fresh.sqlite3"))
+    fresh.update(ids, second, videos)
+    fresh.update(ids[:3], anonymous)
+    expected = fresh.summaries(["c"])["c"]
+    fresh.close()
+
+    assert replaced["count"] == expected["count"] == 23
+    for metric in ("engagement_rate", "views", "velocity"):
+        assert replaced[metric]["mean"] == pytest.approx(expected[metric]["mean"], rel=1e-9)
+        assert replaced[metric]["std"] == pytest.approx(expected[metric]["std"], rel=1e-9)
+        assert replaced[metric]["p90"] == pytest.approx(expected[metric]["p90"], rel=1e-9)
+
+
+def test_running_stats_remove_undoes_add():
+    rng = np.random.default_rng(2)
+    kept, removed = rng.normal(5, 2, 50), rng.normal(-1, 3, 7)
+    stats = RunningStats()
+    stats.add_many(kept)
+    stats.add_many(removed)
+    stats.remove_many(removed)
+    assert stats.count == 50
+    assert stats.mean == pytest.approx(kept.mean(), rel=1e-9)
+    assert stats.std == pytest.approx(kept.std(), rel=1e-9)
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+import main
+from codec import ModelCodec
+
+BASE = {
+    "views": 1_000, "likes": 10, "comments": 1, "shares": 1,
+    "hours_since_upload": 2.0, "hours_since_submission": 1.0,
+    "account_age_days": 5, "platform": "tiktok",
+}
+
+VALUES = [1, 1.0, 1.5, -1, 1e3, True, None, "1", "01", "+1", " 1", "1.0", "1e3", "1E3", "1_000", "0x10", "", "abc", "true"]
+FIELDS = ["views", "account_age_days", "hours_since_upload", "creator_trust_score", "author_verified", "platform"]
+
+
+def _outcome(decode, body):
+    try:
+        return decode(body).model_dump()
+    except ValidationError:
+        return "invalid"
+
+
+@pytest.mark.parametrize("field", FIELDS)
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_codec_agrees_with_pydantic(field, value):
+    body = json.dumps({"submissions": [dict(BASE, **{field: value})]}).encode()
+    expected = _outcome(main.ScoringRequest.model_validate_json, body)
+    assert _outcome(ModelCodec(main.ScoringRequest).decode, body) == expected
+    assert _outcome(ModelCodec(main.ScoringRequest, use_msgspec=False).decode, body) == expected
+
+
+def test_exponent_string_rejected_for_int_field():
+    body = json.dumps(dict(BASE, views="1e3")).encode()
+    with pytest.raises(ValidationError):
+        ModelCodec(main.VideoFeatures).decode(body)
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache import LRUTTLCache
+
+VIDEOS = {
+    "farm": ["nice", "nice", "wow", "love it", "🔥🔥🔥", "great video", "nice", "amazing"],
+    "organic": [
+        "the lighting in the second shot is really well done",
+        "my grandmother used to make this exact recipe every sunday",
+        "what camera did you use for the slow motion part?",
+    ],
+    "mixed": ["nice", "the transition at the end was so smooth, how did you do it"],
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.mark.parametrize("weights,n_chunks", [
+    ([5, 5, 5, 5], 2), ([1, 100, 1, 1], 3), ([3], 4), ([1, 1, 1], 8), ([10, 0, 0, 10], 2),
+])
+def test_split_by_weight_covers_every_item_once(weights, n_chunks):
+    chunks = main.split_by_weight(weights, n_chunks)
+    assert 1 <= len(chunks) <= n_chunks
+    assert all(chunk.stop > chunk.start for chunk in chunks)
+    assert [i for chunk in chunks for i in range(chunk.start, chunk.stop)] == list(range(len(weights)))
+
+
+def test_split_by_weight_balances_comment_counts():
+    chunks = main.split_by_weight([10] * 8, 4)
+    assert [chunk.stop - chunk.start for chunk in chunks] == [2, 2, 2, 2]
+
+
+def test_analyze_comment_sets_matches_analyze_comments_and_caches(monkeypatch):
+    monkeypatch.setattr(main, "COMMENT_ANALYSIS_CACHE", LRUTTLCache(maxsize=64))
+    comment_lists = list(VIDEOS.values())
+    analyses = asyncio.run(main.analyze_comment_sets(comment_lists))
+    assert analyses == [main.analyze_comments(comments) for comments in comment_lists]
+
+    # A second pass is served from the cache without scanning
+    monkeypatch.setattr(main, "scan_many", lambda *args: pytest.fail("cache miss"))
+    assert asyncio.run(main.analyze_comment_sets(comment_lists)) == analyses
+
+
+def test_batch_results_match_single_endpoint(client):
+    response = client.post("/analyze/comments/batch", json={"videos": VIDEOS})
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body["results"]) == list(VIDEOS)
+    for video_id, comments in VIDEOS.items():
+        assert body["results"][video_id] == client.post("/analyze/comments", json={"comments": comments}).json()
+
+    aggregate = body["aggregate"]
+    results = body["results"].values()
+    assert aggregate["total_videos"] == len(VIDEOS)
+    assert aggregate["total_comments"] == sum(len(comments) for comments in VIDEOS.values())
+    assert aggregate["max_bot_pattern_score"] == max(r["bot_pattern_score"] for r in results)
+    assert sum(aggregate["verdict_counts"].values()) == len(VIDEOS)
+    assert aggregate["flagged_videos"] == [
+        video_id for video_id, r in body["results"].items() if r["verdict"] in ("suspicious", "likely_fake")
+    ]
+
+
+def test_batch_limits(client, monkeypatch):
+    assert client.post("/analyze/comments/batch", json={"videos": {}}).status_code == 400
+    assert client.post("/analyze/comments/batch", json={"videos": {"a": []}}).status_code == 400
+    assert client.post("/analyze/comments/batch", json={"videos": {"a": ["x"] * 1001}}).status_code == 400
+    monkeypatch.setattr(main, "COMMENT_BATCH_MAX_VIDEOS", 2)
+    assert client.post("/analyze/comments/batch", json={"videos": VIDEOS}).status_code == 400
@@ -0,0 +1,64 @@
+import numpy as np
+
+import main
+from comment_lsh import CrossVideoCommentIndex
+from feature_matrix import extract_columns
+
+FARM = [
+    "omg this is literally the best video i have seen today",
+    "check out my page for more amazing content like this",
+    "who else is watching this in 2026? drop a like below",
+]
+ORGANIC = [
+    "the lighting in the second shot is really well done",
+    "my grandmother used to make this exact recipe every sunday",
+]
+
+
+def test_videos_with_ids_match_each_other_not_themselves():
+    index = CrossVideoCommentIndex()
+    checked, matched, videos = index.add_and_match(["a", "b", "c"], [FARM, FARM, ORGANIC])
+    assert checked.tolist() == [3, 3, 2]
+    assert matched.tolist() == [3, 3, 0]
+    assert videos.tolist() == [1, 1, 0]
+
+    # Rescoring a alone finds b, never a's own earlier comments
+    _, matched, videos = index.add_and_match(["a"], [FARM])
+    assert matched.tolist() == [3] and videos.tolist() == [1]
+    _, matched, _ = CrossVideoCommentIndex().add_and_match(["a"], [FARM])
+    assert matched.tolist() == [0]
+
+
+def test_transient_videos_match_but_are_not_kept():
+    index = CrossVideoCommentIndex(max_entries=16)
+    index.add_and_match(["a"], [FARM])
+    entries = index.stats()["entries"]
+
+    _, matched, videos = index.add_and_match(["x", "y"], [FARM, FARM], keep=[False, False])
+    assert matched.tolist() == [3, 3]
+    assert videos.tolist() == [2, 2]  # a, and each other
+    assert index.stats()["entries"] == entries
+
+    # The ring wasn't advanced, so a's comments are still there
+    _, matched, _ = index.add_and_match(["b"], [FARM])
+    assert matched.tolist() == [3]
+
+
+def _columns(submissions):
+    return extract_columns(submissions, [main.get_comment_analysis(sub) for sub in submissions])
+
+
+def test_copy_pasted_lists_without_video_ids_match(make_submissions, monkeypatch):
+    monkeypatch.setattr(main, "CROSS_VIDEO_COMMENT_INDEX", CrossVideoCommentIndex())
+    base = make_submissions(2, 31)
+    submissions = [sub.model_copy(update={"comment_data": main.CommentData(texts=list(FARM))}) for sub in base]
+
+    columns = _columns(submissions)
+    main.apply_cross_video_comments(submissions, columns)
+    np.testing.assert_array_equal(columns["comment_cross_video_ratio"], [1.0, 1.0])
+    np.testing.assert_array_equal(columns["comment_cross_video_videos"], [1.0, 1.0])
+
+    # Resending one of them alone doesn't match the earlier pass
+    columns = _columns(submissions[:1])
+    main.apply_cross_video_comments(submissions[:1], columns)
+    np.testing.assert_array_equal(columns["comment_cross_video_ratio"], [0.0])
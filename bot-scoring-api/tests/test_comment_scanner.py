@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import main
+import reference
+from comment_scanner import CommentScanner, scan_many
+from conftest import COMMENT_POOL, random_comments
+
+# Case folding, Unicode whitespace and emoji edge cases for the fused pass
+TRICKY = [
+    "NICE", "nIcE!!!...", "\tnice\n", " nice ", "nice ", "İ", "ß", "ﬁre", "Ǆ", "K",
+    "follow\tback", "Follow   me now", "checkout my page", "check out profile", "dm4", "DM FOR collab",
+    "🔥" * 5, "🔥 🔥", "❤️❤️", "❤", "👍👍", "😀😀😀", "Ⓜ", "✂", "\U0001F251", "á", "  ", "\n",
+    "x" * 500, "abc", "abcd", " abcd ", "lol lol", "LOL LOL", "lol lol ",
+]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_scanner_matches_per_pattern_loop(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(50):
+        comments = random_comments(rng)
+        if rng.random() < 0.5:
+            comments += list(rng.choice(TRICKY, int(rng.integers(1, 20))))
+        assert main.analyze_comments(comments) == reference.analyze_comments(comments)
+
+
+@pytest.mark.parametrize("comment", TRICKY + COMMENT_POOL)
+def test_single_comment_edge_cases(comment):
+    assert main.analyze_comments([comment]) == reference.analyze_comments([comment])
+
+
+def test_empty_list():
+    assert main.analyze_comments([]) == reference.analyze_comments([])
+
+
+def test_scan_many_matches_scan():
+    rng = np.random.default_rng(3)
+    lists = [random_comments(rng) for _ in range(30)] + [[], TRICKY]
+    scanner = CommentScanner(main.GENERIC_BOT_COMMENTS)
+    assert scan_many(main.GENERIC_BOT_PATTERNS, lists) == [scanner.scan(c) for c in lists]
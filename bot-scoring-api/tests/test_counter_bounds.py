@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+import main
+from codec import ModelCodec
+from submissions import MAX_COUNT
+
+
+def _submission(**overrides):
+    submission = {
+        "views": 50_000, "likes": 2_500, "comments": 120, "shares": 40,
+        "hours_since_upload": 24.0, "hours_since_submission": 2.0,
+        "account_age_days": 400, "platform": "tiktok",
+    }
+    submission.update(overrides)
+    return submission
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.mark.parametrize("use_msgspec", [True, False])
+@pytest.mark.parametrize("field, value", [
+    ("views", 2 ** 63), ("likes", 2 ** 62), ("bookmarks", 2 ** 64), ("author_follower_count", -(2 ** 63)),
+])
+def test_both_decoders_reject_out_of_range_counts(use_msgspec, field, value):
+    codec = ModelCodec(main.ScoringRequest, use_msgspec=use_msgspec)
+    body = json.dumps({"submissions": [_submission(**{field: value})]}).encode()
+    with pytest.raises(ValidationError):
+        codec.decode(body)
+
+
+def test_out_of_range_counts_are_a_422_not_a_500(client):
+    response = client.post("/score", json={"submissions": [_submission(views=2 ** 63)]})
+    assert response.status_code == 422
+    response = client.post("/score", json={"submissions": [_submission(likes=2 ** 62, comments=2 ** 62, shares=2 ** 62)]})
+    assert response.status_code == 422
+
+
+def test_largest_counts_score_without_wraparound(client):
+    big = MAX_COUNT
+    submission = _submission(views=big, likes=big, comments=big, shares=big)
+    response = client.post("/score", headers={"Cache-Control": "no-store"}, json={"submissions": [submission]})
+    assert response.status_code == 200
+    assert "extremely_low_engagement" not in response.json()["scores"][0]["flags"]
@@ -0,0 +1,112 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from creator_store import CreatorReputationStore, apply_creator_reputation
+from feature_matrix import extract_columns
+
+DAY = 86400.0
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CreatorReputationStore(str(tmp_path / "creators.sqlite3"))
+    yield store
+    store.close()
+
+
+def _summary(store, cid, now):
+    return store.summaries([cid], now=now)[cid]
+
+
+def test_rescoring_a_video_leaves_reputation_unchanged(store):
+    now = time.time()
+    store.update(np.array(["c"]), np.array([80.0]), np.array(["v1"], dtype=object), now=now)
+    before = _summary(store, "c", now)
+    for i in range(3):
+        store.update(np.array(["c"]), np.array([80.0]), np.array(["v1"], dtype=object), now=now + i)
+    after = _summary(store, "c", now + 2)
+    assert after["submissions"] == pytest.approx(before["submissions"], rel=1e-6)
+    assert after["flags"] == pytest.approx(before["flags"], rel=1e-6)
+    assert after["trust_score"] == pytest.approx(before["trust_score"], rel=1e-6)
+
+
+def test_rescore_replaces_the_old_outcome(store):
+    now = time.time()
+    videos = np.array(["v1", "v2"], dtype=object)
+    store.update(np.array(["c", "c"]), np.array([90.0, 10.0]), videos, now=now)
+    store.update(np.array(["c"]), np.array([20.0]), videos[:1], now=now)
+    summary = _summary(store, "c", now)
+    assert summary["submissions"] == pytest.approx(2.0)
+    assert summary["flags"] == pytest.approx(0.0)
+    assert summary["trust_score"] == pytest.approx(100.0 - 30.0 / (2.0 + store.trust_prior))
+
+
+def test_decayed_outcome_is_taken_back_at_its_decayed_weight(store):
+    now = time.time() - 90 * DAY
+    store.update(np.array(["c"]), np.array([80.0]), np.array(["v1"], dtype=object), now=now)
+    store.update(np.array(["c"]), np.array([80.0]), np.array(["v1"], dtype=object), now=now + 90 * DAY)
+    assert _summary(store, "c", now + 90 * DAY)["submissions"] == pytest.approx(1.0)
+
+
+def test_outcomes_survive_a_restart(tmp_path):
+    path = str(tmp_path / "creators.sqlite3")
+    now = time.time()
+    store = CreatorReputationStore(path)
+    store.update(np.array(["c"]), np.array([80.0]), np.array(["v1"], dtype=object), now=now)
+    store.close()
+
+    reopened = CreatorReputationStore(path)
+    reopened.update(np.array(["c"]), np.array([80.0]), np.array(["v1"], dtype=object), now=now)
+    assert _summary(reopened, "c", now)["submissions"] == pytest.approx(1.0)
+    reopened.close()
+
+
+def test_submissions_without_video_id_count_every_time(store):
+    now = time.time()
+    store.update(np.array(["c", "c"]), np.array([50.0, 50.0]), np.array([None, None], dtype=object), now=now)
+    store.update(np.array(["c"]), np.array([50.0]), now=now)
+    assert _summary(store, "c", now)["submissions"] == pytest.approx(3.0)
+
+
+def test_polling_a_video_does_not_build_fraud_history():
+    submission = {
+        "views": 200_000, "likes": 50, "comments": 0, "shares": 0,
+        "hours_since_upload": 2.0, "hours_since_submission": 1.0,
+        "account_age_days": 3, "platform": "tiktok",
+        "creator_id": "poll-creator", "video_id": "poll-video",
+    }
+    with TestClient(main.app) as client:
+        responses = [
+            client.post("/score", json={"submissions": [submission]}, headers={"Cache-Control": "no-cache"}).json()
+            for _ in range(3)
+        ]
+    assert all("repeat_fraud_history" not in r["scores"][0]["flags"] for r in responses)
+    assert len({r["scores"][0]["bot_score"] for r in responses}) == 1
+
+
+def test_omitted_creator_fields_are_filled_and_supplied_ones_kept(store, make_submissions):
+    store.update(np.array(["c"] * 4, dtype=object), np.array([90.0, 90.0, 90.0, 10.0]))
+    expected = store.lookup(["c"])
+    omitted = {"creator_previous_submissions": None, "creator_previous_flags": None, "creator_trust_score": None}
+    base = make_submissions(3, 14)
+    submissions = [
+        base[0].model_copy(update={**omitted, "creator_id": "c"}),
+        base[1].model_copy(update={**omitted, "creator_id": "c", "creator_previous_flags": 0, "creator_trust_score": 99.0}),
+        base[2].model_copy(update={**omitted, "creator_id": None}),
+    ]
+
+    columns = extract_columns(submissions, [None] * 3)
+    assert apply_creator_reputation(columns, store) == 2
+
+    for name, values in expected.items():
+        assert columns[name][0] == pytest.approx(values[0]) and columns.present[name][0]
+    assert columns["creator_previous_submissions"][1] == expected["creator_previous_submissions"][0]
+    assert columns["creator_previous_flags"][1] == 0
+    assert columns["creator_trust_score"][1] == 99.0
+    # Without a creator_id nothing is filled
+    assert not any(columns.present[name][2] for name in expected)
+    assert columns["creator_trust_score"][2] == 100.0
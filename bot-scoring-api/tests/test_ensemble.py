@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from detectors import COMBINERS, EnsembleSpec, combine_scores, fit_batch_detectors
+
+# Two detectors on unrelated scales: the first is large everywhere, the second flags row 2
+SCORES = np.array([
+    [1000.0, 0.1],
+    [1010.0, 0.1],
+    [1005.0, 0.9],
+    [1000.0, 0.1],
+])
+
+
+def _z(scores):
+    return (scores - scores.mean(axis=0)) / scores.std(axis=0)
+
+
+def test_average_of_raw_scores():
+    np.testing.assert_allclose(combine_scores(SCORES), SCORES.mean(axis=1))
+    np.testing.assert_allclose(combine_scores(SCORES, standardize=True), _z(SCORES).mean(axis=1))
+
+
+def test_maximization_takes_the_max_of_standardized_scores():
+    combined = combine_scores(SCORES, "maximization", standardize=True)
+    np.testing.assert_allclose(combined, _z(SCORES).max(axis=1))
+    assert combined.argmax() == 2  # Not whichever row the large-scale detector prefers
+
+
+def test_median_of_standardized_scores():
+    np.testing.assert_allclose(combine_scores(SCORES, "median", standardize=True), np.median(_z(SCORES), axis=1))
+
+
+@pytest.mark.parametrize("combiner", ["maximization", "median"])
+def test_raw_scores_are_rejected_where_scale_decides(combiner):
+    with pytest.raises(ValueError):
+        combine_scores(SCORES, combiner)
+    with pytest.raises(ValueError):
+        EnsembleSpec(combiner=combiner, standardize=False)
+    with pytest.raises(ValueError):
+        EnsembleSpec.from_dict({"detectors": ["ecod"], "combiner": combiner, "standardize": False})
+
+
+@pytest.mark.parametrize("combiner, standardize", [("average", False), ("maximization", True), ("median", True)])
+def test_standardize_defaults_per_combiner(combiner, standardize):
+    assert EnsembleSpec(combiner=combiner).standardize is standardize
+    spec = EnsembleSpec.from_dict({"detectors": ["ecod"], "combiner": combiner})
+    assert spec.standardize is standardize
+    assert EnsembleSpec.from_dict(spec.to_dict()) == spec
+
+
+@pytest.mark.parametrize("combiner", COMBINERS)
+def test_batch_fit_with_each_combiner(combiner):
+    rng = np.random.default_rng(8)
+    X = rng.lognormal(size=(60, 8))
+    spec = EnsembleSpec.from_names(["iforest", "lof", "ecod"], combiner=combiner)
+    scores, distances = fit_batch_detectors(X, ensemble=spec)
+    assert scores.shape == distances.shape == (60,)
+    assert np.isfinite(scores).all()
@@ -0,0 +1,33 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from executor import ScoringExecutor
+
+
+def test_pool_is_replaced_after_a_worker_dies():
+    executor = ScoringExecutor(1)
+
+    async def scenario():
+        assert await executor.run(pow, 2, 3) == 8
+        broken = executor._pool
+        with pytest.raises(BrokenProcessPool):
+            await executor.run(os._exit, 1)
+        assert executor._pool is None
+        assert await executor.run(pow, 2, 4) == 16
+        assert executor._pool is not broken
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    stats = executor.stats()
+    assert (stats["completed"], stats["failed"], stats["queue_depth"]) == (2, 1, 0)
+
+
+def test_disabled_pool_runs_in_threads():
+    executor = ScoringExecutor(0)
+    assert asyncio.run(executor.run(pow, 3, 2)) == 9
+    assert not executor.stats()["running"]
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+import main
+from feature_matrix import N_FEATURES, build_feature_matrix, extract_columns
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_scalar_feature_vectors(make_submissions, seed):
+    submissions = make_submissions(400, seed)
+    analyses = [main.get_comment_analysis(sub) for sub in submissions]
+
+    expected = np.array([main.extract_feature_vector(sub, a) for sub, a in zip(submissions, analyses)])
+    actual = build_feature_matrix(submissions, analyses)
+
+    assert actual.shape == (len(submissions), N_FEATURES)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_precomputed_columns_and_out_buffer(make_submissions):
+    submissions = make_submissions(50, 7)
+    analyses = [main.get_comment_analysis(sub) for sub in submissions]
+    out = np.empty((50, N_FEATURES))
+    result = build_feature_matrix(columns=extract_columns(submissions, analyses), out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, build_feature_matrix(submissions, analyses))
+
+
+def test_empty_batch():
+    assert build_feature_matrix([]).shape == (0, N_FEATURES)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+
+from job_queue import CANCELLED, COMPLETED, QUEUED, RUNNING, JobRunner, JobStore
+
+CHUNKS = [(2, b"a"), (2, b"b"), (1, b"c")]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+@pytest.fixture
+def store(path):
+    store = JobStore(path)
+    yield store
+    store.close()
+
+
+def test_restarted_job_resumes_at_the_next_chunk(path):
+    store = JobStore(path)
+    job_id = store.create(CHUNKS, chunk_size=2)["job_id"]
+    started_at = store.claim("w1", stale_seconds=600)["started_at"]
+    assert store.complete_chunk(job_id, "w1", 0, 2, b"A")
+    store.close()  # The process dies mid-job
+
+    reopened = JobStore(path)
+    job = reopened.get(job_id)
+    assert job["status"] == RUNNING and job["processed"] == 2
+    # Its heartbeat is recent, so nobody else takes it yet
+    assert reopened.claim("w2", stale_seconds=600) is None
+
+    time.sleep(0.01)
+    job = reopened.claim("w2", stale_seconds=0)
+    assert job["job_id"] == job_id and job["started_at"] == started_at
+    assert reopened.next_chunk(job_id) == (1, 2, b"b")
+    reopened.close()
+
+
+def test_stale_worker_cannot_write_after_requeue(store):
+    job_id = store.create(CHUNKS, chunk_size=2)["job_id"]
+    store.claim("w1", stale_seconds=600)
+    assert store.complete_chunk(job_id, "w1", 0, 2, b"A")
+
+    time.sleep(0.01)
+    assert store.claim("w2", stale_seconds=0)["job_id"] == job_id
+    # w1 was only slow: its late result and finish are both dropped
+    assert not store.complete_chunk(job_id, "w1", 1, 2, b"B-from-w1")
+    store.finish(job_id, "w1", COMPLETED)
+    assert store.get(job_id)["status"] == RUNNING
+    assert store.next_chunk(job_id) == (1, 2, b"b")
+
+    assert store.complete_chunk(job_id, "w2", 1, 2, b"B")
+    assert store.results(job_id, 0, 2) == [(0, b"A"), (1, b"B")]
+    assert store.get(job_id)["processed"] == 4
+
+
+def test_cancelled_job_drops_its_input(store):
+    job_id = store.create(CHUNKS, chunk_size=2)["job_id"]
+    store.claim("w1", stale_seconds=600)
+    assert store.cancel(job_id)["status"] == CANCELLED
+    assert not store.complete_chunk(job_id, "w1", 0, 2, b"A")
+    assert store.next_chunk(job_id) is None
+    assert store.claim("w2", stale_seconds=0) is None
+
+
+def test_prune_deletes_only_expired_finished_jobs(path):
+    store = JobStore(path, retention_seconds=0)
+    finished = store.create(CHUNKS, chunk_size=2)["job_id"]
+    store.cancel(finished)
+    queued = store.create(CHUNKS, chunk_size=2)["job_id"]
+    time.sleep(0.01)
+    assert store.prune() == 1
+    assert store.get(finished) is None and store.results(finished, 0, 2) == []
+    assert store.get(queued)["status"] == QUEUED
+    store.close()
+
+
+def test_runner_stopped_mid_job_hands_it_back_and_another_finishes_it(path):
+    processed = []
+
+    async def first_run():
+        blocked = asyncio.Event()
+
+        async def process_chunk(payload):
+            if payload == b"b":
+                blocked.set()
+                await asyncio.Event().wait()  # Stopped while working on this chunk
+            processed.append(payload)
+            return payload.upper()
+
+        store = JobStore(path)
+        job_id = store.create(CHUNKS, chunk_size=2)["job_id"]
+        runner = JobRunner(store, process_chunk, concurrency=1, poll_interval=0.01)
+        runner.start()
+        await asyncio.wait_for(blocked.wait(), 5)
+        await runner.stop()
+        store.close()
+        return job_id
+
+    async def second_run(job_id):
+        async def process_chunk(payload):
+            processed.append(payload)
+            return payload.upper()
+
+        store = JobStore(path)
+        runner = JobRunner(store, process_chunk, concurrency=1, poll_interval=0.01)
+        runner.start()
+        while store.get(job_id)["status"] != COMPLETED:
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        return store
+
+    job_id = asyncio.run(first_run())
+    requeued = JobStore(path)
+    assert requeued.get(job_id)["status"] == QUEUED
+    assert requeued.get(job_id)["processed"] == 2
+    requeued.close()
+
+    store = asyncio.run(asyncio.wait_for(second_run(job_id), 5))
+    assert processed == [b"a", b"b", b"c"]  # Chunk a was not run again
+    assert store.results(job_id, 0, 2) == [(0, b"A"), (1, b"B"), (2, b"C")]
+    assert store.get(job_id)["processed"] == 5
+    store.close()
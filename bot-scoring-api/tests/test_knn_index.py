@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from detectors import EnsembleSpec, fit_batch_detectors
+from knn_index import NeighborGraph, nearest_standardized_distances, standardize
+
+
+@pytest.fixture
+def X():
+    rng = np.random.default_rng(3)
+    return rng.lognormal(size=(80, 12)) * np.logspace(0, 5, 12)
+
+
+def test_lof_matches_pyod_on_the_standardized_matrix(X):
+    from pyod.models.lof import LOF
+
+    Z = standardize(X)
+    graph = NeighborGraph.build(Z, 10)
+    expected = LOF(n_neighbors=5, algorithm="kd_tree").fit(Z).decision_scores_
+    np.testing.assert_allclose(graph.lof_scores(5), expected, rtol=1e-6)
+
+
+def test_detectors_and_near_duplicates_share_one_graph(X, monkeypatch):
+    builds = []
+    build = NeighborGraph.build.__func__
+
+    def counting_build(cls, feature_vectors, n_neighbors, **kwargs):
+        builds.append(n_neighbors)
+        return build(cls, feature_vectors, n_neighbors, **kwargs)
+
+    monkeypatch.setattr(NeighborGraph, "build", classmethod(counting_build))
+    spec = EnsembleSpec(detectors={"lof": {}, "knn": {"n_neighbors": 8}}, threads=1)
+    _, distances = fit_batch_detectors(X, ensemble=spec)
+    assert builds == [8]
+    np.testing.assert_allclose(distances, nearest_standardized_distances(X))
+
+
+def test_near_duplicates_without_graph_detectors(X):
+    _, distances = fit_batch_detectors(X, ensemble=EnsembleSpec(detectors={"ecod": {}}))
+    np.testing.assert_allclose(distances, nearest_standardized_distances(X))
+
+
+def test_batch_lof_is_not_built_through_pyod(X, monkeypatch):
+    import pyod.models.lof
+
+    def no_lof(*args, **kwargs):
+        raise AssertionError("LOF is scored from the neighbour graph")
+
+    monkeypatch.setattr(pyod.models.lof, "LOF", no_lof)
+    fit_batch_detectors(X)
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from micro_batcher import MicroBatcher
+
+
+def _recording_batcher(**kwargs):
+    batches = []
+
+    async def process(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    return MicroBatcher(process, **kwargs), batches
+
+
+def test_concurrent_calls_are_scored_together():
+    batcher, batches = _recording_batcher(max_batch_size=64, max_wait_ms=20)
+
+    async def scenario():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+
+    assert asyncio.run(scenario()) == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert batcher.stats()["avg_batch_size"] == 5.0
+
+
+def test_full_batch_is_flushed_without_waiting():
+    batcher, batches = _recording_batcher(max_batch_size=3, max_wait_ms=10_000)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*[batcher.submit(i) for i in range(7)]), 1.0)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scenario())  # The last item waits for the (long) timer
+    assert batches == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_a_failed_batch_fails_each_caller():
+    async def process(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(process, max_wait_ms=1)
+
+    async def scenario():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_wrong_result_count_is_an_error():
+    async def process(items):
+        return items[:1]
+
+    batcher = MicroBatcher(process, max_wait_ms=1)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(scenario()))
+
+
+def test_concurrent_single_calls_go_through_the_ensemble(make_submissions, monkeypatch):
+    batcher = MicroBatcher(main.score_features, max_batch_size=6, max_wait_ms=1000)
+    monkeypatch.setattr(main, "SINGLE_SCORE_BATCHER", batcher)
+    bodies = [sub.model_dump(mode="json", exclude_none=True) for sub in make_submissions(6, 40)]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[client.post("/score/single", json=body) for body in bodies])
+
+    responses = asyncio.run(scenario())
+    assert batcher.stats()["batches"] == 1
+    for response in responses:
+        assert response.status_code == 200
+        assert "rule_based" not in response.json()["feature_contributions"]
@@ -0,0 +1,47 @@
+import numpy as np
+
+import main
+from detectors import fit_batch_scores_timed
+from feature_matrix import build_feature_matrix, extract_columns
+from knn_index import nearest_standardized_distances
+from rules import DEFAULT_RULES, RuleSet
+
+
+def _brute_force(X):
+    std = X.std(axis=0)
+    Z = np.divide(X - X.mean(axis=0), std, out=np.zeros(X.shape), where=std > 0)
+    distances = np.linalg.norm(Z[:, None, :] - Z[None, :, :], axis=2)
+    np.fill_diagonal(distances, np.inf)
+    return distances.min(axis=1)
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 20)) * np.logspace(-4, 6, 20)
+    X[:, 3] = 7.0  # Constant columns drop out
+    X[10] = X[11]
+    distances = nearest_standardized_distances(X)
+    np.testing.assert_allclose(distances, _brute_force(X), atol=1e-9)
+    assert distances[10] == distances[11] == 0.0
+
+
+def test_small_raw_gap_in_a_small_feature_is_not_a_duplicate():
+    X = np.column_stack([np.linspace(0, 1e6, 40), np.zeros(40)])
+    X[1] = X[0] + [0.0, 5e-4]
+    assert np.linalg.norm(X[1] - X[0]) < 0.001
+    assert nearest_standardized_distances(X)[:2].min() > 0.01
+
+
+def test_rule_flags_duplicated_submissions(make_submissions):
+    submissions = make_submissions(30, 5)
+    submissions[1] = submissions[0]
+    analyses = [main.get_comment_analysis(sub) for sub in submissions]
+    columns = extract_columns(submissions, analyses)
+    distances = fit_batch_scores_timed(build_feature_matrix(columns=columns))[2]
+    columns.values["nearest_submission_distance"] = distances
+    columns.present["nearest_submission_distance"] = np.ones(len(submissions), dtype=np.bool_)
+
+    ruleset = RuleSet.from_dicts(DEFAULT_RULES)
+    flagged = ruleset.evaluate(columns)[:, ruleset.names.index("near_duplicate_submission")]
+    np.testing.assert_array_equal(flagged, distances < 0.01)
+    assert flagged[:2].all()
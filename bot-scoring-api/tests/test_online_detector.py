@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+
+import main
+from feature_matrix import N_FEATURES as SERVICE_FEATURES, feature_schema_hash
+from online_detector import GLOBAL_KEY, OnlineDetector, StreamingECOD
+
+N_FEATURES = 6
+
+
+def _batches(seed, n_batches=6, size=40):
+    rng = np.random.default_rng(seed)
+    return [rng.lognormal(size=(size, N_FEATURES)) * 100 for _ in range(n_batches)]
+
+
+def _platforms(n):
+    return np.array(["tiktok", "instagram"] * (n // 2), dtype=object)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    detector = OnlineDetector(N_FEATURES, "schema", state_dir=str(tmp_path), per_platform=True, warmup=50)
+    for X in _batches(1):
+        detector.score_and_update(X, _platforms(len(X)))
+    assert detector.checkpoint()
+    assert not detector.checkpoint()  # Nothing changed since
+
+    restored = OnlineDetector(N_FEATURES, "schema", state_dir=str(tmp_path), per_platform=True, warmup=50)
+    assert restored.load() == len(detector.detectors)
+    assert restored.stats() == detector.stats()
+
+    X = _batches(2, n_batches=1)[0]
+    expected = detector.score_and_update(X, _platforms(len(X)))
+    actual = restored.score_and_update(X, _platforms(len(X)))
+    np.testing.assert_array_equal(actual[0], expected[0])
+    assert actual[1] == expected[1]
+    np.testing.assert_array_equal(actual[2], expected[2])
+
+
+def test_load_skips_state_from_another_schema(tmp_path):
+    detector = OnlineDetector(N_FEATURES, "schema", state_dir=str(tmp_path), warmup=50)
+    detector.score_and_update(_batches(3, n_batches=1)[0], _platforms(40))
+    detector.checkpoint()
+    assert OnlineDetector(N_FEATURES, "other", state_dir=str(tmp_path)).load() == 0
+
+
+def test_state_arrays_are_a_snapshot():
+    detector = StreamingECOD(N_FEATURES, warmup=50, half_life=10)
+    batches = _batches(4)
+    detector.update(np.vstack(batches[:2]))
+    snapshot = detector.state_arrays()
+    saved = {key: value.copy() for key, value in snapshot.items()}
+    expected = detector.score(batches[0])
+
+    # Enough decay to force a rescale, which updates the arrays in place
+    for X in batches[2:] * 300:
+        detector.update(X)
+    for key, value in saved.items():
+        np.testing.assert_array_equal(snapshot[key], value)
+
+    # The counts still match the weight recorded alongside them
+    np.testing.assert_array_equal(StreamingECOD.from_state_arrays(snapshot).score(batches[0]), expected)
+
+
+def test_small_batches_get_online_scores_once_warmed_up(make_submissions, monkeypatch):
+    monkeypatch.setattr(main, "ONLINE_DETECTOR", OnlineDetector(SERVICE_FEATURES, feature_schema_hash(), warmup=40))
+    pair = make_submissions(2, 61)
+
+    # Two rows alone are below MIN_ENSEMBLE_BATCH: rules only until the detector has seen enough
+    assert all(s.attribution is None for s in asyncio.run(main.score_features(pair)))
+    asyncio.run(main.score_features(make_submissions(40, 62)))
+    scores = asyncio.run(main.score_features(pair))
+    assert [s.attribution for s in scores] == ["online", "online"]
+    assert main.ONLINE_DETECTOR.stats()["detectors"][GLOBAL_KEY]["seen"] == 44
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import main
+import reference
+from quick_check import quick_check_profiles
+
+FIELDS = ("follower_count", "following_count", "total_likes", "video_count", "account_age_days")
+
+
+def _count(rng):
+    kind = rng.integers(0, 6)
+    if kind == 0:
+        return int(rng.choice([0, 1, -1, 30, 365, 500, 1000, 3000, 10000, 100000]))
+    if kind == 1:
+        return int(rng.integers(0, 10_000))
+    if kind == 2:
+        return int(rng.integers(0, 10_000_000))
+    if kind == 3:  # Around and above 2**53, where float64 stops being exact
+        return int(rng.integers(2 ** 52, 2 ** 62)) * int(rng.choice([1, 1, 1, -1]))
+    if kind == 4:
+        return 2 ** 63 - 1 - int(rng.integers(0, 1000))
+    return int(rng.integers(-(2 ** 31), 2 ** 31))
+
+
+def _profiles(seed, n):
+    rng = np.random.default_rng(seed)
+    profiles = []
+    for _ in range(n):
+        values = {name: _count(rng) for name in FIELDS}
+        values["avg_views_per_video"] = None if rng.random() < 0.3 else _count(rng)
+        values["avg_comments_per_video"] = None if rng.random() < 0.3 else _count(rng)
+        values["verified"] = bool(rng.random() < 0.3)
+        profiles.append(main.TikTokQuickCheckRequest(**values))
+    return profiles
+
+
+def _json(result):
+    # As the batch endpoint serializes it, without re-validation
+    return main.TikTokQuickCheckResponse.model_construct(**result).model_dump_json()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_scalar_quick_check(seed):
+    profiles = _profiles(seed, 4000)
+    results = quick_check_profiles(profiles)
+    for profile, result in zip(profiles, results):
+        expected = main.TikTokQuickCheckResponse(**reference.tiktok_quick_check(profile)).model_dump_json()
+        assert _json(result) == expected
+
+
+def test_large_counts_divide_exactly():
+    # float64 division gives 45918849476166.83 here
+    profile = main.TikTokQuickCheckRequest(
+        follower_count=1472893015797527353, following_count=32076, total_likes=2 ** 62 + 1,
+        video_count=2 ** 60 + 3, account_age_days=7, verified=False,
+    )
+    [result] = quick_check_profiles([profile])
+    assert result["metrics"] == reference.tiktok_quick_check(profile)["metrics"]
+    assert result["metrics"]["follower_following_ratio"] == 45918849476166.84
+
+
+def test_counts_beyond_int64_are_rejected():
+    profile = main.TikTokQuickCheckRequest(
+        follower_count=2 ** 64, following_count=1, total_likes=0, video_count=0, account_age_days=1,
+    )
+    with pytest.raises(OverflowError):
+        quick_check_profiles([profile])
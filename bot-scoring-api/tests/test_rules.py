@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+import main
+import reference
+from feature_matrix import extract_columns
+from rules import DEFAULT_RULES, RuleConfigError, RuleSet, load_rule_file
+
+# The old hand-written checks read these as plain values
+CREATOR_DEFAULTS = {"creator_previous_submissions": 0, "creator_previous_flags": 0, "creator_trust_score": 100.0}
+
+
+def _as_old_request(submission):
+    return submission.model_copy(update={
+        name: default for name, default in CREATOR_DEFAULTS.items() if getattr(submission, name) is None
+    })
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_default_rules_match_old_flag_logic(make_submissions, seed):
+    submissions = make_submissions(400, seed)
+    analyses = [main.get_comment_analysis(sub) for sub in submissions]
+    ruleset = RuleSet.from_dicts(DEFAULT_RULES)
+
+    flags = ruleset.flag_lists(ruleset.evaluate(extract_columns(submissions, analyses)))
+    points = ruleset.evaluate(extract_columns(submissions, analyses)) @ ruleset.weights
+
+    for sub, row_flags, row_points in zip(submissions, flags, points):
+        expected = reference.detect_rule_based_flags(_as_old_request(sub))
+        assert row_flags == expected
+        assert row_points == sum(reference.FLAG_WEIGHTS.get(f, reference.DEFAULT_FLAG_WEIGHT) for f in expected)
+
+
+@pytest.mark.parametrize("when", [
+    "views.real > 0",
+    "views.__class__ == 0",
+    "__import__('os') == 0",
+    "len(views) > 0",
+    "max(views, likes) > 0",
+    "abs(views, likes) > 0",
+    "abs(x=views) > 0",
+    "__builtins__ == 0",
+    "__name__ == 0",
+    "(lambda: views)() > 0",
+    "[v for v in views] == 0",
+    "views[0] > 0",
+    "views ** 2 > 0",
+    "not_a_column > 0",
+])
+def test_validator_rejects_unsafe_predicates(when):
+    with pytest.raises(RuleConfigError):
+        RuleSet.from_dicts([{"name": "bad", "when": when}])
+
+
+def test_rule_file_with_unsafe_predicate_is_rejected(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [
+        {"name": "ok", "when": "views > 10"},
+        {"name": "bad", "when": "views.__class__.__mro__ == 0"},
+    ]}))
+    with pytest.raises(RuleConfigError):
+        load_rule_file(str(path))
+
+
+def test_allowed_predicate_compiles():
+    ruleset = RuleSet.from_dicts([{"name": "ok", "when": "abs(views - likes * 2) > 10 and not author_verified"}])
+    assert ruleset.names == ["ok"]
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+import score_batch
+
+
+def _score(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    out = tmp_path / (name + ".out.ndjson")
+    assert score_batch.main([str(path), str(out), "--workers", "0", "--fit", "chunk"]) == 0
+    return [json.loads(line) for line in out.read_text().splitlines()]
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+def test_json_array_scores_like_ndjson(tmp_path, make_submissions, wrap):
+    items = [sub.model_dump(exclude_none=True) for sub in make_submissions(12, 11)]
+    from_ndjson = _score(tmp_path, "subs.ndjson", "\n".join(json.dumps(item) for item in items))
+    document = {"submissions": items} if wrap else items
+    from_json = _score(tmp_path, "subs.json", json.dumps(document))
+    assert len(from_json) == len(items)
+    assert from_json == from_ndjson
+
+
+def test_json_must_hold_a_list(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text('"not a list"')
+    assert score_batch.main([str(path), str(tmp_path / "out.ndjson"), "--workers", "0"]) == 1
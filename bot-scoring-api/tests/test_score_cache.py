@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+def _batch(make_submissions, seed, ids=False):
+    submissions = [sub.model_dump(mode="json", exclude_none=True) for sub in make_submissions(6, seed)]
+    if ids:
+        for i, sub in enumerate(submissions):
+            sub.update(campaign_id=f"cache-campaign-{seed}", creator_id=f"cache-creator-{seed}-{i}")
+    return {"submissions": submissions}
+
+
+def _cache(client, batch, **headers):
+    return client.post("/score", json=batch, headers=headers).headers["X-Cache"]
+
+
+def test_stateful_resend_hits_until_another_stateful_batch_is_scored(client, make_submissions):
+    first = _batch(make_submissions, 21, ids=True)
+
+    miss = client.post("/score", json=first)
+    assert miss.headers["X-Cache"] == "MISS"
+    hit = client.post("/score", json=first)
+    assert hit.headers["X-Cache"] == "HIT"
+    assert hit.content == miss.content
+
+    # Id-less traffic doesn't touch the stores
+    assert _cache(client, _batch(make_submissions, 22)) == "MISS"
+    assert _cache(client, first) == "HIT"
+
+    # Another batch with ids changed the stores, so the first one is rescored against them
+    assert _cache(client, _batch(make_submissions, 23, ids=True)) == "MISS"
+    assert _cache(client, first) == "MISS"
+    assert _cache(client, first) == "HIT"
+
+
+def test_idless_batch_stays_cached_while_other_traffic_is_scored(client, make_submissions):
+    idless = _batch(make_submissions, 24)
+    assert _cache(client, idless) == "MISS"
+    generation = main.STATE_GENERATION
+    for seed in (25, 26):
+        _cache(client, _batch(make_submissions, seed, ids=True), **{"Cache-Control": "no-store"})
+        _cache(client, _batch(make_submissions, seed + 10))
+    assert main.STATE_GENERATION == generation + 2
+    assert _cache(client, idless) == "HIT"
+
+
+def test_uses_state(make_submissions, monkeypatch):
+    submissions = make_submissions(3, 27)
+    assert not main.uses_state(submissions)
+    assert main.uses_state(submissions[:2] + [submissions[2].model_copy(update={"video_id": "v"})])
+    monkeypatch.setattr(main, "VIDEO_HISTORY", None)
+    assert not main.uses_state([submissions[2].model_copy(update={"video_id": "v"})])
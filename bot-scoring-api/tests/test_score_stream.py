@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _lines(*chunks, max_line_bytes=16):
+    async def collect():
+        return [
+            type(line).__name__ if isinstance(line, Exception) else line
+            async for line in main.iter_ndjson_lines(_chunks(*chunks), max_line_bytes)
+        ]
+    return asyncio.run(collect())
+
+
+def test_lines_are_split_across_chunks():
+    assert _lines(b'{"a"', b': 1}\n\n  \n{"b": 2}', b"\n{\"c\": 3}") == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+def test_oversized_lines_are_reported_once_and_skipped():
+    long = b"x" * 40
+    assert _lines(b"ok\n" + long[:20], long[20:] + b"\nnext\n") == [b"ok", "LineTooLongError", b"next"]
+    assert _lines(long + b"\n") == ["LineTooLongError"]
+
+
+def test_stream_emits_one_line_per_input_line_in_order(make_submissions):
+    submissions = [sub.model_dump(mode="json", exclude_none=True) for sub in make_submissions(8, 50)]
+    lines = [json.dumps(sub) for sub in submissions]
+    lines[3:3] = ["", '{"views": "lots"}']
+    body = ("\n".join(lines) + "\n").encode()
+
+    with TestClient(main.app) as client:
+        streamed = client.post("/score/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+        batch = client.post("/score", json={"submissions": submissions}, headers={"Cache-Control": "no-store"})
+
+    assert streamed.status_code == 200
+    out = [json.loads(line) for line in streamed.text.splitlines()]
+    assert len(out) == len(submissions) + 1
+    assert out[3]["error"] == "invalid_submission"
+    scores = out[:3] + out[4:]
+    assert [s["bot_score"] for s in scores] == [s["bot_score"] for s in batch.json()["scores"]]
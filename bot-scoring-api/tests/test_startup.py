@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from comment_lsh import CrossVideoCommentIndex
+from feature_matrix import N_FEATURES, feature_schema_hash
+from online_detector import OnlineDetector
+
+
+@pytest.fixture
+def startup(monkeypatch):
+    """A fresh STARTUP record, not yet ready"""
+    state = {**main.STARTUP, "ready": False, "error": None, **{f"{p}_seconds": None for p in main.STARTUP_PHASES}}
+    monkeypatch.setattr(main, "STARTUP", state)
+    monkeypatch.setattr(main, "WARMUP_BATCH_SIZE", main.MIN_ENSEMBLE_BATCH)
+    return state
+
+
+def test_ready_is_503_until_warm_up_finishes(startup):
+    client = TestClient(main.app)  # No lifespan: nothing has started
+    assert client.get("/ready").status_code == 503
+
+    asyncio.run(main.warm_up())
+    response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] and body["error"] is None
+    assert all(body[f"{phase}_seconds"] is not None for phase in main.STARTUP_PHASES)
+    assert client.get("/health").json()["startup"] == body
+
+
+def test_failed_warm_up_still_becomes_ready(startup, monkeypatch):
+    def broken():
+        raise ImportError("no pyod")
+
+    monkeypatch.setattr(main, "import_detector_stack", broken)
+    asyncio.run(main.warm_up())
+    assert startup["ready"]
+    assert startup["error"] == "no pyod"
+    assert startup["warmup_seconds"] is None
+
+
+def test_background_mode_serves_before_ready(startup, monkeypatch):
+    release = threading.Event()
+
+    async def slow_warm_up():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        main.STARTUP["ready"] = True
+
+    monkeypatch.setattr(main, "STARTUP_MODE", "background")
+    monkeypatch.setattr(main, "warm_up", slow_warm_up)
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+        assert client.get("/ready").status_code == 503
+        release.set()
+        deadline = time.monotonic() + 5
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+
+def test_lazy_mode_is_ready_at_once(startup, monkeypatch):
+    monkeypatch.setattr(main, "STARTUP_MODE", "lazy")
+    with TestClient(main.app) as client:
+        assert client.get("/ready").status_code == 200
+    assert startup["detector_import_seconds"] is None
+
+
+def test_warm_up_pipeline_leaves_state_untouched(monkeypatch):
+    monkeypatch.setattr(main, "ONLINE_DETECTOR", OnlineDetector(N_FEATURES, feature_schema_hash(), warmup=8))
+    monkeypatch.setattr(main, "CROSS_VIDEO_COMMENT_INDEX", CrossVideoCommentIndex())
+
+    def state():
+        return (
+            main.COMMENT_ANALYSIS_CACHE.stats(), main.SCORE_CACHE.stats(), main.ONLINE_DETECTOR.stats(),
+            main.CROSS_VIDEO_COMMENT_INDEX.stats(), main.METRICS.render(),
+        )
+
+    before = state()
+    feature_vectors = main.warm_up_pipeline(16, fit_batch=True)
+    assert feature_vectors.shape == (16, N_FEATURES)
+    assert state() == before
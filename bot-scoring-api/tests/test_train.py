@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import train
+from creator_store import CreatorReputationStore
+from feature_matrix import FEATURE_NAMES
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_train_does_not_start_the_service():
+    code = "import sys, train; assert 'main' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=SERVICE_DIR, check=True)
+
+
+def test_training_fills_omitted_creator_history_like_serving(make_submissions, tmp_path):
+    store = CreatorReputationStore(str(tmp_path / "creators.sqlite3"))
+    store.update(np.array(["bad"] * 4, dtype=object), np.full(4, 95.0))
+    submissions = [
+        sub.model_copy(update={
+            "creator_id": "bad", "creator_trust_score": None,
+            "creator_previous_flags": None, "creator_previous_submissions": None,
+        })
+        for sub in make_submissions(4, 12)
+    ]
+    submissions[0] = submissions[0].model_copy(update={"creator_trust_score": 90.0})
+    trust = FEATURE_NAMES.index("trust_score")
+
+    unfilled = train.training_features(submissions)
+    filled = train.training_features(submissions, creator_store=store)
+    store.close()
+
+    np.testing.assert_array_equal(unfilled[1:, trust], 1.0)
+    assert (filled[1:, trust] < 1.0).all()
+    assert filled[0, trust] == unfilled[0, trust] == 0.9  # Supplied values are kept
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from feature_matrix import extract_columns
+from view_history import VideoHistoryStore, apply_video_history
+
+HOUR = 3600.0
+
+
+def _observe(store, video_id, views, likes, now, comments=0):
+    return store.observe(np.array([video_id], dtype=object), np.array([[views, likes, comments]]), now)
+
+
+def _feed(store, video_id, views, likes):
+    """One snapshot an hour apart per (views, likes) pair; returns the last features"""
+    for i, (v, lk) in enumerate(zip(views, likes)):
+        features = _observe(store, video_id, v, lk, now=i * HOUR)
+    return features
+
+
+def test_first_snapshot_has_no_features():
+    features = _observe(VideoHistoryStore(), "v", 1000, 100, now=0.0)
+    assert not features["present"][0]
+    assert features["view_history_snapshots"][0] == 0.0
+
+    features = _observe(VideoHistoryStore(), None, 1000, 100, now=0.0)
+    assert not features["present"][0]
+
+
+def test_even_growth_has_no_spike():
+    features = _feed(VideoHistoryStore(), "v", [1000, 2000, 3000, 4000], [100, 200, 300, 400])
+    assert features["present"][0]
+    assert features["view_history_snapshots"][0] == 4
+    assert features["view_spike_ratio"][0] == pytest.approx(1.0)
+    assert features["view_spike_share"][0] == pytest.approx(1 / 3)
+    assert features["view_engagement_lag"][0] == pytest.approx(0.0)
+
+
+def test_purchased_step_jump_is_a_spike_without_engagement():
+    views = [1000, 1100, 1200, 1300, 1400, 1500, 51500]
+    likes = [100, 110, 120, 130, 140, 150, 155]
+    features = _feed(VideoHistoryStore(), "v", views, likes)
+    assert features["view_spike_ratio"][0] > 5
+    assert features["view_spike_share"][0] == pytest.approx(50000 / 50500)
+    assert features["view_engagement_lag"][0] > 0.99
+
+
+def test_rescore_within_min_interval_replaces_the_latest_snapshot():
+    store = VideoHistoryStore(min_interval_seconds=60)
+    _observe(store, "v", 1000, 100, now=0.0)
+    _observe(store, "v", 2000, 200, now=HOUR)
+    polled = _observe(store, "v", 2500, 250, now=HOUR + 10)
+    assert store.history("v")["views"] == [1000, 2500]
+    # Features were computed as if the poll had already replaced the snapshot
+    fresh = VideoHistoryStore(min_interval_seconds=60)
+    _observe(fresh, "v", 1000, 100, now=0.0)
+    expected = _observe(fresh, "v", 2500, 250, now=HOUR + 10)
+    for name, values in expected.items():
+        np.testing.assert_array_equal(polled[name], values)
+
+
+def test_ring_keeps_the_newest_snapshots_and_lru_evicts():
+    store = VideoHistoryStore(max_videos=2, history_length=3)
+    _feed(store, "a", [1, 2, 3, 4, 5], [0] * 5)
+    assert store.history("a")["views"] == [3, 4, 5]
+
+    _observe(store, "b", 10, 0, now=10 * HOUR)
+    _observe(store, "a", 6, 0, now=11 * HOUR)  # a is now the most recently scored
+    _observe(store, "c", 20, 0, now=12 * HOUR)
+    assert store.history("b") is None
+    assert store.history("a")["views"] == [4, 5, 6]
+    assert store.stats()["evicted"] == 1
+
+
+def test_video_repeated_in_a_batch_uses_history_from_before_it():
+    store = VideoHistoryStore()
+    _observe(store, "v", 1000, 100, now=0.0)
+    features = store.observe(
+        np.array(["v", "v"], dtype=object), np.array([[2000, 200, 0], [3000, 300, 0]]), now=HOUR
+    )
+    assert features["view_history_snapshots"].tolist() == [2, 2]
+    assert store.history("v")["views"] == [1000, 3000]
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "history.npz")
+    store = VideoHistoryStore(state_path=path)
+    _feed(store, "a", [1000, 2000, 3000], [100, 200, 300])
+    _feed(store, "b", [10, 20], [1, 2])
+    assert store.checkpoint()
+    assert not store.checkpoint()  # Nothing changed since
+
+    restored = VideoHistoryStore(state_path=path)
+    assert restored.load() == 2
+    assert restored.history("a") == store.history("a")
+    expected = _observe(store, "a", 9000, 400, now=3 * HOUR)
+    actual = _observe(restored, "a", 9000, 400, now=3 * HOUR)
+    for name, values in expected.items():
+        np.testing.assert_array_equal(actual[name], values)
+
+    # A different ring length can't reuse the file
+    assert VideoHistoryStore(history_length=4, state_path=path).load() == 0
+
+
+def test_apply_video_history_fills_columns(make_submissions):
+    store = VideoHistoryStore()
+    base = make_submissions(2, 71)
+    first = [sub.model_copy(update={"video_id": f"video-{i}"}) for i, sub in enumerate(base)]
+    assert apply_video_history(extract_columns(first, [None] * 2), store, now=0.0) == 0
+
+    later = [first[0].model_copy(update={"views": first[0].views + 5000}), base[1]]
+    columns = extract_columns(later, [None] * 2)
+    assert apply_video_history(columns, store, now=HOUR) == 1
+    assert columns.present["view_history_snapshots"].tolist() == [True, False]
+    assert columns["view_history_snapshots"][0] == 2
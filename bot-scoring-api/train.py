@@ -0,0 +1,142 @@
+"""
+Offline training for the Bot Scoring API.
+
+Fits the IForest/LOF/ECOD ensemble on a historical corpus of submissions and
+saves it to the model registry with a version and the feature-schema hash.
+The API loads the active version at startup and only runs inference.
+
+Usage:
+    python train.py corpus.ndjson [--version 20261016-1200] [--model-dir models] [--activate]
+                    [--campaign-store state/campaigns.sqlite3] [--creator-store state/creators.sqlite3]
+
+The corpus is newline-delimited VideoFeatures JSON, or a .json file holding
+a list of them (or a ScoringRequest-style {"submissions": [...]}).
+
+Rows that leave out campaign averages or creator history are filled from
+the stores given, with the same fill step /score applies
+(submissions.fill_from_stores), so the model is trained on the inputs it
+will be served. The stores are only read.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+from campaign_store import CampaignBaselineStore
+from creator_store import CreatorReputationStore
+from detectors import DEFAULT_CONTAMINATION, PretrainedEnsemble
+from feature_matrix import build_feature_matrix, extract_columns, feature_schema_hash
+from model_registry import ModelRegistry, ModelRegistryError
+from submissions import VideoFeatures, analyze_comments, fill_from_stores
+
+# Same settings as the service (see main.py)
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+CAMPAIGN_BASELINE_MIN_SAMPLES = int(os.getenv("CAMPAIGN_BASELINE_MIN_SAMPLES", "20"))
+CREATOR_REPUTATION_HALF_LIFE_DAYS = float(os.getenv("CREATOR_REPUTATION_HALF_LIFE_DAYS", "90"))
+CREATOR_FLAG_SCORE = float(os.getenv("CREATOR_FLAG_SCORE", "60"))
+CREATOR_TRUST_PRIOR = float(os.getenv("CREATOR_TRUST_PRIOR", "3"))
+
+
+def load_corpus(path: str) -> List[VideoFeatures]:
+    """Read training submissions from NDJSON or JSON"""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("submissions", [])
+        return [VideoFeatures.model_validate(item) for item in data]
+
+    submissions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                submissions.append(VideoFeatures.model_validate_json(line))
+    return submissions
+
+
+def training_features(
+    submissions: List[VideoFeatures],
+    campaign_store: Optional[CampaignBaselineStore] = None,
+    creator_store: Optional[CreatorReputationStore] = None
+) -> np.ndarray:
+    """Feature matrix of a corpus, with omitted fields filled from the stores as /score fills them"""
+    comment_analyses = [
+        analyze_comments(sub.comment_data.texts)
+        if sub.comment_data and sub.comment_data.texts else None
+        for sub in submissions
+    ]
+    columns = extract_columns(submissions, comment_analyses)
+    fill_from_stores(columns, campaign_store, creator_store, CAMPAIGN_BASELINE_MIN_SAMPLES)
+    return build_feature_matrix(columns=columns)
+
+
+def train(
+    submissions: List[VideoFeatures],
+    version: str,
+    contamination: float = DEFAULT_CONTAMINATION,
+    campaign_store: Optional[CampaignBaselineStore] = None,
+    creator_store: Optional[CreatorReputationStore] = None
+) -> PretrainedEnsemble:
+    """Build the feature matrix for a corpus and fit the ensemble on it"""
+    feature_vectors = training_features(submissions, campaign_store, creator_store)
+    return PretrainedEnsemble.fit(
+        feature_vectors,
+        version=version,
+        feature_schema_hash=feature_schema_hash(),
+        contamination=contamination,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train and register a bot-scoring ensemble")
+    parser.add_argument("corpus", help="NDJSON/JSON file of historical VideoFeatures")
+    parser.add_argument("--version", default=datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--contamination", type=float, default=DEFAULT_CONTAMINATION)
+    parser.add_argument("--activate", action="store_true", help="Make this version active for the next startup")
+    parser.add_argument("--campaign-store", help="Campaign baseline store (CAMPAIGN_STORE_PATH) to fill campaign averages from")
+    parser.add_argument("--creator-store", help="Creator reputation store (CREATOR_STORE_PATH) to fill creator history from")
+    args = parser.parse_args(argv)
+
+    for store_path in (args.campaign_store, args.creator_store):
+        if store_path and not os.path.exists(store_path):
+            print(f"Store not found: {store_path}", file=sys.stderr)
+            return 1
+
+    submissions = load_corpus(args.corpus)
+    print(f"Loaded {len(submissions)} submissions from {args.corpus}")
+
+    campaign_store = CampaignBaselineStore(args.campaign_store) if args.campaign_store else None
+    creator_store = CreatorReputationStore(
+        args.creator_store,
+        half_life_days=CREATOR_REPUTATION_HALF_LIFE_DAYS,
+        flag_score=CREATOR_FLAG_SCORE,
+        trust_prior=CREATOR_TRUST_PRIOR,
+    ) if args.creator_store else None
+
+    registry = ModelRegistry(args.model_dir, feature_schema_hash())
+    try:
+        ensemble = train(submissions, args.version, args.contamination, campaign_store, creator_store)
+        path = registry.save(ensemble)
+        if args.activate:
+            registry.activate(ensemble.version)
+    except (ModelRegistryError, ValueError) as e:
+        print(f"Training failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        for store in (campaign_store, creator_store):
+            if store is not None:
+                store.close()
+
+    print(f"Saved model {ensemble.version} to {path}")
+    print(json.dumps(ensemble.metadata(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Per-video view-count history and growth-curve features.
+
+A submission only carries point-in-time counters, so view velocity cannot
+tell smooth organic growth from a purchased step jump. VideoHistoryStore
+keeps the last `history_length` (timestamp, views, likes, comments)
+snapshots of every video_id it has scored in fixed-size ring buffers:
+
+- all rings live in a few preallocated NumPy arrays (one row per video
+  slot), so memory is bounded by max_videos * history_length
+- the least recently scored video is evicted when a new one needs a slot
+- a video re-scored within min_interval_seconds updates its latest
+  snapshot in place instead of taking a new one
+- features for a whole batch are computed with array operations over the
+  gathered (rows, history_length + 1) windows, so the cost does not grow
+  with per-video Python work as history builds up
+
+Features (present once a video has at least one earlier snapshot):
+
+- view_history_snapshots: snapshots the features were computed from
+- view_spike_ratio: velocity of the fastest interval over the velocity of
+  the whole window (1.0 for perfectly even growth)
+- view_spike_share: share of the window's view growth that came in that interval
+- view_engagement_lag: how far likes + comments gained in that interval fall
+  short of the engagement rate the video had before it (0 = kept pace,
+  1 = no new engagement at all)
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from feature_matrix import VIDEO_HISTORY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT_VERSION = 1
+
+# Snapshot counters, in the order of the last axis of the counts array
+COUNTERS = ("views", "likes", "comments")
+
+
+class VideoHistoryStore:
+    """
+    Ring buffers of snapshots by video_id: an LRU of max_videos slots, each
+    holding the newest history_length snapshots.
+    """
+
+    def __init__(
+        self,
+        max_videos: int = 50_000,
+        history_length: int = 12,
+        min_interval_seconds: float = 60.0,
+        state_path: Optional[str] = None
+    ):
+        if history_length < 2:
+            raise ValueError(f"history_length must be at least 2, got {history_length}")
+        self.max_videos = max(int(max_videos), 1)
+        self.history_length = int(history_length)
+        self.min_interval_seconds = float(min_interval_seconds)
+        self.state_path = state_path
+
+        self._timestamps = np.zeros((self.max_videos, self.history_length), dtype=np.float64)
+        self._counts = np.zeros((self.max_videos, self.history_length, len(COUNTERS)), dtype=np.int64)
+        self._length = np.zeros(self.max_videos, dtype=np.int64)  # Snapshots held
+        self._head = np.zeros(self.max_videos, dtype=np.int64)  # Next write position
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free = list(range(self.max_videos - 1, -1, -1))
+        self._evicted = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _windows(self, slots: np.ndarray):
+        """Stored snapshots per slot, oldest to newest, right-aligned, with a validity mask"""
+        L = self.history_length
+        offsets = np.arange(L)
+        positions = (self._head[slots, None] - L + offsets) % L
+        valid = offsets >= L - self._length[slots, None]
+        rows = slots[:, None]
+        return self._timestamps[rows, positions], self._counts[rows, positions], valid
+
+    def observe(
+        self,
+        video_ids: np.ndarray,
+        counts: np.ndarray,
+        now: float
+    ) -> Dict[str, np.ndarray]:
+        """
+        Growth features for each row against the video's history, then record
+        the rows as new snapshots taken at `now`.
+        video_ids is an object array (None = no history); counts is (n, 3) in
+        COUNTERS order. Returns VIDEO_HISTORY_COLUMNS arrays plus a "present" mask.
+        A video sent more than once in a batch is compared with its history
+        as it was before the batch, and its last row is the one recorded.
+        """
+        n = len(video_ids)
+        features = {name: np.zeros(n) for name in VIDEO_HISTORY_COLUMNS}
+        present = np.zeros(n, dtype=np.bool_)
+        features["present"] = present
+        counts = np.asarray(counts, dtype=np.int64).reshape(n, len(COUNTERS))
+
+        has_id = video_ids != None  # noqa: E711 - elementwise None check
+        if not has_id.any():
+            return features
+        rows = np.flatnonzero(has_id)
+        ids = video_ids[rows].tolist()
+
+        with self._lock:
+            slots = np.fromiter((self._slots.get(vid, -1) for vid in ids), dtype=np.int64, count=len(ids))
+            known = slots >= 0
+            if known.any():
+                known_rows = rows[known]
+                window = _growth_features(
+                    *self._windows(slots[known]), counts[known_rows], now, self.min_interval_seconds
+                )
+                present[known_rows] = window.pop("present")
+                for name, values in window.items():
+                    features[name][known_rows] = values
+
+            # Last row per video wins; only the newest max_videos fit
+            last = list(dict(zip(ids, rows.tolist())).items())[-self.max_videos:]
+            self._record([vid for vid, _ in last], counts[[row for _, row in last]], now)
+        return features
+
+    def _record(self, ids, counts: np.ndarray, now: float) -> None:
+        """Append one snapshot per video (lock held)"""
+        slots = np.empty(len(ids), dtype=np.int64)
+        for i, vid in enumerate(ids):
+            slot = self._slots.get(vid)
+            if slot is None:
+                slot = self._allocate(vid)
+            else:
+                self._slots.move_to_end(vid)
+            slots[i] = slot
+
+        L = self.history_length
+        length = self._length[slots]
+        latest = (self._head[slots] - 1) % L
+        replace = (length > 0) & (now - self._timestamps[slots, latest] < self.min_interval_seconds)
+        positions = np.where(replace, latest, self._head[slots])
+
+        self._timestamps[slots, positions] = now
+        self._counts[slots, positions] = counts
+        self._head[slots] = np.where(replace, self._head[slots], (positions + 1) % L)
+        self._length[slots] = np.where(replace, length, np.minimum(length + 1, L))
+        self._dirty = True
+
+    def _allocate(self, video_id: str) -> int:
+        """A slot for a new video, evicting the least recently scored one if full (lock held)"""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self._evicted += 1
+        self._length[slot] = 0
+        self._head[slot] = 0
+        self._slots[video_id] = slot
+        return slot
+
+    def history(self, video_id: str) -> Optional[Dict[str, list]]:
+        """Stored snapshots for one video, oldest first (None if unknown)"""
+        with self._lock:
+            slot = self._slots.get(video_id)
+            if slot is None:
+                return None
+            timestamps, counts, valid = self._windows(np.array([slot]))
+        timestamps, counts = timestamps[valid], counts[valid]
+        return {
+            "timestamps": timestamps.tolist(),
+            **{name: counts[:, j].tolist() for j, name in enumerate(COUNTERS)},
+        }
+
+    # -------------------------------------------------------------------------
+    # Checkpointing
+    # -------------------------------------------------------------------------
+
+    def checkpoint(self) -> bool:
+        """Write every video's history to state_path if anything changed; returns whether it wrote"""
+        if not self.state_path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            ids = list(self._slots)  # Least recently scored first
+            slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(ids))
+            arrays = {
+                "video_ids": np.array(ids, dtype=np.str_),
+                "timestamps": self._timestamps[slots],
+                "counts": self._counts[slots],
+                "length": self._length[slots],
+                "head": self._head[slots],
+            }
+            self._dirty = False
+
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".video-history-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, format_version=np.array(STATE_FORMAT_VERSION), **arrays)
+            os.replace(tmp_path, self.state_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def load(self) -> int:
+        """Restore histories from state_path; an incompatible or unreadable file is skipped"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return 0
+        try:
+            with np.load(self.state_path) as data:
+                if int(data["format_version"]) != STATE_FORMAT_VERSION:
+                    raise ValueError("unsupported state format")
+                ids = data["video_ids"].tolist()
+                timestamps, counts = data["timestamps"], data["counts"]
+                length, head = data["length"], data["head"]
+            if timestamps.shape[1:] != (self.history_length,):
+                raise ValueError("history_length changed")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring video history state %s: %s", self.state_path, e)
+            return 0
+
+        # Keep the most recently scored videos if there are more than fit
+        keep = slice(max(len(ids) - self.max_videos, 0), None)
+        with self._lock:
+            for i, vid in zip(range(len(ids))[keep], ids[keep]):
+                slot = self._slots.get(vid)
+                if slot is None:
+                    slot = self._allocate(vid)
+                self._timestamps[slot] = timestamps[i]
+                self._counts[slot] = counts[i]
+                self._length[slot] = length[i]
+                self._head[slot] = head[i]
+        return len(ids[keep])
+
+    def stats(self) -> dict:
+        return {
+            "videos": len(self._slots),
+            "max_videos": self.max_videos,
+            "history_length": self.history_length,
+            "evicted": self._evicted,
+            "state_path": self.state_path,
+        }
+
+
+def _growth_features(
+    timestamps: np.ndarray,
+    counts: np.ndarray,
+    valid: np.ndarray,
+    current: np.ndarray,
+    now: float,
+    min_interval_seconds: float
+) -> Dict[str, np.ndarray]:
+    """
+    Growth features for (m, L) stored windows plus the current counts.
+    A current snapshot within min_interval_seconds of the latest stored one
+    replaces it, as it will when recorded.
+    """
+    m = len(timestamps)
+    replace = valid[:, -1] & (now - timestamps[:, -1] < min_interval_seconds)
+    # Append the current snapshot; rows that replace shift their window right by one instead
+    shifted = np.where(replace[:, None], np.roll(valid, 1, axis=1) & (np.arange(valid.shape[1]) > 0), valid)
+    keep_t = np.where(replace[:, None], np.roll(timestamps, 1, axis=1), timestamps)
+    keep_c = np.where(replace[:, None, None], np.roll(counts, 1, axis=1), counts)
+    timestamps = np.concatenate([keep_t, np.full((m, 1), now)], axis=1)
+    counts = np.concatenate([keep_c, current[:, None, :]], axis=1)
+    valid = np.concatenate([shifted, np.ones((m, 1), dtype=np.bool_)], axis=1)
+
+    views = counts[:, :, 0].astype(np.float64)
+    engagement = (counts[:, :, 1] + counts[:, :, 2]).astype(np.float64)
+    snapshots = valid.sum(axis=1)
+    first = valid.argmax(axis=1)  # Valid snapshots are contiguous up to the newest
+    rows = np.arange(m)
+
+    # Interval growth (views can be corrected downwards; that is not growth)
+    interval_valid = valid[:, 1:] & valid[:, :-1]
+    dt = np.maximum(np.diff(timestamps, axis=1), min_interval_seconds)
+    dv = np.where(interval_valid, np.maximum(np.diff(views, axis=1), 0), 0)
+    de = np.where(interval_valid, np.maximum(np.diff(engagement, axis=1), 0), 0)
+
+    total_views = dv.sum(axis=1)
+    span = np.maximum(now - timestamps[rows, first], min_interval_seconds)
+    growing = (snapshots >= 2) & (total_views > 0)
+    safe_total = np.where(growing, total_views, 1.0)
+
+    # Fastest interval, relative to the window's average velocity
+    velocity = np.where(interval_valid, dv / dt, -1.0)
+    spike = velocity.argmax(axis=1)
+    spike_ratio = velocity[rows, spike] * span / safe_total
+    spike_views = dv[rows, spike]
+
+    # Engagement gained in the spike interval vs the rate before it
+    before_views = views[rows, spike]
+    before_engagement = engagement[rows, spike]
+    has_baseline = growing & (before_views > 0) & (before_engagement > 0)
+    baseline_rate = np.where(has_baseline, before_engagement / np.where(has_baseline, before_views, 1), 1.0)
+    spike_rate = de[rows, spike] / np.maximum(spike_views, 1)
+    lag = np.where(has_baseline, np.clip(1 - spike_rate / baseline_rate, 0.0, 1.0), 0.0)
+
+    return {
+        "present": snapshots >= 2,
+        "view_history_snapshots": snapshots.astype(np.float64),
+        "view_spike_ratio": np.where(growing, spike_ratio, 0.0),
+        "view_spike_share": np.where(growing, spike_views / safe_total, 0.0),
+        "view_engagement_lag": lag,
+    }
+
+
+def apply_video_history(columns, store: VideoHistoryStore, now: float) -> int:
+    """
+    Fill the VIDEO_HISTORY_COLUMNS from each row's video history, then record
+    the batch's counters. Returns the number of rows that had history.
+    """
+    counts = np.stack([columns[name] for name in COUNTERS], axis=1)
+    features = store.observe(columns["video_id"], counts, now)
+    present = features.pop("present")
+    for name, values in features.items():
+        columns.values[name] = values
+        columns.present[name] = present.copy()
+    return int(present.sum())